@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+EmotionSpeak 服务参数自动调优
+
+在当前机器上用真实的 SentimentAnalyzer 跑一组代表性语料，遍历以下参数的组合：
+
+    torch intra-op 线程数    SENTIMENT_NUM_THREADS
+    torch inter-op 线程数    SENTIMENT_INTEROP_THREADS
+    waitress 线程数          WORKER_THREADS（即同时在途的请求数）
+    微批大小                 INFERENCE_MAX_BATCH_SIZE
+    最大序列长度             SENTIMENT_MAX_LENGTH
+
+每组参数以与服务相同的方式运行（微批调度器 + 并发请求线程），测量吞吐和 p50/p99 延迟。
+在 p99 不超过延迟预算、且截断后标签与完整长度一致率达标的组合中选吞吐最高的一组，
+写入服务配置档（默认 data/serving_profile.json），main.py 启动时自动加载。
+
+inter-op 线程池在进程内只能设置一次，因此每个 inter-op 取值在独立的子进程中测量。
+
+用法:
+    python autotune.py
+    python autotune.py --corpus texts.txt --threads 2,4 --server-threads 4,8 --batch-sizes 4,8
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _parse_ints(value):
+    return sorted({int(item) for item in value.split(',') if item.strip()})
+
+
+def _available_cores():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+
+def _default_threads():
+    cores = _available_cores()
+    return ','.join(str(n) for n in sorted({1, max(1, cores // 2), cores}))
+
+
+def load_corpus(path=None):
+    """读取调优语料
+
+    Args:
+        path: 语料文件，.jsonl 取每行的 text 字段，其他格式每行一条文本；
+            为空时使用内置样例，并拼接出中等长度和长文本
+
+    Returns:
+        list: 文本列表
+    """
+    if path:
+        texts = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                texts.append(json.loads(line)['text'] if path.endswith('.jsonl') else line)
+        return texts
+    from src.core.sentiment.quantization import SAMPLE_TEXTS
+    # 线上请求以短句为主，夹杂少量段落和长文
+    medium = [''.join(SAMPLE_TEXTS[i:i + 4]) for i in range(0, len(SAMPLE_TEXTS), 4)]
+    long = [''.join(SAMPLE_TEXTS[i:] + SAMPLE_TEXTS[:i]) * 2 for i in range(0, len(SAMPLE_TEXTS), 8)]
+    return list(SAMPLE_TEXTS) + medium + long
+
+
+def build_grid(args):
+    """生成参数组合；微批大小超过在途请求数时永远凑不满，这类组合直接跳过"""
+    trials = []
+    for intra, interop, server_threads, batch_size, max_length in itertools.product(
+            args.threads, args.interop_threads, args.server_threads, args.batch_sizes, args.max_lengths):
+        if batch_size > server_threads:
+            continue
+        trials.append({
+            'SENTIMENT_NUM_THREADS': intra,
+            'SENTIMENT_INTEROP_THREADS': interop,
+            'WORKER_THREADS': server_threads,
+            'INFERENCE_MAX_BATCH_SIZE': batch_size,
+            'SENTIMENT_MAX_LENGTH': max_length,
+        })
+    return trials
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _measure(analyzer, texts, concurrency, requests):
+    """以 concurrency 个并发请求线程调用 analyze，返回吞吐、延迟、错误数和规则兜底数
+
+    规则兜底指未经模型计算、由规则分析给出的结果（包括排队超过延迟预算被撤销的请求），
+    它们返回得很快，不能算作该组参数下的正常请求。
+    """
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    fallbacks = []
+
+    def client():
+        while True:
+            index = next(counter)
+            if index >= requests:
+                return
+            started = time.perf_counter()
+            try:
+                result = analyzer.analyze(texts[index % len(texts)])
+                if result.get('error'):
+                    errors.append(result['error'])
+                elif result.get('tier') == 'rules':
+                    fallbacks.append(result.get('degraded'))
+            except Exception as e:
+                errors.append(str(e))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(_percentile(latencies, 50), 1),
+        'p99_ms': round(_percentile(latencies, 99), 1),
+        'errors': len(errors),
+        'fallbacks': len(fallbacks),
+    }
+
+
+def _label_agreement(analyzer, texts, max_lengths, reference_length):
+    """各最大序列长度下的标签与完整长度下的一致率"""
+    def labels(max_length):
+        analyzer.max_length = max_length
+        return [row[1] >= row[0] for row in analyzer._predict_scores(texts)]
+
+    reference = labels(reference_length)
+    agreement = {}
+    for max_length in max_lengths:
+        current = labels(max_length)
+        agreement[max_length] = sum(a == b for a, b in zip(reference, current)) / len(texts)
+    return agreement
+
+
+def run_group(interop, trials, texts, requests, max_wait_ms, latency_budget_ms):
+    """在独立进程中测量同一 inter-op 线程数下的全部组合
+
+    Returns:
+        dict: backend、各最大序列长度的标签一致率和每组参数的测量结果
+    """
+    # 必须在导入 config 之前设置，模型加载时据此配置 inter-op 线程池
+    os.environ['SENTIMENT_INTEROP_THREADS'] = str(interop)
+    os.environ.pop('SENTIMENT_NUM_THREADS', None)
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.core.config import MAX_SEQ_LENGTH
+    from src.core.sentiment import analyzer as analyzer_module
+    from src.core.sentiment.backends import OnnxBackend
+
+    analyzer = analyzer_module.SentimentAnalyzer(cache=None, auto_initialize=False)
+    analyzer.warm_up()
+    backend = analyzer_module._MODEL_CACHE['backend']
+    if backend is None:
+        raise RuntimeError("情感分析模型未加载，请先执行 python init.py download_models")
+
+    max_lengths = sorted({trial['SENTIMENT_MAX_LENGTH'] for trial in trials})
+    agreement = _label_agreement(analyzer, texts, max_lengths, MAX_SEQ_LENGTH)
+
+    results = []
+    current_intra = None
+    for trial in sorted(trials, key=lambda t: t['SENTIMENT_NUM_THREADS']):
+        intra = trial['SENTIMENT_NUM_THREADS']
+        if intra != current_intra:
+            if backend.name == 'onnx':
+                # ONNX Runtime 的线程数只能在创建会话时指定
+                backend = OnnxBackend.load(num_threads=intra, interop_threads=interop)
+                analyzer_module.install_backend(backend)
+            else:
+                import torch
+                torch.set_num_threads(intra)
+            current_intra = intra
+
+        analyzer.max_length = trial['SENTIMENT_MAX_LENGTH']
+        analyzer.enable_scheduler(
+            max_batch_size=trial['INFERENCE_MAX_BATCH_SIZE'],
+            max_wait_ms=max_wait_ms,
+            latency_budget_ms=latency_budget_ms
+        )
+        try:
+            concurrency = trial['WORKER_THREADS']
+            # 先跑一轮不计时的请求，让线程池和内存分配进入稳定状态
+            _measure(analyzer, texts, concurrency, min(requests, concurrency * 2))
+            metrics = _measure(analyzer, texts, concurrency, requests)
+        finally:
+            analyzer.disable_scheduler()
+        metrics['label_agreement'] = round(agreement[trial['SENTIMENT_MAX_LENGTH']], 4)
+        results.append({'settings': trial, 'metrics': metrics})
+        print(f"[autotune] {_describe(trial)} -> {_describe_metrics(metrics)}", flush=True)
+    return {'backend': backend.version, 'results': results}
+
+
+def _describe(settings):
+    return (f"intra={settings['SENTIMENT_NUM_THREADS']} interop={settings['SENTIMENT_INTEROP_THREADS']} "
+            f"threads={settings['WORKER_THREADS']} batch={settings['INFERENCE_MAX_BATCH_SIZE']} "
+            f"max_len={settings['SENTIMENT_MAX_LENGTH']}")
+
+
+def _describe_metrics(metrics):
+    return (f"{metrics['throughput_rps']:.1f} req/s, p50 {metrics['p50_ms']:.1f}ms, "
+            f"p99 {metrics['p99_ms']:.1f}ms, 一致率 {metrics['label_agreement']:.2%}"
+            + (f", 错误 {metrics['errors']}" if metrics['errors'] else '')
+            + (f", 规则兜底 {metrics['fallbacks']}" if metrics['fallbacks'] else ''))
+
+
+def select_best(results, latency_budget_ms, min_agreement):
+    """选择最佳参数：满足延迟预算和一致率要求的组合中吞吐最高者；
+    没有组合满足延迟预算时取 p99 最低者。有错误或规则兜底的组合不参与选择
+
+    Returns:
+        dict: 最佳组合，没有可用组合时为 None
+    """
+    eligible = [r for r in results
+                if not r['metrics']['errors'] and not r['metrics'].get('fallbacks')
+                and r['metrics']['label_agreement'] >= min_agreement]
+    within_budget = [r for r in eligible if r['metrics']['p99_ms'] <= latency_budget_ms]
+    if within_budget:
+        return max(within_budget, key=lambda r: (r['metrics']['throughput_rps'], -r['metrics']['p99_ms']))
+    if eligible:
+        print(f"[autotune] 没有组合的 p99 在 {latency_budget_ms:.0f}ms 以内，选择 p99 最低的组合")
+        return min(eligible, key=lambda r: r['metrics']['p99_ms'])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EmotionSpeak 服务参数自动调优')
+    parser.add_argument('--corpus', help='调优语料（每行一条文本，或 .jsonl 的 text 字段），默认使用内置样例')
+    parser.add_argument('--threads', type=_parse_ints, default=_default_threads(),
+                        help='torch intra-op 线程数候选（逗号分隔）')
+    parser.add_argument('--interop-threads', type=_parse_ints, default='1,2', help='torch inter-op 线程数候选')
+    parser.add_argument('--server-threads', type=_parse_ints, default='4,8,16', help='waitress 线程数候选')
+    parser.add_argument('--batch-sizes', type=_parse_ints, default='1,4,8,16', help='微批大小候选')
+    parser.add_argument('--max-lengths', type=_parse_ints, default='128,256,512', help='最大序列长度候选')
+    parser.add_argument('--requests', type=int, default=200, help='每组参数计时的请求数')
+    parser.add_argument('--latency-budget', type=float, default=float(os.getenv('INFERENCE_LATENCY_BUDGET_MS', 500)),
+                        help='p99 延迟预算（毫秒）')
+    parser.add_argument('--max-wait-ms', type=float, default=float(os.getenv('INFERENCE_MAX_WAIT_MS', 5)),
+                        help='微批凑批最长等待毫秒数')
+    parser.add_argument('--min-agreement', type=float, default=0.99,
+                        help='截断后标签与完整长度一致率的下限')
+    parser.add_argument('--output', help='配置档路径，默认 data/serving_profile.json 或环境变量 SERVING_PROFILE')
+    parser.add_argument('--report', help='把全部组合的测量结果写入该 JSON 文件')
+    parser.add_argument('--dry-run', action='store_true', help='只输出结果，不写配置档')
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.core.profile import save_profile, profile_path
+
+    texts = load_corpus(args.corpus)
+    if not texts:
+        parser.error('调优语料为空')
+    trials = build_grid(args)
+    if not trials:
+        parser.error('参数网格为空（微批大小不能超过 waitress 线程数）')
+    print(f"[autotune] 语料 {len(texts)} 条，{len(trials)} 组参数，每组 {args.requests} 个请求")
+
+    results = []
+    backend = None
+    started = time.perf_counter()
+    context = get_context('spawn')
+    for interop in args.interop_threads:
+        group = [trial for trial in trials if trial['SENTIMENT_INTEROP_THREADS'] == interop]
+        # 每个 inter-op 取值一个全新进程
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            output = executor.submit(run_group, interop, group, texts, args.requests,
+                                     args.max_wait_ms, args.latency_budget).result()
+        backend = output['backend']
+        results.extend(output['results'])
+    print(f"[autotune] 测量完成，用时 {time.perf_counter() - started:.0f}s")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'backend': backend, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    print('[autotune] 吞吐最高的组合:')
+    for result in sorted(results, key=lambda r: r['metrics']['throughput_rps'], reverse=True)[:5]:
+        print(f"[autotune]   {_describe(result['settings'])} -> {_describe_metrics(result['metrics'])}")
+
+    best = select_best(results, args.latency_budget, args.min_agreement)
+    if best is None:
+        print('[autotune] 没有可用的组合（全部出错或一致率不达标），未写入配置档')
+        sys.exit(1)
+    print(f"[autotune] 最佳组合: {_describe(best['settings'])} -> {_describe_metrics(best['metrics'])}")
+    if args.dry_run:
+        return
+    path = save_profile(best['settings'], best['metrics'], path=args.output or profile_path(), extra={
+        'backend': backend,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'corpus_size': len(texts),
+        'trials': len(results),
+        'latency_budget_ms': args.latency_budget,
+    })
+    print(f"[autotune] 配置档已写入 {path}，main.py 启动时自动加载（已设置的环境变量优先）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+"""
+EmotionSpeak 微基准测试
+
+对分词、词典查询、关键词/强度分析、模型前向以及 analyze / analyze_batch 做逐阶段计时，
+使用固定语料和随机初始化的小型同构模型，离线运行，不需要下载 330M 模型。
+
+用法:
+    python -m benchmarks run --output bench.json
+    python -m benchmarks compare baseline.json bench.json
+"""
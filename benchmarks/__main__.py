@@ -0,0 +1,81 @@
+"""命令行入口：python -m benchmarks run / compare"""
+import os
+import sys
+import json
+import argparse
+
+from .compare import compare_results, format_comparison
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'latest.json')
+
+
+def _run(args):
+    # 固定 HF 离线模式，保证不会访问网络
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    from .corpus import CORPORA
+    from .suite import ALL_STAGES, run_suite
+
+    corpora = args.corpora.split(',') if args.corpora else None
+    stages = args.stages.split(',') if args.stages else None
+    unknown = [name for name in corpora or [] if name not in CORPORA] + [name for name in stages or [] if name not in ALL_STAGES]
+    if unknown:
+        print(f"未知的语料或阶段: {', '.join(unknown)}")
+        return 2
+
+    def progress(corpus, stage, result):
+        print(f"{corpus:<8}{stage:<15}中位 {result['median_ms']:>10.4f}ms  p95 {result['p95_ms']:>10.4f}ms  "
+              f"峰值内存 {result['peak_kb']:>9.1f}KB", flush=True)
+
+    report = run_suite(corpora, stages, repeat=args.repeat, threads=args.threads, seed=args.seed, progress=progress)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+    return 0
+
+
+def _compare(args):
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    for key in ('threads', 'model'):
+        if baseline.get('meta', {}).get(key) != current.get('meta', {}).get(key):
+            print(f"警告: 两次运行的 {key} 不同，结果不可直接比较")
+    rows = compare_results(baseline, current, threshold=args.threshold,
+                           memory_threshold=args.memory_threshold, min_delta_ms=args.min_delta_ms)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f"发现 {len(regressions)} 项性能回退")
+        return 1
+    print("未发现性能回退")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='EmotionSpeak 微基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='运行基准测试并写入 JSON 结果')
+    run_parser.add_argument('--output', default=DEFAULT_OUTPUT, help='结果文件路径')
+    run_parser.add_argument('--repeat', type=int, default=5, help='每个阶段计时的遍数')
+    run_parser.add_argument('--threads', type=int, default=1, help='torch 算子线程数')
+    run_parser.add_argument('--seed', type=int, default=0, help='小型模型的随机种子')
+    run_parser.add_argument('--corpora', help='只运行这些语料档位（逗号分隔：short,medium,long）')
+    run_parser.add_argument('--stages', help='只运行这些阶段（逗号分隔）')
+
+    compare_parser = subparsers.add_parser('compare', help='比较两份结果，有回退时返回非零退出码')
+    compare_parser.add_argument('baseline', help='基准结果文件')
+    compare_parser.add_argument('current', help='待比较的结果文件')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='中位耗时回退阈值（相对值）')
+    compare_parser.add_argument('--memory-threshold', type=float, default=0.20, help='内存峰值回退阈值（相对值）')
+    compare_parser.add_argument('--min-delta-ms', type=float, default=0.01, help='计为回退的最小耗时增量（毫秒）')
+
+    args = parser.parse_args()
+    return _run(args) if args.command == 'run' else _compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
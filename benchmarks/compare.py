@@ -0,0 +1,68 @@
+"""比较两次基准测试结果，标记性能回退"""
+from typing import Dict, List
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.10,
+                    memory_threshold: float = 0.20, min_delta_ms: float = 0.01) -> List[Dict]:
+    """逐个 (语料, 阶段) 比较中位耗时和内存峰值
+
+    中位耗时增幅超过 threshold 且绝对增量超过 min_delta_ms（排除亚微秒级抖动）时记为耗时回退，
+    内存峰值增幅超过 memory_threshold 时记为内存回退；只出现在一侧的阶段不参与比较。
+
+    Args:
+        baseline: 基准结果（run_suite 的输出）
+        current: 待比较的结果
+        threshold: 耗时回退阈值（相对值）
+        memory_threshold: 内存回退阈值（相对值）
+        min_delta_ms: 计为回退的最小耗时增量（毫秒）
+
+    Returns:
+        List[Dict]: 每个阶段的比较结果，status 为 regression、improvement 或 ok
+    """
+    rows = []
+    for corpus, stages in current.get('results', {}).items():
+        for stage, result in stages.items():
+            base = baseline.get('results', {}).get(corpus, {}).get(stage)
+            if base is None:
+                continue
+            time_ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] else 1.0
+            delta_ms = result['median_ms'] - base['median_ms']
+            memory_ratio = (result['peak_kb'] / base['peak_kb']) if base['peak_kb'] else 1.0
+
+            reasons = []
+            if time_ratio > 1 + threshold and delta_ms > min_delta_ms:
+                reasons.append('time')
+            if memory_ratio > 1 + memory_threshold and result['peak_kb'] - base['peak_kb'] > 1:
+                reasons.append('memory')
+            if reasons:
+                status = 'regression'
+            elif time_ratio < 1 - threshold and -delta_ms > min_delta_ms:
+                status = 'improvement'
+            else:
+                status = 'ok'
+            rows.append({
+                'corpus': corpus,
+                'stage': stage,
+                'baseline_ms': base['median_ms'],
+                'current_ms': result['median_ms'],
+                'time_change': round(time_ratio - 1, 4),
+                'baseline_peak_kb': base['peak_kb'],
+                'current_peak_kb': result['peak_kb'],
+                'memory_change': round(memory_ratio - 1, 4),
+                'status': status,
+                'reasons': reasons,
+            })
+    return rows
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    """把比较结果格式化为文本表格"""
+    header = f"{'语料':<8}{'阶段':<15}{'基准(ms)':>12}{'当前(ms)':>12}{'变化':>9}{'内存变化':>10}  状态"
+    lines = [header]
+    for row in rows:
+        lines.append(
+            f"{row['corpus']:<10}{row['stage']:<17}{row['baseline_ms']:>12.4f}{row['current_ms']:>12.4f}"
+            f"{row['time_change']:>+10.1%}{row['memory_change']:>+12.1%}  "
+            + (f"{row['status']}({','.join(row['reasons'])})" if row['reasons'] else row['status'])
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,46 @@
+"""基准测试的固定语料
+
+短句来自常见的评论、聊天场景；段落和长文由短句按固定顺序拼接而成，
+语料内容与顺序不随运行变化，保证不同版本的结果可以直接比较。
+"""
+from typing import Dict, List
+
+SENTENCES = [
+    "今天天气真好，心情特别愉快！",
+    "这家餐厅的服务太差了，再也不会来了。",
+    "收到礼物的那一刻，我感动得说不出话来。",
+    "考试又没考好，感觉很沮丧。",
+    "这部电影还行吧，没有想象中那么精彩。",
+    "终于放假了，可以好好休息一下了！",
+    "快递丢了，客服还一直推卸责任，真让人生气。",
+    "孩子第一次叫妈妈，我开心得哭了。",
+    "明天就要面试了，有点紧张和担心。",
+    "他居然忘了我们的约定，我很失望。",
+    "新买的手机用起来很流畅，非常满意。",
+    "听到这个消息，我感到既惊讶又难过。",
+    "会议按时开始，大家讨论了下季度的计划。",
+    "连续加班一个月，身心俱疲。",
+    "朋友们为我准备了惊喜派对，太幸福了！",
+    "这个问题困扰我很久了，不知道该怎么办。",
+    "老师耐心地解答了我的每一个问题，非常感谢。",
+    "地铁又晚点了，上班迟到被扣了工资。",
+    "窗外下着小雨，街上的行人不多。",
+    "比赛最后一秒绝杀，全场都沸腾了！",
+    "房东突然要涨房租，真是让人头疼。",
+    "第一次独自旅行，既兴奋又有点害怕。",
+    "这本书写得很细腻，读完久久不能平静。",
+    "排了两个小时的队，结果卖完了，太气人了。",
+]
+
+
+def _join(count: int, offset: int) -> str:
+    """从 offset 开始按顺序循环拼接 count 个短句"""
+    return ''.join(SENTENCES[(offset + i) % len(SENTENCES)] for i in range(count))
+
+
+# 各长度档位的语料：短句约 15 字，段落约 100 字，长文约 1000 字（超过模型的 512 token 截断长度）
+CORPORA: Dict[str, List[str]] = {
+    'short': list(SENTENCES),
+    'medium': [_join(6, offset) for offset in range(0, len(SENTENCES), 3)],
+    'long': [_join(64, offset) for offset in range(0, len(SENTENCES), 6)],
+}
@@ -0,0 +1,107 @@
+"""本地 edge-tts 替身
+
+提供与 edge_tts.Communicate 相同的 stream() / save() 接口，不访问网络：
+按对数正态分布模拟首包延迟，再以快于实时的速度分块输出静音 MP3 帧
+（24kHz、48kbps 单声道，与 edge-tts 默认输出的码率一致），
+音频时长按中文语速随文本长度增长。install() 把替身注册为 edge_tts 模块，
+TTSEngine 在方法内按需导入 edge_tts，因此无需修改引擎代码。
+"""
+import sys
+import math
+import types
+import random
+import asyncio
+import threading
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, Dict, Optional
+
+# MPEG-2 Layer III、48kbps、24kHz、单声道的帧头；每帧 144 字节、576 个采样（24ms）
+_FRAME = b'\xff\xf3\x64\xc4' + b'\x00' * 140
+_FRAME_SECONDS = 576 / 24000
+
+
+@dataclass
+class FakeTTSProfile:
+    """替身的延迟和输出模型"""
+    # 首包延迟的中位数（毫秒）及对数正态分布的 sigma
+    first_byte_ms: float = 350.0
+    first_byte_sigma: float = 0.35
+    # 合成速度：每秒墙钟时间输出的音频秒数
+    realtime_factor: float = 6.0
+    # 语速（字/秒），决定音频时长
+    chars_per_second: float = 4.5
+    # 每个数据块包含的 MP3 帧数
+    chunk_frames: int = 16
+    # 合成失败的概率（在首包之后抛出异常）
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+class FakeCommunicate:
+    """edge_tts.Communicate 的替身"""
+
+    profile = FakeTTSProfile()
+    _random = random.Random()
+    _lock = threading.Lock()
+
+    def __init__(self, text: str, voice: str = 'zh-CN-XiaoxiaoNeural', *, rate: str = '+0%',
+                 volume: str = '+0%', pitch: str = '+0Hz', **kwargs):
+        self.text = text
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self.pitch = pitch
+        self.options = kwargs
+
+    def _plan(self):
+        profile = self.profile
+        with self._lock:
+            first_byte = self._random.lognormvariate(math.log(profile.first_byte_ms / 1000.0), profile.first_byte_sigma)
+            fail = self._random.random() < profile.error_rate
+        seconds = max(len(self.text), 1) / profile.chars_per_second
+        frames = max(1, int(seconds / _FRAME_SECONDS))
+        return first_byte, frames, fail
+
+    async def stream(self) -> AsyncIterator[Dict]:
+        """按 edge-tts 的格式逐块产出 {'type': 'audio', 'data': bytes}"""
+        first_byte, frames, fail = self._plan()
+        profile = self.profile
+        await asyncio.sleep(first_byte)
+        chunk_wall = profile.chunk_frames * _FRAME_SECONDS / profile.realtime_factor
+        sent = 0
+        while sent < frames:
+            count = min(profile.chunk_frames, frames - sent)
+            yield {'type': 'audio', 'data': _FRAME * count}
+            sent += count
+            if fail and sent >= frames // 2:
+                raise RuntimeError('fake edge-tts: connection closed')
+            if sent < frames:
+                await asyncio.sleep(chunk_wall)
+        yield {'type': 'WordBoundary', 'offset': 0, 'duration': int(frames * _FRAME_SECONDS * 1e7), 'text': self.text}
+
+    async def save(self, audio_fname: str, metadata_fname: Optional[str] = None):
+        with open(audio_fname, 'wb') as f:
+            async for chunk in self.stream():
+                if chunk['type'] == 'audio':
+                    f.write(chunk['data'])
+
+
+def install(profile: Optional[FakeTTSProfile] = None) -> types.ModuleType:
+    """把替身注册为 edge_tts 模块（需在首次合成前调用）
+
+    Args:
+        profile: 延迟和输出模型，默认使用 FakeTTSProfile()
+
+    Returns:
+        types.ModuleType: 替身模块
+    """
+    profile = profile or FakeTTSProfile()
+    communicate = type('Communicate', (FakeCommunicate,), {
+        'profile': profile,
+        '_random': random.Random(profile.seed),
+    })
+    module = types.ModuleType('edge_tts')
+    module.Communicate = communicate
+    module.FAKE_PROFILE = asdict(profile)
+    sys.modules['edge_tts'] = module
+    return module
@@ -0,0 +1,394 @@
+"""HTTP 端到端压测
+
+在子进程中通过 create_app + waitress 启动完整服务，edge-tts 替换为本地替身（fake_tts），
+情感模型默认使用随机初始化的小型同构模型，全程离线、不访问微软的语音服务。
+客户端以固定并发按比例混合发送 /api/analyze、/api/tts、/api/tts/stream 和音频文件下载请求，
+结束后汇总吞吐、各类请求的延迟分位数、错误率以及分析结果缓存和语音缓存的命中率。
+
+用法:
+    python -m benchmarks.loadtest --duration 30 --concurrency 16
+    python -m benchmarks.loadtest --mix analyze=70,tts=20,audio=10 --zipf 1.2 --output load.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import http.client
+import statistics
+from collections import Counter, defaultdict
+from dataclasses import asdict, fields
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from .corpus import CORPORA
+from .fake_tts import FakeTTSProfile
+
+OPERATIONS = ('analyze', 'tts', 'stream', 'audio')
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"未知的请求类型 {name}，可选 {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('请求比例不能全为 0')
+    return mix
+
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(len(ordered) * q / 100) - 1))
+    return round(ordered[index], 1)
+
+
+def serve(host: str, port: int, threads: int, model: str, profile: Dict, audio_dir: str):
+    """子进程入口：安装 edge-tts 替身（及小型模型）后启动 waitress"""
+    # 必须在导入 src 之前设置，语音缓存写入临时目录
+    os.environ['AUDIO_DIR'] = audio_dir
+    from .fake_tts import install
+    install(FakeTTSProfile(**profile))
+    if model == 'tiny':
+        from src.core.sentiment.analyzer import install_backend
+        from .tiny_model import build_tiny_backend
+        install_backend(build_tiny_backend())
+    import logging
+    from waitress import serve as waitress_serve
+    from src.webapp.app import create_app
+    # 压测时请求排队是预期内的，不逐条打印 waitress 的队列告警
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+    waitress_serve(create_app(), host=host, port=port, threads=threads, _quiet=True)
+
+
+class TextPicker:
+    """按 Zipf 分布从语料中抽取文本，热门文本反复出现以产生缓存命中"""
+
+    def __init__(self, texts: List[str], zipf: float, unique_ratio: float, seed: int):
+        self.texts = texts
+        self.weights = [1.0 / (rank + 1) ** zipf for rank in range(len(texts))]
+        self.unique_ratio = unique_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def pick(self) -> str:
+        with self._lock:
+            text = self._random.choices(self.texts, self.weights)[0]
+            if self._random.random() < self.unique_ratio:
+                # 追加序号使文本唯一，走未命中缓存的冷路径
+                self._counter += 1
+                text = f'{text}（{self._counter}）'
+            return text
+
+
+class LoadClient:
+    """单个压测线程，复用一条 keep-alive 连接"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes, float]:
+        """发送请求并读完响应
+
+        Returns:
+            Tuple[int, bytes, float]: (状态码, 响应体, 首字节耗时毫秒)
+        """
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            first = response.read1(65536) if hasattr(response, 'read1') else response.read(65536)
+            first_byte_ms = (time.perf_counter() - started) * 1000
+            data = first + response.read()
+        except Exception:
+            self.conn.close()
+            self.conn = None
+            raise
+        if response.will_close:
+            self.conn.close()
+            self.conn = None
+        return response.status, data, first_byte_ms
+
+
+class LoadTest:
+    """按比例混合请求的闭环压测"""
+
+    def __init__(self, host: str, port: int, mix: Dict[str, float], picker: TextPicker,
+                 concurrency: int, timeout: float, seed: int):
+        self.host = host
+        self.port = port
+        self.operations = [name for name in mix if mix[name] > 0]
+        self.weights = [mix[name] for name in self.operations]
+        self.picker = picker
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.seed = seed
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_bytes: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.requests: Counter = Counter()
+        self.audio_urls: List[str] = []
+        self._lock = threading.Lock()
+
+    def _execute(self, client: LoadClient, operation: str, rng: random.Random) -> Tuple[str, Optional[str], float, float]:
+        """执行一次请求，返回 (实际类型, 错误原因, 耗时毫秒, 首字节毫秒)"""
+        if operation == 'audio':
+            with self._lock:
+                url = rng.choice(self.audio_urls) if self.audio_urls else None
+            if url is None:
+                # 还没有可下载的音频时先合成一段
+                operation = 'tts'
+        started = time.perf_counter()
+        if operation == 'analyze':
+            status, data, first_byte = client.request('POST', '/api/analyze', {'text': self.picker.pick()})
+        elif operation == 'tts':
+            status, data, first_byte = client.request('POST', '/api/tts', {'text': self.picker.pick()})
+        elif operation == 'stream':
+            status, data, first_byte = client.request('GET', f'/api/tts/stream?text={quote(self.picker.pick())}')
+        else:
+            status, data, first_byte = client.request('GET', url)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        error = None
+        if status != 200:
+            error = f'HTTP {status}'
+        elif operation in ('analyze', 'tts'):
+            body = json.loads(data)
+            if not body.get('success'):
+                error = 'success=false'
+            elif operation == 'tts':
+                with self._lock:
+                    if body['audio_url'] not in self.audio_urls:
+                        self.audio_urls.append(body['audio_url'])
+        elif not data:
+            error = 'empty body'
+        return operation, error, elapsed, first_byte
+
+    def _worker(self, index: int, deadline: float, budget: Optional[List[int]]):
+        rng = random.Random(self.seed * 1000 + index)
+        client = LoadClient(self.host, self.port, self.timeout)
+        while time.perf_counter() < deadline:
+            if budget is not None:
+                with self._lock:
+                    if budget[0] <= 0:
+                        return
+                    budget[0] -= 1
+            operation = rng.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                operation, error, elapsed, first_byte = self._execute(client, operation, rng)
+            except Exception as e:
+                error = type(e).__name__
+                elapsed = (time.perf_counter() - started) * 1000
+                first_byte = None
+            with self._lock:
+                self.requests[operation] += 1
+                self.latencies[operation].append(elapsed)
+                if first_byte is not None:
+                    self.first_bytes[operation].append(first_byte)
+                if error:
+                    self.errors[operation][error] += 1
+
+    def run(self, duration: float, max_requests: Optional[int] = None) -> float:
+        """运行压测，返回实际耗时（秒）"""
+        deadline = time.perf_counter() + duration
+        budget = [max_requests] if max_requests else None
+        started = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._worker, args=(i, deadline, budget), daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - started
+
+    def summary(self, elapsed: float) -> Dict:
+        """汇总吞吐、延迟分位数和错误率"""
+        operations = {}
+        for name in OPERATIONS:
+            count = self.requests[name]
+            if not count:
+                continue
+            latencies = self.latencies[name]
+            errors = sum(self.errors[name].values())
+            operations[name] = {
+                'requests': count,
+                'throughput_rps': round(count / elapsed, 2),
+                'errors': errors,
+                'error_rate': round(errors / count, 4),
+                'mean_ms': round(statistics.fmean(latencies), 1),
+                'p50_ms': _percentile(latencies, 50),
+                'p90_ms': _percentile(latencies, 90),
+                'p99_ms': _percentile(latencies, 99),
+                'max_ms': round(max(latencies), 1),
+                'first_byte_p50_ms': _percentile(self.first_bytes[name], 50),
+                'first_byte_p99_ms': _percentile(self.first_bytes[name], 99),
+                'error_reasons': dict(self.errors[name]),
+            }
+        total = sum(self.requests.values())
+        total_errors = sum(op['errors'] for op in operations.values())
+        return {
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total, 4) if total else 0.0,
+            'operations': operations,
+        }
+
+
+def _wait_ready(host: str, port: int, process, timeout: float):
+    """等待服务就绪（/health/ready 返回 200）"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f'服务进程已退出，退出码 {process.exitcode}')
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/health/ready')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+            conn.close()
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'服务在 {timeout:.0f} 秒内未就绪')
+
+
+def _cache_stats(host: str, port: int) -> Dict:
+    try:
+        status, data, _ = LoadClient(host, port, 10).request('GET', '/api/cache/stats')
+        body = json.loads(data) if status == 200 else {}
+    except Exception as e:
+        print(f"读取缓存统计失败: {str(e)}")
+        return {}
+    return {'analysis': body.get('stats', {}), 'audio': body.get('audio', {})}
+
+
+def _print_report(report: Dict):
+    print(f"\n总计 {report['requests']} 个请求，用时 {report['duration_s']}s，"
+          f"吞吐 {report['throughput_rps']} req/s，错误率 {report['error_rate']:.2%}")
+    print(f"{'类型':<8}{'请求数':>8}{'req/s':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'首字节p50':>11}{'错误率':>9}")
+    for name, op in report['operations'].items():
+        first_byte = f"{op['first_byte_p50_ms']:.1f}" if op['first_byte_p50_ms'] is not None else '-'
+        print(f"{name:<10}{op['requests']:>8}{op['throughput_rps']:>9.1f}{op['p50_ms']:>9.1f}{op['p90_ms']:>9.1f}"
+              f"{op['p99_ms']:>9.1f}{op['max_ms']:>9.1f}{first_byte:>13}{op['error_rate']:>10.2%}")
+        if op['error_reasons']:
+            print(f"{'':<10}错误: {op['error_reasons']}")
+    for name, label in (('analysis', '分析结果缓存'), ('audio', '语音缓存')):
+        stats = report['cache'].get(name)
+        if stats:
+            print(f"{label}: 命中 {stats.get('hits', 0)}，未命中 {stats.get('misses', 0)}，"
+                  f"命中率 {stats.get('hit_ratio', 0.0):.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description='EmotionSpeak HTTP 端到端压测')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒）')
+    parser.add_argument('--requests', type=int, help='总请求数上限，达到后提前结束')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--mix', type=_parse_mix, default='analyze=55,tts=25,stream=10,audio=10',
+                        help='请求比例，如 analyze=55,tts=25,stream=10,audio=10')
+    parser.add_argument('--corpora', default='short,medium', help='文本语料档位（short,medium,long）')
+    parser.add_argument('--zipf', type=float, default=1.0, help='文本热度的 Zipf 指数，0 表示均匀分布')
+    parser.add_argument('--unique-ratio', type=float, default=0.0, help='追加序号使文本唯一的请求比例')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WORKER_THREADS', 8)), help='waitress 线程数')
+    parser.add_argument('--model', choices=['tiny', 'real'], default='tiny',
+                        help='tiny 为随机初始化的小型模型，real 加载本地的 330M 模型')
+    parser.add_argument('--timeout', type=float, default=60, help='单个请求的超时（秒）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--output', help='把结果写入该 JSON 文件')
+    for field in fields(FakeTTSProfile):
+        if field.name == 'seed':
+            continue
+        parser.add_argument(f"--tts-{field.name.replace('_', '-')}", dest=f'tts_{field.name}',
+                            type=type(field.default), default=field.default,
+                            help=f'edge-tts 替身的 {field.name}（默认 {field.default}）')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.corpora.split(',') if name not in CORPORA]
+    if unknown:
+        parser.error(f"未知的语料档位: {', '.join(unknown)}")
+    texts = [text for name in args.corpora.split(',') for text in CORPORA[name]]
+    profile = FakeTTSProfile(seed=args.seed, **{
+        field.name: getattr(args, f'tts_{field.name}') for field in fields(FakeTTSProfile) if field.name != 'seed'
+    })
+
+    host = '127.0.0.1'
+    port = _free_port(host)
+    audio_dir = tempfile.mkdtemp(prefix='emotionspeak-loadtest-')
+    env_defaults = {'HF_HUB_OFFLINE': '1', 'TOKENIZERS_PARALLELISM': 'false'} if args.model == 'tiny' else {}
+    for key, value in env_defaults.items():
+        os.environ.setdefault(key, value)
+    server = get_context('spawn').Process(
+        target=serve, args=(host, port, args.threads, args.model, asdict(profile), audio_dir), daemon=True
+    )
+    server.start()
+    try:
+        print(f"正在启动服务（端口 {port}，waitress 线程 {args.threads}，模型 {args.model}）...")
+        _wait_ready(host, port, server, timeout=300)
+        print(f"开始压测：并发 {args.concurrency}，时长 {args.duration:.0f}s，比例 {args.mix}")
+        load = LoadTest(host, port, args.mix, TextPicker(texts, args.zipf, args.unique_ratio, args.seed),
+                        args.concurrency, args.timeout, args.seed)
+        elapsed = load.run(args.duration, args.requests)
+        report = load.summary(elapsed)
+        report['cache'] = _cache_stats(host, port)
+        report['config'] = {
+            'concurrency': args.concurrency,
+            'threads': args.threads,
+            'mix': args.mix,
+            'corpora': args.corpora,
+            'zipf': args.zipf,
+            'unique_ratio': args.unique_ratio,
+            'model': args.model,
+            'fake_tts': asdict(profile),
+        }
+    finally:
+        server.terminate()
+        server.join(10)
+        if server.is_alive():
+            server.kill()
+        shutil.rmtree(audio_dir, ignore_errors=True)
+
+    _print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""基准测试各阶段的定义与计时
+
+每个阶段是一个 (analyzer, text) -> 无参可调用对象 的函数：函数体内做不计时的准备
+（例如预先分好词的上下文），返回的可调用对象才是被计时的部分。
+"""
+import gc
+import os
+import math
+import sys
+import time
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from .corpus import CORPORA
+from .tiny_model import TINY_CONFIG, build_tiny_backend
+
+RESULT_FORMAT = 1
+
+
+def _tokenized_context(analyzer, text):
+    """分好词、但关键词命中和情感词查询尚未计算的上下文"""
+    context = analyzer.create_context(text)
+    context.words
+    return context
+
+
+def _stage_tokenize(analyzer, text):
+    tokenizer = analyzer.word_tokenizer
+    return lambda: tokenizer.tokenize(text)
+
+
+def _stage_dict_lookup(analyzer, text):
+    words = _tokenized_context(analyzer, text).words
+    loader = analyzer.tokenizer.dict_loader
+    return lambda: [loader.get_word_emotion(word) for word in words]
+
+
+def _stage_keywords(analyzer, text):
+    context = _tokenized_context(analyzer, text)
+    return lambda: analyzer.analyze_keywords(text, context)
+
+
+def _stage_keyword_match(analyzer, text):
+    context = _tokenized_context(analyzer, text)
+    return lambda: analyzer._analyze_emotion_keywords(text, context)
+
+
+def _stage_intensity(analyzer, text):
+    context = _tokenized_context(analyzer, text)
+    return lambda: analyzer._analyze_intensity(text, context)
+
+
+def _stage_forward(analyzer, text):
+    return lambda: analyzer._predict_scores([text])
+
+
+def _stage_analyze(analyzer, text):
+    return lambda: analyzer.analyze(text)
+
+
+# 阶段名称 -> 准备函数；analyze_batch 以整份语料为一次调用，单独处理
+STAGES: Dict[str, Callable] = {
+    'tokenize': _stage_tokenize,
+    'dict_lookup': _stage_dict_lookup,
+    'keywords': _stage_keywords,
+    'keyword_match': _stage_keyword_match,
+    'intensity': _stage_intensity,
+    'forward': _stage_forward,
+    'analyze': _stage_analyze,
+}
+BATCH_STAGE = 'analyze_batch'
+ALL_STAGES = list(STAGES) + [BATCH_STAGE]
+
+
+def _prepare(analyzer, stage: str, texts: List[str]) -> List[Callable]:
+    if stage == BATCH_STAGE:
+        return [lambda: analyzer.analyze_batch(list(texts))]
+    return [STAGES[stage](analyzer, text) for text in texts]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(len(ordered) * q / 100) - 1))
+    return ordered[index]
+
+
+def run_stage(analyzer, stage: str, texts: List[str], repeat: int) -> Dict:
+    """对一份语料计时一个阶段
+
+    先完整运行一遍预热，再运行 repeat 遍计时；最后单独运行一遍统计 Python 堆内存峰值
+    （tracemalloc 会拖慢执行，不与计时混在一起）。
+
+    Returns:
+        Dict: 调用次数、每次调用的平均/中位/p95/最小耗时（毫秒）、每条文本的平均耗时和内存峰值（KB）
+    """
+    for call in _prepare(analyzer, stage, texts):
+        call()
+
+    durations = []
+    for _ in range(repeat):
+        calls = _prepare(analyzer, stage, texts)
+        gc.collect()
+        for call in calls:
+            started = time.perf_counter_ns()
+            call()
+            durations.append((time.perf_counter_ns() - started) / 1e6)
+
+    calls = _prepare(analyzer, stage, texts)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for call in calls:
+        call()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    texts_per_call = len(texts) if stage == BATCH_STAGE else 1
+    return {
+        'calls': len(durations),
+        'mean_ms': round(statistics.fmean(durations), 4),
+        'median_ms': round(statistics.median(durations), 4),
+        'p95_ms': round(_percentile(durations, 95), 4),
+        'min_ms': round(min(durations), 4),
+        'per_text_ms': round(statistics.median(durations) / texts_per_call, 4),
+        'peak_kb': round(max(0, peak) / 1024, 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _max_rss_kb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return round(rss / 1024 if sys.platform == 'darwin' else rss, 1)
+
+
+def run_suite(corpora: Optional[List[str]] = None, stages: Optional[List[str]] = None,
+              repeat: int = 5, threads: int = 1, seed: int = 0,
+              progress: Optional[Callable[[str, str, Dict], None]] = None) -> Dict:
+    """运行基准测试
+
+    Args:
+        corpora: 语料档位，默认全部
+        stages: 阶段名称，默认全部
+        repeat: 每个阶段计时的遍数
+        threads: torch 算子线程数，固定下来使结果可比
+        seed: 小型模型的随机种子
+        progress: 每完成一个阶段时的回调 (corpus, stage, result)
+
+    Returns:
+        Dict: 运行环境信息和 corpus -> stage -> 计时结果
+    """
+    import torch
+    import transformers
+    from src.core.sentiment import analyzer as analyzer_module
+
+    torch.set_num_threads(threads)
+    analyzer_module.install_backend(build_tiny_backend(seed))
+    analyzer = analyzer_module.SentimentAnalyzer(cache=None, auto_initialize=False)
+    analyzer.warm_up()
+
+    results = {}
+    for corpus in corpora or list(CORPORA):
+        results[corpus] = {}
+        for stage in stages or ALL_STAGES:
+            results[corpus][stage] = run_stage(analyzer, stage, CORPORA[corpus], repeat)
+            if progress is not None:
+                progress(corpus, stage, results[corpus][stage])
+
+    return {
+        'format': RESULT_FORMAT,
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'transformers': transformers.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'threads': threads,
+            'repeat': repeat,
+            'seed': seed,
+            'model': dict(TINY_CONFIG),
+            'corpus_sizes': {name: len(CORPORA[name]) for name in results},
+            'max_rss_kb': _max_rss_kb(),
+        },
+        'results': results,
+    }
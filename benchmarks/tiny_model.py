@@ -0,0 +1,55 @@
+"""随机初始化的小型情感模型
+
+与 Erlangshen-Roberta-330M-Sentiment 同构（BertForSequenceClassification，中文逐字切分的 WordPiece 词表，
+2 分类输出、512 位置编码），只缩小了层数和隐藏维度。词表按 CJK 统一汉字区间离线生成，
+token 数与真实模型基本一致，因此分词、填充和分桶的开销与线上相同。
+"""
+import os
+import string
+import tempfile
+from typing import Dict
+
+# 与真实模型的差别只在规模
+TINY_CONFIG: Dict = {
+    'hidden_size': 64,
+    'num_hidden_layers': 2,
+    'num_attention_heads': 2,
+    'intermediate_size': 128,
+    'max_position_embeddings': 512,
+    'type_vocab_size': 2,
+    'num_labels': 2,
+}
+
+_SPECIAL_TOKENS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+_PUNCTUATION = '，。！？、；：“”‘’（）《》【】…—～·'
+
+
+def _vocab():
+    chars = list(string.digits + string.ascii_lowercase + string.punctuation + _PUNCTUATION)
+    chars.extend(chr(code) for code in range(0x4E00, 0x9FA6))
+    return _SPECIAL_TOKENS + list(dict.fromkeys(chars))
+
+
+def build_tiny_backend(seed: int = 0):
+    """构建随机初始化的小型模型及其分词器
+
+    Args:
+        seed: 随机种子，相同种子得到相同的权重
+
+    Returns:
+        TorchBackend: 可直接传给 install_backend 的推理后端
+    """
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+    from src.core.sentiment.backends import TorchBackend
+
+    vocab = _vocab()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vocab_path = os.path.join(tmp_dir, 'vocab.txt')
+        with open(vocab_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(vocab))
+        tokenizer = BertTokenizerFast(vocab_path, do_lower_case=True, tokenize_chinese_chars=True)
+
+    torch.manual_seed(seed)
+    model = BertForSequenceClassification(BertConfig(vocab_size=len(vocab), **TINY_CONFIG))
+    return TorchBackend(model, tokenizer)
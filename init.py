@@ -110,14 +110,85 @@ def download_model():
         print(f'[WARNING] 模型下载失败: {str(e)}')
         print('[init] 将使用备用模型进行情感分析')
 
+def build_lexicon():
+    print('[init] 编译二进制情感词典...')
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.core.sentiment.lexicon import build_lexicon as compile_lexicon
+    try:
+        output_path = compile_lexicon()
+        print(f'[init] 编译词典已生成: {output_path}')
+    except Exception as e:
+        print(f'[WARNING] 编译词典失败: {str(e)}')
+        print('[init] 将在运行时回退到 JSON 词典')
+
+def quantize_model(samples_file=None):
+    print('[init] 生成 int8 量化模型...')
+    sys.path.insert(0, PROJECT_ROOT)
+    try:
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        from src.core.config import MODELS_DIR, MAX_SEQ_LENGTH
+        from src.core.sentiment.analyzer import MODEL_NAME
+        from src.core.sentiment import quantization
+    except ImportError as e:
+        print(f'[WARNING] 缺少依赖，无法量化模型: {str(e)}')
+        return
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, cache_dir=MODELS_DIR, local_files_only=True)
+        fp32_model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, cache_dir=MODELS_DIR, local_files_only=True)
+        fp32_model.eval()
+    except Exception as e:
+        print(f'[WARNING] 本地模型加载失败，请先执行 download_models: {str(e)}')
+        return
+    # 量化会替换模块，先复制一份保留 fp32 模型作为基准
+    import copy
+    int8_model = quantization.quantize_model(copy.deepcopy(fp32_model))
+    output_path = quantization.save_quantized_model(int8_model, MODEL_NAME)
+    print(f'[init] 量化模型已生成: {output_path}')
+
+    def scorer(model):
+        def score(texts):
+            inputs = tokenizer(texts, padding=True, truncation=True, max_length=MAX_SEQ_LENGTH, return_tensors='pt')
+            with torch.no_grad():
+                return torch.softmax(model(**inputs).logits, dim=1).tolist()
+        return score
+
+    texts = None
+    if samples_file:
+        with open(samples_file, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    report = quantization.compare_models(scorer(fp32_model), scorer(int8_model), texts)
+    print(f"[init] 一致性检查: 样例 {report['samples']} 条，"
+          f"标签一致率 {report['label_agreement']:.2%}，"
+          f"正面分数平均偏移 {report['mean_score_drift']:.4f}，最大偏移 {report['max_score_drift']:.4f}")
+    for item in report['disagreements']:
+        print(f"[init]   不一致: {item['text']}")
+    print('[init] 设置环境变量 SENTIMENT_PRECISION=int8 即可启用量化模型')
+
+def export_onnx():
+    print('[init] 导出 ONNX 模型...')
+    sys.path.insert(0, PROJECT_ROOT)
+    try:
+        from src.core.config import MODELS_DIR
+        from src.core.sentiment.analyzer import MODEL_NAME
+        from src.core.sentiment.backends import export_onnx as export_model
+        output_path = export_model(MODEL_NAME, MODELS_DIR)
+    except Exception as e:
+        print(f'[WARNING] ONNX 导出失败，请先执行 download_models 并安装 onnx: {str(e)}')
+        return
+    print(f'[init] ONNX 模型已导出: {output_path}')
+    print('[init] 安装 onnxruntime 并设置环境变量 SENTIMENT_BACKEND=onnx 即可启用')
+
 def download_models():
     check_dicts()
+    build_lexicon()
     download_model()
     print('[init] 资源全部就绪！')
 
 def main():
     parser = argparse.ArgumentParser(description='EmotionSpeak初始化脚本')
-    parser.add_argument('action', choices=['setup', 'download_models', 'all'], help='要执行的操作')
+    parser.add_argument('action', choices=['setup', 'download_models', 'build_lexicon', 'quantize', 'export_onnx', 'all'], help='要执行的操作')
+    parser.add_argument('--samples', help='quantize 一致性检查使用的样例文件（每行一条文本）')
     args = parser.parse_args()
     if args.action == 'setup':
         install_requirements()
@@ -125,13 +196,22 @@ def main():
         setup_essential_dirs()
     elif args.action == 'download_models':
         check_dicts()
+        build_lexicon()
         download_model()
         print('[init] 资源全部就绪！')
+    elif args.action == 'build_lexicon':
+        check_dicts()
+        build_lexicon()
+    elif args.action == 'quantize':
+        quantize_model(args.samples)
+    elif args.action == 'export_onnx':
+        export_onnx()
     elif args.action == 'all':
         install_requirements()
         setup_essential_dirs()
         copy_env_file()
         check_dicts()
+        build_lexicon()
         download_model()
         print('[init] 所有依赖和资源已准备完毕！')
 
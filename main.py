@@ -8,7 +8,7 @@ import os
 import sys
 from pathlib import Path
 from waitress import serve
-from src.webapp.app import create_app
+from src.core.profile import apply_profile
 
 # 设置默认编码为UTF-8
 if sys.platform.startswith('win'):
@@ -20,13 +20,27 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src
 
 def main():
     """主程序入口"""
-    # 创建应用
-    app = create_app()
+    # 先应用 autotune 生成的配置档，再导入读取这些环境变量的模块
+    apply_profile()
+    from src.webapp.app import create_app
     # 获取配置
     host = os.getenv('HOST', '127.0.0.1')
     port = int(os.getenv('PORT', 5000))
+    workers = int(os.getenv('WORKERS', 1))
+    threads = int(os.getenv('WORKER_THREADS', 4))
+    if workers > 1 and hasattr(os, 'fork'):
+        # 多进程：父进程加载模型后 fork 工作进程，共享模型内存；
+        # 前向计算会启动 OpenMP 线程池，fork 后不可用，留给各工作进程启动后预热
+        from src.webapp.prefork import PreforkServer
+        from src.core.sentiment.analyzer import get_analyzer
+        server = PreforkServer(create_app, host, port, workers, threads=threads,
+                               preload=lambda: get_analyzer().warm_up(forward=False))
+        server.run()
+        return
+    # 创建应用
+    app = create_app()
     # 启动服务器
-    serve(app, host=host, port=port)
+    serve(app, host=host, port=port, threads=threads)
 
 if __name__ == '__main__':
     main()
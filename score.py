@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+EmotionSpeak 离线批量打分
+
+流式读取 CSV 或 JSONL 输入（不整体载入内存），按块分发给进程池；每个工作进程只加载一次模型，
+块内用 analyze_batch 批量推理。结果按输入顺序写出为 JSONL、CSV 或 Parquet（Parquet 输出为
+目录，每个检查点写一个分片，需要 pandas 以及 pyarrow 或 fastparquet）。
+
+每处理 --checkpoint-every 行记录一次检查点（已完成行数和输出文件位置），任务被中断后
+用相同参数重新运行即从检查点继续；--restart 忽略检查点从头开始。
+
+用法:
+    python score.py reviews.csv -o scores.jsonl --text-column content --id-column review_id
+    python score.py reviews.jsonl -o scores.parquet --workers 4 --threads 2
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import signal
+import argparse
+import itertools
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_FORMAT = 1
+COLUMNS = ['row', 'id', 'label', 'confidence', 'positive', 'negative', 'intensity', 'intensity_level',
+           'compound', 'keywords', 'tier', 'error']
+INPUT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+OUTPUT_FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv', '.parquet': 'parquet'}
+
+# 工作进程内的分析器，由 _init_worker 创建
+_ANALYZER = None
+
+
+def _available_cores():
+    return len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+
+def iter_rows(path, input_format, text_column, id_column=None):
+    """逐行读取输入文件
+
+    Args:
+        path: 输入文件路径
+        input_format: csv 或 jsonl
+        text_column: 文本所在的列（字段）
+        id_column: 可选的主键列，原样写入输出
+
+    Yields:
+        tuple: (主键, 文本, 错误信息)
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if input_format == 'csv':
+            reader = csv.DictReader(f)
+            if text_column not in (reader.fieldnames or []):
+                raise ValueError(f"CSV 中没有列 {text_column}，可用列: {reader.fieldnames}")
+            for record in reader:
+                yield (record.get(id_column) if id_column else None), record.get(text_column), None
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield None, None, f'JSON 解析失败: {str(e)}'
+                continue
+            if not isinstance(record, dict):
+                yield None, None, '每行必须是 JSON 对象'
+                continue
+            yield (record.get(id_column) if id_column else None), record.get(text_column), None
+
+
+def _init_worker(threads, batch_size, max_length):
+    """工作进程初始化：限定算子线程数后加载并预热模型"""
+    # 必须在导入 config 之前设置
+    os.environ['SENTIMENT_NUM_THREADS'] = str(threads)
+    os.environ.setdefault('SENTIMENT_INTEROP_THREADS', '1')
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.core.sentiment.analyzer import SentimentAnalyzer
+
+    # 主进程被强制结束时工作进程会一直阻塞在任务队列上，发现父进程退出后自行退出
+    parent = os.getppid()
+
+    def watch_parent():
+        while os.getppid() == parent:
+            time.sleep(1)
+        os._exit(1)
+
+    threading.Thread(target=watch_parent, name='parent-watchdog', daemon=True).start()
+
+    global _ANALYZER
+    _ANALYZER = SentimentAnalyzer(batch_size=batch_size, cache=None, auto_initialize=False, max_length=max_length)
+    _ANALYZER.warm_up()
+
+
+def _flatten(result):
+    """把完整分析结果压平为输出列"""
+    emotion = result.get('emotion', {})
+    scores = emotion.get('emotion_scores', {})
+    keywords = dict.fromkeys(word for words in emotion.get('keywords', {}).values() for word in words)
+    return {
+        'label': emotion['base_emotion']['label'],
+        'confidence': round(emotion['base_emotion']['confidence'], 6),
+        'positive': round(scores['正面'], 6) if '正面' in scores else None,
+        'negative': round(scores['负面'], 6) if '负面' in scores else None,
+        'intensity': round(result.get('intensity', {}).get('intensity_score', 0.0), 4),
+        'intensity_level': result.get('intensity', {}).get('intensity_level'),
+        'compound': '、'.join(item['label'] for item in emotion.get('compound_emotions', [])),
+        'keywords': '、'.join(keywords),
+        'tier': result.get('tier'),
+    }
+
+
+def score_chunk(rows):
+    """在工作进程中给一块输入打分
+
+    Args:
+        rows: [(行号, 主键, 文本, 错误信息), ...]
+
+    Returns:
+        list: 与输入顺序一致的输出记录
+    """
+    records = []
+    valid = []
+    for row, row_id, text, error in rows:
+        record = dict.fromkeys(COLUMNS)
+        record.update({'row': row, 'id': row_id, 'error': error})
+        if error is None and not (isinstance(text, str) and text.strip()):
+            record['error'] = '文本为空'
+        if record['error'] is None:
+            valid.append((record, text))
+        records.append(record)
+    if not valid:
+        return records
+
+    texts = [text for _, text in valid]
+    try:
+        results = _ANALYZER.analyze_batch(texts)
+    except Exception:
+        results = None
+    for i, (record, text) in enumerate(valid):
+        try:
+            result = results[i] if results is not None else _ANALYZER.analyze(text)
+            record.update(_flatten(result))
+        except Exception as e:
+            record['error'] = str(e)
+    return records
+
+
+class JsonlWriter:
+    """追加写 JSONL，检查点记录文件字节数，恢复时截断到该位置"""
+
+    def __init__(self, path, state=None):
+        self.path = path
+        offset = (state or {}).get('bytes', 0)
+        if offset and (not os.path.exists(path) or os.path.getsize(path) < offset):
+            raise RuntimeError(f"输出文件 {path} 比检查点记录的短，无法继续，请加 --restart 重新开始")
+        self._file = open(path, 'r+b' if offset and os.path.exists(path) else 'wb')
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, records):
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8'))
+
+    def sync(self):
+        """落盘并返回检查点状态"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'bytes': self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter(JsonlWriter):
+    """追加写 CSV（首次写入时输出表头）"""
+
+    def __init__(self, path, state=None):
+        super().__init__(path, state)
+        self._text = _TextAdapter(self._file)
+        self._writer = csv.DictWriter(self._text, fieldnames=COLUMNS)
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+
+    def write(self, records):
+        self._writer.writerows(records)
+
+
+class _TextAdapter:
+    """供 csv.writer 写入二进制文件，保证 tell() 与写入的字节一致"""
+
+    def __init__(self, binary):
+        self._binary = binary
+
+    def write(self, text):
+        return self._binary.write(text.encode('utf-8'))
+
+
+class ParquetWriter:
+    """Parquet 数据集目录，每次检查点把缓冲的记录写成一个分片"""
+
+    def __init__(self, path, state=None):
+        import pandas
+        self._pandas = pandas
+        self.path = path
+        self.parts = (state or {}).get('parts', 0)
+        self._buffer = []
+        os.makedirs(path, exist_ok=True)
+        # 删除检查点之后写出的分片及未完成的临时文件
+        for name in os.listdir(path):
+            stem = name.split('.', 1)[0]
+            stale = stem.startswith('part-') and stem[5:].isdigit() and int(stem[5:]) >= self.parts
+            if name.endswith('.tmp') or stale:
+                os.remove(os.path.join(path, name))
+
+    def write(self, records):
+        self._buffer.extend(records)
+
+    def sync(self):
+        if self._buffer:
+            frame = self._pandas.DataFrame(self._buffer, columns=COLUMNS)
+            target = os.path.join(self.path, f'part-{self.parts:05d}.parquet')
+            frame.to_parquet(f'{target}.tmp', index=False)
+            os.replace(f'{target}.tmp', target)
+            self.parts += 1
+            self._buffer = []
+        return {'parts': self.parts}
+
+    def close(self):
+        pass
+
+
+WRITERS = {'jsonl': JsonlWriter, 'csv': CsvWriter, 'parquet': ParquetWriter}
+
+
+def _check_parquet_support():
+    import importlib.util
+    if importlib.util.find_spec('pandas') is None:
+        return 'Parquet 输出需要 pandas'
+    if importlib.util.find_spec('pyarrow') is None and importlib.util.find_spec('fastparquet') is None:
+        return 'Parquet 输出需要安装 pyarrow 或 fastparquet'
+    return None
+
+
+def _input_identity(path, args):
+    """用于校验检查点是否属于同一输入和参数"""
+    stat = os.stat(path)
+    return {
+        'input': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime': int(stat.st_mtime),
+        'input_format': args.input_format,
+        'text_column': args.text_column,
+        'id_column': args.id_column,
+        'output': os.path.abspath(args.output),
+        'output_format': args.output_format,
+    }
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    return state if state.get('format') == CHECKPOINT_FORMAT else None
+
+
+def save_checkpoint(path, state):
+    """原子写入检查点"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def run(args):
+    """执行批量打分，返回进程退出码"""
+    from tqdm import tqdm
+
+    checkpoint_path = args.checkpoint or f'{args.output}.ckpt.json'
+    identity = _input_identity(args.input, args)
+    state = None if args.restart else load_checkpoint(checkpoint_path)
+    if state is not None:
+        if state.get('identity') != identity:
+            print(f"[score] 检查点 {checkpoint_path} 与当前输入或参数不一致，如需从头开始请加 --restart")
+            return 2
+        if state.get('completed'):
+            print(f"[score] 该任务已完成（{state['rows_done']} 行），输出位于 {args.output}；如需重新打分请加 --restart")
+            return 0
+        print(f"[score] 从检查点继续：已完成 {state['rows_done']} 行")
+    rows_done = state['rows_done'] if state else 0
+    errors = state.get('errors', 0) if state else 0
+    elapsed_before = state.get('elapsed', 0.0) if state else 0.0
+
+    writer = WRITERS[args.output_format](args.output, state.get('writer') if state else None)
+    rows = itertools.islice(iter_rows(args.input, args.input_format, args.text_column, args.id_column), rows_done, None)
+    numbered = ((row, *item) for row, item in enumerate(rows, start=rows_done))
+    chunks = iter(lambda: list(itertools.islice(numbered, args.chunk_rows)), [])
+
+    def checkpoint(completed=False):
+        save_checkpoint(checkpoint_path, {
+            'format': CHECKPOINT_FORMAT,
+            'identity': identity,
+            'rows_done': rows_done,
+            'errors': errors,
+            'writer': writer.sync(),
+            'elapsed': round(elapsed_before + time.perf_counter() - started, 3),
+            'completed': completed,
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+
+    print(f"[score] {args.workers} 个工作进程 × {args.threads} 线程，每块 {args.chunk_rows} 行 -> "
+          f"{args.output}（{args.output_format}）")
+    started = time.perf_counter()
+    session_rows = 0
+    completed = False
+    # 同时在途的块数有上限，输入读取和乱序完成的结果缓冲都不会无限增长
+    max_inflight = args.workers * 2
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=get_context('spawn'),
+        initializer=_init_worker, initargs=(args.threads, args.batch_size, args.max_length)
+    )
+    progress = tqdm(initial=rows_done, unit='行', unit_scale=True, dynamic_ncols=True, smoothing=0.05)
+    try:
+        pending = {}
+        ready = {}
+        submitted = 0
+        next_chunk = 0
+        last_checkpoint = rows_done
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) + len(ready) < max_inflight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(score_chunk, chunk)] = submitted
+                submitted += 1
+            if not pending and not ready:
+                break
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ready[pending.pop(future)] = future.result()
+            # 按输入顺序写出，检查点之前的输出总是连续的
+            while next_chunk in ready:
+                records = ready.pop(next_chunk)
+                next_chunk += 1
+                writer.write(records)
+                rows_done += len(records)
+                session_rows += len(records)
+                errors += sum(1 for record in records if record['error'] is not None)
+                progress.update(len(records))
+                progress.set_postfix(errors=errors, refresh=False)
+                if rows_done - last_checkpoint >= args.checkpoint_every:
+                    checkpoint()
+                    last_checkpoint = rows_done
+        completed = True
+    except KeyboardInterrupt:
+        print('\n[score] 已中断，正在保存检查点...')
+        executor.shutdown(wait=False, cancel_futures=True)
+    finally:
+        progress.close()
+        checkpoint(completed=completed)
+        writer.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    seconds = time.perf_counter() - started
+    rate = session_rows / seconds if seconds > 0 else 0.0
+    status = '完成' if completed else '未完成（重新运行以继续）'
+    print(f"[score] {status}：本次 {session_rows} 行，用时 {seconds:.1f}s（{rate:.1f} 行/s）；"
+          f"累计 {rows_done} 行，其中 {errors} 行出错")
+    return 0 if completed else 130
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EmotionSpeak 离线批量打分')
+    parser.add_argument('input', help='输入文件（.csv 或 .jsonl）')
+    parser.add_argument('-o', '--output', required=True, help='输出路径（.jsonl、.csv 或 .parquet 目录）')
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help='输入格式，默认按扩展名判断')
+    parser.add_argument('--output-format', choices=sorted(WRITERS), help='输出格式，默认按扩展名判断')
+    parser.add_argument('--text-column', default='text', help='文本所在的列（字段）')
+    parser.add_argument('--id-column', help='原样写入输出的主键列（字段）')
+    parser.add_argument('--threads', type=int, default=1, help='每个工作进程的 torch 算子线程数')
+    parser.add_argument('--workers', type=int, help='工作进程数，默认为可用核心数 / --threads')
+    parser.add_argument('--batch-size', type=int, help='前向计算的批大小，默认取 INFERENCE_BATCH_SIZE')
+    parser.add_argument('--max-length', type=int, help='最大序列长度，默认取 SENTIMENT_MAX_LENGTH')
+    parser.add_argument('--chunk-rows', type=int, default=256, help='每次分发给工作进程的行数')
+    parser.add_argument('--checkpoint-every', type=int, default=10000, help='每处理多少行保存一次检查点')
+    parser.add_argument('--checkpoint', help='检查点文件路径，默认为 <输出路径>.ckpt.json')
+    parser.add_argument('--restart', action='store_true', help='忽略已有检查点，从头开始')
+    args = parser.parse_args()
+
+    extension = os.path.splitext(args.input)[1].lower()
+    args.input_format = args.input_format or INPUT_FORMATS.get(extension)
+    if args.input_format is None:
+        parser.error('无法从扩展名判断输入格式，请指定 --input-format')
+    extension = os.path.splitext(args.output.rstrip('/\\'))[1].lower()
+    args.output_format = args.output_format or OUTPUT_FORMATS.get(extension)
+    if args.output_format is None:
+        parser.error('无法从扩展名判断输出格式，请指定 --output-format')
+    if args.output_format == 'parquet':
+        problem = _check_parquet_support()
+        if problem:
+            parser.error(problem)
+    if not os.path.exists(args.input):
+        parser.error(f'输入文件不存在: {args.input}')
+    args.threads = max(1, args.threads)
+    args.workers = max(1, args.workers or _available_cores() // args.threads)
+    args.chunk_rows = max(1, args.chunk_rows)
+    args.checkpoint_every = max(args.chunk_rows, args.checkpoint_every)
+    # 超长评论字段不受 csv 模块默认 128KB 上限限制
+    csv.field_size_limit(2 ** 31 - 1)
+    # kill 时与 Ctrl+C 一样先保存检查点再退出
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
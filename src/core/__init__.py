@@ -1,26 +1,36 @@
 """
 EmotionSpeak 核心模块
 提供情感分析和语音合成功能
-"""
 
-from .sentiment.analyzer import SentimentAnalyzer
-from .tts_engine import TTSEngine
+各子模块在首次访问时才导入，导入本包不会加载 torch、transformers 或 edge-tts。
+"""
 
-# 可选导入音频播放器（如果pygame可用）
-try:
-    from .audio_player import AudioPlayer
+import importlib
 
-    _audio_available = True
-except ImportError:
-    AudioPlayer = None
-    _audio_available = False
+_LAZY_ATTRS = {
+    'SentimentAnalyzer': ('.sentiment.analyzer', 'SentimentAnalyzer'),
+    'TTSEngine': ('.tts_engine', 'TTSEngine'),
+    'AudioPlayer': ('.audio_player', 'AudioPlayer'),
+}
 
 __all__ = [
     'SentimentAnalyzer',
     'TTSEngine',
 ]
 
-if _audio_available:
-    __all__.append('AudioPlayer')
-
 __version__ = "2.0.0"
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _LAZY_ATTRS[name]
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), attr)
+    except ImportError:
+        # 可选的音频播放器（依赖 pygame）不可用时为 None
+        if name != 'AudioPlayer':
+            raise
+        value = None
+    globals()[name] = value
+    return value
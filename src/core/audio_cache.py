@@ -0,0 +1,245 @@
+"""
+内容寻址的语音缓存
+以 (文本, 语音, 语速, 音调, 风格, 引擎版本) 的稳定摘要为键。缓存目录本身就是索引：
+文件的修改时间记录最近访问时间（命中时刷新），超出磁盘配额时扫描目录按最近访问时间淘汰。
+共享同一目录的多个进程看到同一份状态，配额按所有进程合计；
+最近访问过的文件在宽限期内不会被删除，已返回给客户端的音频地址在此期间保持可用。
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .config import AUDIO_DIR, AUDIO_CACHE_MAX_BYTES, AUDIO_CACHE_GRACE_SECONDS
+
+# 合成参数的语义发生变化时递增，使旧缓存自然失效
+ENGINE_VERSION = 'edge-tts/1'
+
+# 默认的目录重新扫描间隔（秒）：期间其他进程写入的文件要到下次扫描才计入配额
+RESCAN_INTERVAL = 30
+# 超过该时间（秒）的 .part 文件视为崩溃进程遗留的临时文件
+_STALE_PART_SECONDS = 3600
+
+
+def audio_cache_key(text: str, voice: str, rate: Any = None, pitch: Any = None,
+                    style: Optional[str] = None, engine_version: str = ENGINE_VERSION) -> str:
+    """计算语音缓存键（跨进程、跨重启稳定）
+
+    Args:
+        text: 合成文本
+        voice: 语音 ID
+        rate: 语速
+        pitch: 音调
+        style: 风格
+        engine_version: 引擎版本
+
+    Returns:
+        str: SHA-256 十六进制摘要
+    """
+    payload = json.dumps([engine_version, text, voice, rate, pitch, style], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """带磁盘配额的语音文件缓存"""
+
+    def __init__(self, cache_dir: str = AUDIO_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 grace_seconds: float = AUDIO_CACHE_GRACE_SECONDS, rescan_interval: float = RESCAN_INTERVAL):
+        """初始化缓存
+
+        Args:
+            cache_dir: 音频文件目录
+            max_bytes: 磁盘配额（字节），0 表示不限制
+            grace_seconds: 最近访问后的保护时间（秒），期间即使超出配额也不删除
+            rescan_interval: 距上次扫描超过该时间（秒）时，提交文件后重新扫描目录
+                以计入其他进程写入的文件
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.grace_seconds = grace_seconds
+        self.rescan_interval = rescan_interval
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # 同一进程内同时只有一个线程扫描目录
+        self._sweep_lock = threading.Lock()
+        # 被固定的键及其引用计数，淘汰时跳过
+        self._pinned: Dict[str, int] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # 上次扫描得到的文件数和字节数，加上本进程此后提交的文件
+        self._files = 0
+        self._bytes = 0
+        self._scanned_at = 0.0
+
+    def path_for(self, key: str) -> str:
+        """缓存键对应的音频文件路径"""
+        return os.path.join(self.cache_dir, f'speech_{key[:32]}.mp3')
+
+    def temp_path(self, key: str) -> str:
+        """合成过程中使用的临时文件路径，完成后通过 commit 放入缓存"""
+        return f'{self.path_for(key)}.{uuid.uuid4().hex[:8]}.part'
+
+    def get(self, key: str) -> Optional[str]:
+        """查找已缓存的音频文件，命中时刷新其最近访问时间
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[str]: 文件路径，未命中时返回 None
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return path
+
+    def commit(self, key: str, tmp_path: str) -> str:
+        """把合成完成的临时文件放入缓存，超出配额时淘汰最久未访问的文件
+
+        Args:
+            key: 缓存键
+            tmp_path: 临时文件路径
+
+        Returns:
+            str: 缓存中的文件路径
+        """
+        path = self.path_for(key)
+        os.replace(tmp_path, path)
+        os.utime(path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._files += 1
+            self._bytes += size
+            stale = time.time() - self._scanned_at >= self.rescan_interval
+            over_quota = bool(self.max_bytes) and self._bytes > self.max_bytes
+        if stale or over_quota:
+            self._sweep(keep=key)
+        return path
+
+    @contextmanager
+    def pinned(self, keys: Iterable[str]) -> Iterator[None]:
+        """在 with 块内固定一组键，期间它们不会被本进程淘汰（可嵌套、可被多个调用方同时固定）"""
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._pinned[key] = self._pinned.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for key in keys:
+                    count = self._pinned.get(key, 0) - 1
+                    if count > 0:
+                        self._pinned[key] = count
+                    else:
+                        self._pinned.pop(key, None)
+
+    def discard(self, tmp_path: str):
+        """删除合成失败留下的临时文件"""
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def total_bytes(self) -> int:
+        """缓存目录中音频文件的总字节数（按需重新扫描）"""
+        self._refresh()
+        with self._lock:
+            return self._bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        self._refresh()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'files': self._files,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _refresh(self):
+        with self._lock:
+            stale = time.time() - self._scanned_at >= self.rescan_interval
+        if stale:
+            self._sweep()
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """列出目录中的音频文件 (最近访问时间, 大小, 路径)，顺带删除遗留的临时文件
+
+        所有 .mp3 文件都计入配额，包括早期版本以其他规则命名、不会再被命中的文件，它们按访问时间最先被淘汰。
+        """
+        files = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return files
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith('.mp3'):
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.endswith('.part') and now - stat.st_mtime > _STALE_PART_SECONDS:
+                self.discard(entry.path)
+        return files
+
+    def _sweep(self, keep: Optional[str] = None):
+        """扫描目录更新统计，超出配额时按最近访问时间淘汰
+
+        固定的键、keep 以及宽限期内访问过的文件不会被删除，因此在大量新文件涌入时
+        目录可能暂时超出配额。
+        """
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            files = self._scan()
+            now = time.time()
+            total = sum(size for _, size, _ in files)
+            count = len(files)
+            evicted = 0
+            if self.max_bytes and total > self.max_bytes:
+                with self._lock:
+                    protected = {self.path_for(key) for key in self._pinned}
+                if keep is not None:
+                    protected.add(self.path_for(keep))
+                for mtime, size, path in sorted(files):
+                    if total <= self.max_bytes or now - mtime < self.grace_seconds:
+                        break
+                    if path in protected:
+                        continue
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        # 已被其他进程删除
+                        pass
+                    else:
+                        evicted += 1
+                    total -= size
+                    count -= 1
+            with self._lock:
+                self._files = count
+                self._bytes = total
+                self._scanned_at = now
+                self._evictions += evicted
+        finally:
+            self._sweep_lock.release()
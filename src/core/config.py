@@ -5,9 +5,39 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 MODELS_DIR = os.path.join(DATA_DIR, 'models')
-AUDIO_DIR = os.path.join(DATA_DIR, 'audio')
+# 语音文件目录（可通过环境变量 AUDIO_DIR 指定，例如压测时使用临时目录）
+AUDIO_DIR = os.getenv('AUDIO_DIR') or os.path.join(DATA_DIR, 'audio')
 DICTS_DIR = os.path.join(DATA_DIR, 'dicts')
 UPLOADS_DIR = os.path.join(DATA_DIR, 'uploads')
 STOPWORDS_PATH = os.path.join(DATA_DIR, 'stopwords.txt')
+# 编译后的二进制情感词典（由 `python init.py build_lexicon` 生成）
+LEXICON_PATH = os.path.join(DICTS_DIR, 'lexicon.bin')
+# 打开编译词典时是否校验整个数据区的 CRC32（编译时总会校验一次）
+LEXICON_VERIFY = os.getenv('LEXICON_VERIFY', 'false').lower() == 'true'
+
+# 情感模型推理配置（可通过环境变量覆盖）
+INFERENCE_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', 32))
+MAX_SEQ_LENGTH = int(os.getenv('SENTIMENT_MAX_LENGTH', 512))
+# 推理算子线程数（0 表示由 torch / ONNX Runtime 自行决定）
+INTRA_OP_THREADS = int(os.getenv('SENTIMENT_NUM_THREADS', 0))
+INTER_OP_THREADS = int(os.getenv('SENTIMENT_INTEROP_THREADS', 0))
+# 模型精度：fp32 或 int8（Linear 层动态量化，仅 CPU）
+MODEL_PRECISION = os.getenv('SENTIMENT_PRECISION', 'fp32').lower()
+# 量化模型缓存（首次以 int8 启动或执行 `python init.py quantize` 时生成）
+QUANTIZED_MODEL_PATH = os.path.join(MODELS_DIR, 'quantized', 'erlangshen-roberta-330m-sentiment-int8.pt')
+# 推理后端：torch 或 onnx（ONNX 模型由 `python init.py export_onnx` 导出）
+INFERENCE_BACKEND = os.getenv('SENTIMENT_BACKEND', 'torch').lower()
+ONNX_MODEL_DIR = os.path.join(MODELS_DIR, 'onnx')
+
+# 语音缓存磁盘配额（MB，0 表示不限制）
+AUDIO_CACHE_MAX_BYTES = int(os.getenv('AUDIO_CACHE_MAX_MB', 1024)) * 1024 * 1024
+# 语音文件最近一次被访问后的保护时间（秒），期间即使超出配额也不会被淘汰
+AUDIO_CACHE_GRACE_SECONDS = int(os.getenv('AUDIO_CACHE_GRACE_SECONDS', 300))
+# 同时进行的 edge-tts 合成会话上限
+TTS_MAX_CONCURRENCY = int(os.getenv('TTS_MAX_CONCURRENCY', 8))
+# 长文本分句合成时同时合成的句子数
+TTS_SEGMENT_PARALLELISM = int(os.getenv('TTS_SEGMENT_PARALLELISM', 4))
+# 流式合成等待下一个音频数据块的最长时间（秒）
+TTS_STREAM_IDLE_TIMEOUT = float(os.getenv('TTS_STREAM_IDLE_TIMEOUT', 30))
 
 # 你可以根据需要继续添加其他路径 
\ No newline at end of file
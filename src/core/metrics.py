@@ -0,0 +1,249 @@
+"""
+运行指标
+进程内的直方图和回调指标，以 Prometheus 文本格式（0.0.4）从 /metrics 导出。
+
+热路径上每次观测只有一次二分查找和一次加锁的计数；缓存命中、队列深度等
+组件内部已有统计的数据通过回调在抓取时读取，不在请求路径上重复计数。
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from .tracing import current_trace
+
+# 延迟直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 批大小直方图的桶上限
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+class _Timer:
+    """with 语句计时，退出时把耗时（秒）记入直方图"""
+    __slots__ = ('_child', '_started')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._child.observe(time.perf_counter() - self._started)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ('_upper', '_counts', '_sum', '_lock', '_trace_name')
+
+    def __init__(self, buckets: Sequence[float], trace_name: Optional[str] = None):
+        self._upper = tuple(buckets)
+        # 不为空时观测值同时记入当前请求的追踪（诊断模式）
+        self._trace_name = trace_name
+        # 最后一个位置对应 +Inf
+        self._counts = [0] * (len(self._upper) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._upper, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+        if self._trace_name is not None:
+            trace = current_trace()
+            if trace is not None:
+                trace.add(self._trace_name, value)
+
+    def time(self) -> _Timer:
+        """返回计时上下文：with histogram.time(): ..."""
+        return _Timer(self)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for upper, count in zip(self._upper + (float('inf'),), counts):
+            cumulative += count
+            yield '_bucket', ('le', _format_value(upper)), cumulative
+        yield '_sum', None, total
+        yield '_count', None, cumulative
+
+
+class Metric:
+    """指标基类：按标签值区分子序列"""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self, key: Tuple[str, ...]):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """获取一组标签值对应的子序列（首次访问时创建）"""
+        # 热路径上标签值通常已是字符串，直接命中已有子序列
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child(key)
+        return child
+
+    def collect(self) -> Iterable[Tuple[str, Tuple[str, ...], Optional[Tuple[str, str]], float]]:
+        """产出 (名称后缀, 标签值, 附加标签, 数值)"""
+        for key, child in list(self._children.items()):
+            for suffix, extra, value in child.samples():
+                yield suffix, key, extra, value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, trace_prefix: Optional[str] = None):
+        """初始化直方图
+
+        Args:
+            name: 指标名称
+            documentation: 说明
+            labelnames: 标签名称
+            buckets: 桶上限
+            trace_prefix: 不为空时观测值也记入当前请求的追踪，阶段名为 "前缀.标签值"
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.trace_prefix = trace_prefix
+
+    def _new_child(self, key: Tuple[str, ...]):
+        trace_name = '.'.join((self.trace_prefix,) + key) if self.trace_prefix else None
+        return _HistogramChild(self.buckets, trace_name)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+
+class CallbackMetric:
+    """抓取时调用回调取值的指标，用于导出组件内部已有的统计"""
+
+    def __init__(self, name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                 callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        """初始化指标
+
+        Args:
+            name: 指标名称（counter 类型不含 _total 后缀）
+            documentation: 说明
+            metric_type: counter 或 gauge
+            labelnames: 标签名称
+            callback: 返回 (标签值, 数值) 序列的函数
+        """
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self):
+        suffix = '_total' if self.type == 'counter' else ''
+        for values, value in self.callback():
+            yield suffix, tuple(str(v) for v in values), None, value
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """注册指标，同名的回调指标会被替换（应用可能被重复创建）
+
+        Raises:
+            ValueError: 已存在同名的非回调指标时
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(existing, CallbackMetric):
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_callback(self, name: str, documentation: str, metric_type: str, labelnames: Sequence[str],
+                          callback: Callable[[], Iterable[Tuple[Sequence[str], float]]]) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, metric_type, labelnames, callback))
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出全部指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                samples = list(metric.collect())
+            except Exception as e:
+                print(f"指标 {metric.name} 采集失败: {str(e)}")
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for suffix, values, extra, value in samples:
+                lines.append(f'{metric.name}{suffix}{_format_labels(metric.labelnames, values, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# 情感分析各阶段耗时：hf_tokenize、forward、jieba、keywords、compound、intensity
+ANALYSIS_STAGE_SECONDS = REGISTRY.register(Histogram(
+    'emotionspeak_analysis_stage_seconds', '情感分析各阶段耗时（秒）', ('stage',), trace_prefix='analysis'
+))
+# 语音合成各阶段耗时：session_wait、first_byte、complete、audio_write、cache_commit
+TTS_STAGE_SECONDS = REGISTRY.register(Histogram(
+    'emotionspeak_tts_stage_seconds', '语音合成各阶段耗时（秒）', ('stage',), trace_prefix='tts'
+))
+# 每次前向计算的批大小
+FORWARD_BATCH_SIZE = REGISTRY.register(Histogram(
+    'emotionspeak_forward_batch_size', '每次前向计算的序列数', buckets=SIZE_BUCKETS
+))
+# HTTP 请求耗时（流式响应只计到响应头返回）
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'emotionspeak_http_request_duration_seconds', 'HTTP 请求处理耗时（秒）', ('endpoint', 'method', 'status')
+))
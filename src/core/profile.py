@@ -0,0 +1,127 @@
+"""
+服务配置档
+由 `python autotune.py` 在目标机器上实测生成，记录该机器上吞吐最高的线程数、微批大小和最大序列长度。
+配置档以环境变量的形式生效：main.py 在导入其他模块之前调用 apply_profile，
+已显式设置的环境变量优先于配置档。
+
+本模块不导入 config，否则其中由环境变量决定的常量会在配置档生效前被固定。
+"""
+
+import os
+import json
+import uuid
+import platform
+from typing import Dict, Optional
+
+PROFILE_FORMAT = 1
+
+# 默认配置档路径，可通过环境变量 SERVING_PROFILE 指定
+DEFAULT_PROFILE_PATH = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')), 'data', 'serving_profile.json'
+)
+
+# 配置档可以设置的环境变量
+PROFILE_SETTINGS = (
+    'SENTIMENT_NUM_THREADS',
+    'SENTIMENT_INTEROP_THREADS',
+    'SENTIMENT_MAX_LENGTH',
+    'INFERENCE_MAX_BATCH_SIZE',
+    'WORKER_THREADS',
+)
+
+
+def profile_path() -> str:
+    return os.getenv('SERVING_PROFILE') or DEFAULT_PROFILE_PATH
+
+
+def host_info() -> Dict:
+    """生成配置档的机器信息，用于提示配置档是否来自另一台机器"""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    return {
+        'hostname': platform.node(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': cores,
+    }
+
+
+def load_profile(path: Optional[str] = None) -> Optional[Dict]:
+    """读取配置档
+
+    Args:
+        path: 配置档路径，默认为 profile_path()
+
+    Returns:
+        Optional[Dict]: 配置档内容，不存在或格式不符时返回 None
+    """
+    path = path or profile_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"服务配置档读取失败: {str(e)}")
+        return None
+    if not isinstance(profile, dict) or profile.get('format') != PROFILE_FORMAT:
+        print("服务配置档格式不兼容，请重新执行 python autotune.py")
+        return None
+    return profile
+
+
+def save_profile(settings: Dict, metrics: Dict, path: Optional[str] = None, extra: Optional[Dict] = None) -> str:
+    """写入配置档（先写临时文件再原子替换）
+
+    Args:
+        settings: 环境变量名 -> 取值，只保留 PROFILE_SETTINGS 中的项
+        metrics: 该配置的实测吞吐和延迟
+        path: 配置档路径，默认为 profile_path()
+        extra: 其他需要记录的信息（如后端、语料规模）
+
+    Returns:
+        str: 配置档路径
+    """
+    path = path or profile_path()
+    profile = {
+        'format': PROFILE_FORMAT,
+        'host': host_info(),
+        'settings': {key: settings[key] for key in PROFILE_SETTINGS if key in settings},
+        'metrics': metrics,
+    }
+    if extra:
+        profile.update(extra)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def apply_profile(path: Optional[str] = None) -> Dict[str, str]:
+    """把配置档中的设置写入环境变量（已设置的环境变量保持不变）
+
+    Args:
+        path: 配置档路径，默认为 profile_path()
+
+    Returns:
+        Dict[str, str]: 实际生效的设置
+    """
+    profile = load_profile(path)
+    if profile is None:
+        return {}
+    cpu_count = profile.get('host', {}).get('cpu_count')
+    if cpu_count and cpu_count != host_info()['cpu_count']:
+        print(f"服务配置档生成于 {cpu_count} 核机器，与当前机器不同，建议重新执行 python autotune.py")
+    applied = {}
+    for key, value in profile.get('settings', {}).items():
+        if key in PROFILE_SETTINGS and key not in os.environ:
+            os.environ[key] = str(value)
+            applied[key] = str(value)
+    if applied:
+        print(f"已加载服务配置档: {', '.join(f'{k}={v}' for k, v in applied.items())}")
+    return applied
@@ -1,34 +1,80 @@
 """中文情感分析器"""
-import torch
 import os
 from typing import Dict, List, Optional, Union
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, BertTokenizer, BertForSequenceClassification
-from .base import BASIC_EMOTIONS, COMPOUND_EMOTIONS, INTENSITY_MODIFIERS
+from .base import BASIC_EMOTIONS, COMPOUND_EMOTIONS, INTENSITY_MODIFIERS, POSITIVE_EMOTIONS, NEGATIVE_EMOTIONS
+from .matcher import get_default_matcher
+from .context import AnalysisContext
+from .scheduler import InferenceScheduler, SchedulerTimeoutError
+from .cache import ResultCache, canonicalize_text
+from .backends import InferenceBackend, load_backend
+from ..metrics import ANALYSIS_STAGE_SECONDS, FORWARD_BATCH_SIZE
+from ..tracing import current_trace
 from ..tokenizer import ChineseTokenizer, EmotionTokenizer
+import copy
+import time
+import threading
 import traceback
-from ..config import MODELS_DIR
+from ..config import MODELS_DIR, INFERENCE_BATCH_SIZE, MAX_SEQ_LENGTH, INFERENCE_BACKEND
+
+# 情感分类模型
+MODEL_NAME = "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment"
 
 # 全局模型缓存
 _MODEL_CACHE = {
+    'backend': None,
     'model': None,
     'tokenizer': None,
     'is_initialized': False
 }
+# 保证并发初始化时模型只加载一次
+_MODEL_LOCK = threading.Lock()
+
+
+def install_backend(backend: Optional[InferenceBackend]):
+    """把推理后端放入全局模型缓存，所有分析器共享
+    
+    Args:
+        backend: 推理后端，为空时使用基础规则进行情感分析
+    """
+    _MODEL_CACHE['backend'] = backend
+    _MODEL_CACHE['model'] = backend.model if backend is not None else None
+    _MODEL_CACHE['tokenizer'] = backend.tokenizer if backend is not None else None
+    _MODEL_CACHE['is_initialized'] = True
 
 class SentimentAnalyzer:
     """中文情感分析器"""
     
-    def __init__(self):
-        """初始化情感分析器"""
+    def __init__(self, batch_size: Optional[int] = None, cache: Optional[ResultCache] = None,
+                 auto_initialize: bool = True, max_length: Optional[int] = None):
+        """初始化情感分析器
+        
+        Args:
+            batch_size: 批量推理时每个批次的最大文本数，默认读取配置
+            cache: 分析结果缓存，为空时不缓存
+            auto_initialize: 是否立即加载模型，为 False 时在首次分析或 warm_up 时加载
+            max_length: 模型输入的最大 token 数，超出部分截断，默认读取配置
+        """
         self._is_initialized = False
+        self.batch_size = batch_size or INFERENCE_BATCH_SIZE
+        self.max_length = max_length or MAX_SEQ_LENGTH
+        self.cache = cache
         self.model = None
         self.word_tokenizer = None
         self.tokenizer = EmotionTokenizer()
+        self.matcher = get_default_matcher()
+        # 微批调度器，启用后单条推理经由调度器合并执行
+        self.scheduler = None
+        # 级联模式的置信度阈值，为空时每条文本都经过模型
+        self.cascade_threshold = None
+        self._tier_counts = {'lexicon': 0, 'model': 0, 'rules': 0}
+        # 多个请求线程同时计数
+        self._tier_lock = threading.Lock()
         # 自动初始化
-        try:
-            self._initialize()
-        except Exception as e:
-            print(f"初始化警告: {str(e)}")
+        if auto_initialize:
+            try:
+                self._initialize()
+            except Exception as e:
+                print(f"初始化警告: {str(e)}")
         
     def _initialize(self):
         """初始化模型"""
@@ -38,46 +84,27 @@ class SentimentAnalyzer:
         try:
             # 检查全局缓存
             global _MODEL_CACHE
-            if not _MODEL_CACHE['is_initialized']:
-                print("正在加载情感分析模型...")
-                # 设置模型缓存目录
-                cache_dir = MODELS_DIR
-                os.makedirs(cache_dir, exist_ok=True)
+            with _MODEL_LOCK:
+                if not _MODEL_CACHE['is_initialized']:
+                    print("正在加载情感分析模型...")
+                    # 设置模型缓存目录
+                    cache_dir = MODELS_DIR
+                    os.makedirs(cache_dir, exist_ok=True)
                 
-                try:
-                    # 先尝试从本地加载
-                    _MODEL_CACHE['tokenizer'] = AutoTokenizer.from_pretrained(
-                        "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment",
-                        local_files_only=True,  # 只用本地
-                        cache_dir=cache_dir
-                    )
-                    _MODEL_CACHE['model'] = AutoModelForSequenceClassification.from_pretrained(
-                        "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment",
-                        local_files_only=True,
-                        cache_dir=cache_dir
-                    )
-                    _MODEL_CACHE['is_initialized'] = True
-                    print("模型从本地加载完成！")
-                except Exception as e:
-                    print(f"本地模型加载失败，正在尝试从网络下载: {str(e)}")
                     try:
-                        # 如果本地加载失败，尝试从网络下载
-                        _MODEL_CACHE['tokenizer'] = AutoTokenizer.from_pretrained(
-                            "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment",
-                            local_files_only=False,
-                            cache_dir=cache_dir
-                        )
-                        _MODEL_CACHE['model'] = AutoModelForSequenceClassification.from_pretrained(
-                            "IDEA-CCNL/Erlangshen-Roberta-330M-Sentiment",
-                            local_files_only=False,
-                            cache_dir=cache_dir
-                        )
-                        _MODEL_CACHE['is_initialized'] = True
-                        print("模型从网络下载完成！")
-                    except Exception as download_error:
-                        print(f"模型下载失败: {str(download_error)}")
-                        print("使用基础规则进行情感分析")
-                        _MODEL_CACHE['is_initialized'] = True
+                        # 先尝试从本地加载
+                        install_backend(load_backend(INFERENCE_BACKEND, MODEL_NAME, cache_dir, local_files_only=True))
+                        print("模型从本地加载完成！")
+                    except Exception as e:
+                        print(f"本地模型加载失败，正在尝试从网络下载: {str(e)}")
+                        try:
+                            # 如果本地加载失败，尝试从网络下载
+                            install_backend(load_backend(INFERENCE_BACKEND, MODEL_NAME, cache_dir, local_files_only=False))
+                            print("模型从网络下载完成！")
+                        except Exception as download_error:
+                            print(f"模型下载失败: {str(download_error)}")
+                            print("使用基础规则进行情感分析")
+                            install_backend(None)
             
             # 初始化分词器
             self.word_tokenizer = ChineseTokenizer()
@@ -98,6 +125,42 @@ class SentimentAnalyzer:
         """析构函数，确保资源被正确释放"""
         self._cleanup()
     
+    @property
+    def is_ready(self) -> bool:
+        """模型（或规则回退）是否已加载完成"""
+        return self._is_initialized and _MODEL_CACHE['is_initialized']
+    
+    def warm_up(self, text: str = "今天天气很好，心情不错！", forward: bool = True) -> Dict:
+        """加载模型并预热分词、词典和一次前向计算，使首个请求不必承担冷启动开销
+        
+        Args:
+            text: 预热使用的文本
+            forward: 是否执行前向计算；fork 前的父进程应传 False，
+                避免算子线程池在 fork 后的子进程中失效
+            
+        Returns:
+            Dict: 各阶段耗时（毫秒）及使用的后端
+        """
+        timings = {}
+        started = time.perf_counter()
+        self._initialize()
+        timings['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        
+        started = time.perf_counter()
+        context = self.create_context(text)
+        context.words_info
+        context.emotion_words
+        context.matches
+        timings['tokenize_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        
+        backend = _MODEL_CACHE['backend']
+        if backend is not None and forward:
+            started = time.perf_counter()
+            self._predict_scores([text])
+            timings['forward_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        timings['backend'] = backend.version if backend is not None else 'rules'
+        return timings
+    
     def analyze(self, text: str) -> Dict:
         """分析文本情感
         
@@ -114,147 +177,457 @@ class SentimentAnalyzer:
         if not text or not isinstance(text, str):
             raise ValueError("输入文本不能为空且必须是字符串类型")
             
+        if self.cache is None:
+            return self._analyze_context(self.create_context(text))
+        
+        cache_key = self._cache_key(text)
+        result = self.cache.get(cache_key)
+        if result is None:
+            context = self.create_context(text)
+            result = self._analyze_context(context)
+            if context.error is None and context.degraded is None:
+                self.cache.put(cache_key, result)
+        return self._copy_cached(result, text)
+    
+    def _cache_key(self, text: str) -> tuple:
+        """缓存键：规范化文本 + 模型版本 + 词典版本"""
+        backend = _MODEL_CACHE['backend']
+        model_version = f"{MODEL_NAME}:{backend.version}" if backend is not None else 'rules'
+        if backend is not None and self.cascade_threshold is not None:
+            model_version = f"{model_version}:cascade@{self.cascade_threshold}"
+        return (canonicalize_text(text), model_version, self.tokenizer.dict_loader.version)
+    
+    @staticmethod
+    def _copy_cached(result: Dict, text: str) -> Dict:
+        """复制缓存结果，避免调用方修改缓存内容，并回填原始文本"""
+        result = copy.deepcopy(result)
+        result['text'] = text
+        return result
+    
+    def create_context(self, text: str) -> AnalysisContext:
+        """创建单次分析的共享上下文
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            AnalysisContext: 分析上下文
+        """
+        # 创建分词器（如果还没有）
+        if self.word_tokenizer is None:
+            self.word_tokenizer = ChineseTokenizer()
+        return AnalysisContext(text, self.word_tokenizer, self.tokenizer, self.matcher)
+    
+    def _analyze_context(self, context: AnalysisContext) -> Dict:
+        """基于共享上下文完成情感分析，结果同时写入 context.result
+        
+        Args:
+            context: 分析上下文
+            
+        Returns:
+            Dict: 情感分析结果
+        """
+        if context.result is not None:
+            return context.result
+        text = context.text
         try:
             if not self._is_initialized:
                 self._initialize()
                 
             # 如果模型仍未初始化成功，则使用规则分析
-            if not _MODEL_CACHE['is_initialized'] or _MODEL_CACHE['model'] is None:
-                return self._rule_based_analysis(text)
+            if not _MODEL_CACHE['is_initialized'] or _MODEL_CACHE['backend'] is None:
+                context.result = self._rule_based_analysis(text, context)
+                self._record_tier(context, 'rules')
+                return context.result
+            
+            # 级联模式：词典足够确定时直接返回，不做前向计算
+            if context.scores is None and self.cascade_threshold is not None:
+                context.scores = self._lexicon_scores(context)
+                if context.scores is not None:
+                    context.tier = 'lexicon'
                 
             # 使用BERT分析基础情感
-            inputs = _MODEL_CACHE['tokenizer'](text, return_tensors="pt", truncation=True, max_length=512)
-            with torch.no_grad():
-                outputs = _MODEL_CACHE['model'](**inputs)
-                scores = torch.softmax(outputs.logits, dim=1)[0]
-                
-            # 获取基础情感标签和置信度
-            base_emotion_idx = scores.argmax().item()
-            base_confidence = scores[base_emotion_idx].item()
-            
-            # 分析情感强度
-            intensity = self._analyze_intensity(text)
-            # 保证 intensity 字段结构完整
-            intensity_score = intensity.get('intensity_score', 0.0)
-            def get_intensity_level(score):
-                if score >= 0.8:
-                    return '高'
-                elif score >= 0.5:
-                    return '中'
+            if context.scores is None:
+                if self.scheduler is not None and self.scheduler.running and not self._inline_requested():
+                    context.scores = self.scheduler.predict(text)
                 else:
-                    return '低'
-            intensity_level = intensity.get('intensity_level', get_intensity_level(intensity_score))
-            intensity = {
-                'intensity_score': intensity_score,
-                'intensity_level': intensity_level
-            }
+                    context.scores = self._predict_scores([text])[0]
+            context.result = self._build_result(context)
+            self._record_tier(context, context.tier or 'model')
+            
+        except SchedulerTimeoutError as e:
+            # 过载时的预期行为：不算分析失败，但结果中明确标出未经模型计算
+            context.degraded = str(e)
+            context.result = self._rule_based_analysis(text, context)
+            context.result['degraded'] = context.degraded
+            self._record_tier(context, 'rules')
+        except Exception as e:
+            print(f"情感分析失败: {str(e)}")
+            context.error = str(e)
+            context.result = self._rule_based_analysis(text, context)
+            self._record_tier(context, 'rules')
+        return context.result
+    
+    @staticmethod
+    def _inline_requested() -> bool:
+        """当前请求是否要求在本线程内推理（性能剖析时绕过微批调度器）"""
+        trace = current_trace()
+        return trace is not None and trace.inline
+    
+    def _record_tier(self, context: AnalysisContext, tier: str):
+        """记录给出结果的层级"""
+        context.tier = tier
+        context.result['tier'] = tier
+        with self._tier_lock:
+            self._tier_counts[tier] += 1
+    
+    def enable_cascade(self, threshold: float = 0.75):
+        """启用级联模式：先用词典打分，置信度达到阈值时直接返回，否则交给模型
+        
+        Args:
+            threshold: 词典打分的置信度阈值（0.5~1.0），越高越多文本交给模型
+        """
+        self.cascade_threshold = min(max(float(threshold), 0.5), 1.0)
+    
+    def disable_cascade(self):
+        """关闭级联模式，所有文本都经过模型"""
+        self.cascade_threshold = None
+    
+    def cascade_stats(self) -> Dict:
+        """返回各层级给出结果的次数及词典快速通道占比"""
+        with self._tier_lock:
+            counts = dict(self._tier_counts)
+        answered = counts['lexicon'] + counts['model']
+        return {
+            'enabled': self.cascade_threshold is not None,
+            'threshold': self.cascade_threshold,
+            'tiers': counts,
+            'lexicon_ratio': round(counts['lexicon'] / answered, 4) if answered else 0.0
+        }
+    
+    def _lexicon_scores(self, context: AnalysisContext) -> Optional[List[float]]:
+        """词典层打分
+        
+        正负面证据取情感词典（按情感类别极性汇总）与内置正负面词计数中的较大者，
+        乘以修饰词和标点带来的强度后做平滑：p = (正 + 0.5) / (正 + 负 + 1)。
+        含否定词或正负面证据同时出现时视为不确定。
+        
+        Args:
+            context: 分析上下文
             
-            # 使用分词器进行分词
-            words_info = self.word_tokenizer.tokenize(text)
-            
-            # 分析复合情感
-            compound_emotions = self._analyze_compound_emotions(text)
-            
-            # 分析情感关键词
-            emotion_keywords = self._analyze_emotion_keywords(text)
-            
-            # === 语音参数映射 ===
-            tts_param_map = {
-                '喜悦':  {'voice': '晓晓', 'pitch': 1.2, 'speed': 1.1, 'style': 'cheerful'},
-                '悲伤':  {'voice': '云希', 'pitch': 0.9, 'speed': 0.9, 'style': 'sad'},
-                '愤怒':  {'voice': '云泽', 'pitch': 1.3, 'speed': 1.2, 'style': 'angry'},
-                '恐惧':  {'voice': '晓伊', 'pitch': 1.1, 'speed': 1.0, 'style': 'fearful'},
-                '惊讶':  {'voice': '晓晓', 'pitch': 1.2, 'speed': 1.2, 'style': 'excited'},
-                '厌恶':  {'voice': '云希', 'pitch': 0.8, 'speed': 0.9, 'style': 'disgusted'},
-                '信任':  {'voice': '云野', 'pitch': 1.0, 'speed': 1.0, 'style': 'calm'},
-                '期待':  {'voice': '晓伊', 'pitch': 1.1, 'speed': 1.1, 'style': 'hopeful'},
-                '中性':  {'voice': '晓晓', 'pitch': 1.0, 'speed': 1.0, 'style': 'general'}
-            }
-            # 复合情感优先
-            voice_param = None
-            if compound_emotions:
-                comp = compound_emotions[0]['label']
-                if comp == '爱':
-                    voice_param = {'voice': '云野', 'pitch': 1.1, 'speed': 1.05, 'style': 'affectionate'}
-                elif comp == '恨':
-                    voice_param = {'voice': '云泽', 'pitch': 1.3, 'speed': 1.2, 'style': 'angry'}
-                elif comp == '焦虑':
-                    voice_param = {'voice': '晓伊', 'pitch': 1.0, 'speed': 1.15, 'style': 'anxious'}
-                elif comp == '内疚':
-                    voice_param = {'voice': '云希', 'pitch': 0.8, 'speed': 0.9, 'style': 'sad'}
-                elif comp == '骄傲':
-                    voice_param = {'voice': '晓晓', 'pitch': 1.2, 'speed': 1.1, 'style': 'proud'}
-                elif comp == '羞耻':
-                    voice_param = {'voice': '晓伊', 'pitch': 0.9, 'speed': 0.95, 'style': 'shy'}
-            if not voice_param:
-                base_label = '正面' if base_emotion_idx == 1 else '负面'
-                # 只映射正面/负面为中性，其他映射
-                if base_label == '正面':
-                    voice_param = tts_param_map.get('喜悦', tts_param_map['中性'])
-                elif base_label == '负面':
-                    voice_param = tts_param_map.get('悲伤', tts_param_map['中性'])
-                else:
-                    voice_param = tts_param_map['中性']
-            # 强度微调
-            voice_param = voice_param.copy()
-            voice_param['pitch'] *= intensity_score
-            voice_param['speed'] *= intensity_score
-            # 统一字段
-            voice_info = {
-                'voice': voice_param['voice'],
-                'pitch': round(voice_param['pitch'], 2),
-                'speed': round(voice_param['speed'], 2),
-                'volume': 1.0,
-                'style': voice_param['style']
-            }
+        Returns:
+            Optional[List[float]]: 置信度达到阈值时返回 [负面, 正面] 概率，否则返回 None
+        """
+        matches = context.matches
+        if matches.has('negation'):
+            return None
+        
+        positive = negative = 0.0
+        for _, emotions in context.emotion_words:
+            positive += sum(score for emotion, score in emotions.items() if emotion in POSITIVE_EMOTIONS)
+            negative += sum(score for emotion, score in emotions.items() if emotion in NEGATIVE_EMOTIONS)
+        positive = max(positive, len(matches.keywords('positive')))
+        negative = max(negative, len(matches.keywords('negative')))
+        if (positive and negative) or not (positive or negative):
+            return None
+        
+        strength = max(self._analyze_intensity(context.text, context)['intensity_score'], 1.0)
+        positive *= strength
+        negative *= strength
+        score = (positive + 0.5) / (positive + negative + 1.0)
+        if max(score, 1.0 - score) < self.cascade_threshold:
+            return None
+        return [1.0 - score, score]
+    
+    def enable_scheduler(self, max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                         latency_budget_ms: Optional[float] = None) -> InferenceScheduler:
+        """启用微批调度，并发调用 analyze 时共享同一次前向计算
+        
+        Args:
+            max_batch_size: 单个微批次的最大请求数
+            max_wait_ms: 凑批最长等待毫秒数
+            latency_budget_ms: 单个请求的延迟预算（毫秒）
             
-            return {
-                'text': text,
-                'emotion': {
-                    'base_emotion': {
-                        'label': '正面' if base_emotion_idx == 1 else '负面',
-                        'confidence': base_confidence,
-                        'score': scores[1].item()
-                    },
-                    'compound_emotions': compound_emotions,
-                    'keywords': emotion_keywords,
-                    'emotion_scores': {
-                        '正面': scores[1].item(),
-                        '负面': scores[0].item()
-                    }
-                },
-                'intensity': intensity,
-                'words': words_info,
-                'context': {
-                    'context_type': '',
-                    'keywords': [{'text': w['word']} for w in words_info] if words_info else []
-                },
-                'voice': voice_info
-            }
+        Returns:
+            InferenceScheduler: 已启动的调度器
+        """
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.scheduler = InferenceScheduler(
+            self._predict_scores,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            latency_budget_ms=latency_budget_ms
+        )
+        self.scheduler.start()
+        return self.scheduler
+    
+    def disable_scheduler(self):
+        """停止微批调度，恢复逐请求推理"""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+    
+    def _predict_scores(self, texts: List[str]) -> List[List[float]]:
+        """批量计算模型情感概率
+        
+        重复文本只推理一次；其余文本按 token 长度排序后分桶，
+        每个批次只填充到该批最长序列，softmax 在整个批次上一次完成。
+        
+        Args:
+            texts: 输入文本列表
             
+        Returns:
+            List[List[float]]: 每个文本的 [负面, 正面] 概率，顺序与输入一致
+        """
+        tokenizer = _MODEL_CACHE['tokenizer']
+        unique_texts = list(dict.fromkeys(texts))
+        with ANALYSIS_STAGE_SECONDS.labels('hf_tokenize').time():
+            encodings = tokenizer(unique_texts, truncation=True, max_length=self.max_length)
+        features = [{key: encodings[key][i] for key in encodings.keys()} for i in range(len(unique_texts))]
+        score_map = dict(zip(unique_texts, self._forward_features(features)))
+        return [score_map[text] for text in texts]
+    
+    def _forward_features(self, features: List[Dict[str, List[int]]]) -> List[List[float]]:
+        """对已编码的序列做分桶批量前向计算
+        
+        Args:
+            features: 每条序列的编码（input_ids、attention_mask 等）
+            
+        Returns:
+            List[List[float]]: 每条序列的 [负面, 正面] 概率，顺序与输入一致
+        """
+        backend = _MODEL_CACHE['backend']
+        order = sorted(range(len(features)), key=lambda i: len(features[i]['input_ids']))
+        forward_seconds = ANALYSIS_STAGE_SECONDS.labels('forward')
+        
+        results = [None] * len(features)
+        for start in range(0, len(order), self.batch_size):
+            bucket = order[start:start + self.batch_size]
+            FORWARD_BATCH_SIZE.observe(len(bucket))
+            with forward_seconds.time():
+                scores = backend.forward([features[i] for i in bucket])
+            for i, row in zip(bucket, scores):
+                results[i] = row
+        return results
+    
+    def analyze_long(self, text: str, window_size: Optional[int] = None, overlap: Optional[int] = None,
+                     return_windows: bool = False) -> Dict:
+        """长文档情感分析
+        
+        analyze 只看前 max_length 个 token；这里把全文切成相互重叠的窗口，
+        所有窗口在一次批量前向计算中打分，再按窗口 token 数加权平均得到文档级分数。
+        
+        Args:
+            text: 输入文本
+            window_size: 每个窗口的 token 数（含特殊 token），默认且最大为 max_length
+            overlap: 相邻窗口重叠的 token 数，默认为窗口正文长度的 1/4
+            return_windows: 是否在结果中附带每个窗口的分数
+            
+        Returns:
+            Dict: 与 analyze 结构相同的结果，另含 document（及 windows）字段
+            
+        Raises:
+            ValueError: 当输入文本为空或无效时
+        """
+        if not text or not isinstance(text, str):
+            raise ValueError("输入文本不能为空且必须是字符串类型")
+        if not self._is_initialized:
+            self._initialize()
+        if not _MODEL_CACHE['is_initialized'] or _MODEL_CACHE['backend'] is None:
+            return self.analyze(text)
+        
+        context = self.create_context(text)
+        try:
+            tokenizer = _MODEL_CACHE['tokenizer']
+            special_tokens = tokenizer.num_special_tokens_to_add()
+            window_size = max(special_tokens + 1, min(int(window_size or self.max_length), self.max_length))
+            body_size = window_size - special_tokens
+            overlap = min(max(0, int(body_size // 4 if overlap is None else overlap)), body_size - 1)
+            
+            # 由快速分词器直接切出带特殊 token 的重叠窗口
+            encodings = tokenizer(
+                text, truncation=True, max_length=window_size, stride=overlap,
+                return_overflowing_tokens=True, return_offsets_mapping=True
+            )
+            offsets = encodings.pop('offset_mapping')
+            encodings.pop('overflow_to_sample_mapping', None)
+            features = [
+                {key: encodings[key][i] for key in encodings.keys()}
+                for i in range(len(encodings['input_ids']))
+            ]
+            window_scores = self._forward_features(features)
+            
+            # 按窗口正文 token 数加权平均
+            weights = [max(1, len(feature['input_ids']) - special_tokens) for feature in features]
+            total = sum(weights)
+            context.scores = [
+                sum(w * row[k] for w, row in zip(weights, window_scores)) / total
+                for k in range(len(window_scores[0]))
+            ]
+            context.result = result = self._build_result(context)
+            self._record_tier(context, 'model')
         except Exception as e:
-            print(f"情感分析失败: {str(e)}")
-            return self._rule_based_analysis(text)
+            print(f"长文档情感分析失败: {str(e)}")
+            return self.analyze(text)
+        
+        result['document'] = {
+            'windows': len(features),
+            'window_size': window_size,
+            'overlap': overlap,
+            'aggregation': 'token_weighted_mean'
+        }
+        if return_windows:
+            windows = []
+            for index, (spans, row) in enumerate(zip(offsets, window_scores)):
+                # 特殊 token 的偏移为 (0, 0)
+                spans = [span for span in spans if span[1] > span[0]]
+                windows.append({
+                    'index': index,
+                    'char_start': spans[0][0] if spans else 0,
+                    'char_end': spans[-1][1] if spans else 0,
+                    'tokens': weights[index],
+                    'label': '正面' if row[1] >= row[0] else '负面',
+                    'emotion_scores': {'正面': row[1], '负面': row[0]}
+                })
+            result['windows'] = windows
+        return result
     
-    def _rule_based_analysis(self, text: str) -> Dict:
+    def _build_result(self, context: AnalysisContext) -> Dict:
+        """根据模型概率和上下文中的分词、关键词结果组装完整分析结果
+        
+        Args:
+            context: 已写入模型概率（[负面, 正面]）的分析上下文
+            
+        Returns:
+            Dict: 情感分析结果
+        """
+        text = context.text
+        scores = context.scores
+        # 获取基础情感标签和置信度
+        base_emotion_idx = max(range(len(scores)), key=scores.__getitem__)
+        base_confidence = scores[base_emotion_idx]
+        
+        # 使用分词器进行分词（先于各规则阶段完成，分阶段耗时不含 jieba 分词）
+        words_info = context.words_info
+        
+        # 分析情感强度
+        with ANALYSIS_STAGE_SECONDS.labels('intensity').time():
+            intensity = self._analyze_intensity(text, context)
+        # 保证 intensity 字段结构完整
+        intensity_score = intensity.get('intensity_score', 0.0)
+        def get_intensity_level(score):
+            if score >= 0.8:
+                return '高'
+            elif score >= 0.5:
+                return '中'
+            else:
+                return '低'
+        intensity_level = intensity.get('intensity_level', get_intensity_level(intensity_score))
+        intensity = {
+            'intensity_score': intensity_score,
+            'intensity_level': intensity_level
+        }
+        
+        # 分析复合情感
+        with ANALYSIS_STAGE_SECONDS.labels('compound').time():
+            compound_emotions = self._analyze_compound_emotions(text, context)
+        
+        # 分析情感关键词
+        with ANALYSIS_STAGE_SECONDS.labels('keywords').time():
+            emotion_keywords = self._analyze_emotion_keywords(text, context)
+        
+        # === 语音参数映射 ===
+        tts_param_map = {
+            '喜悦':  {'voice': '晓晓', 'pitch': 1.2, 'speed': 1.1, 'style': 'cheerful'},
+            '悲伤':  {'voice': '云希', 'pitch': 0.9, 'speed': 0.9, 'style': 'sad'},
+            '愤怒':  {'voice': '云泽', 'pitch': 1.3, 'speed': 1.2, 'style': 'angry'},
+            '恐惧':  {'voice': '晓伊', 'pitch': 1.1, 'speed': 1.0, 'style': 'fearful'},
+            '惊讶':  {'voice': '晓晓', 'pitch': 1.2, 'speed': 1.2, 'style': 'excited'},
+            '厌恶':  {'voice': '云希', 'pitch': 0.8, 'speed': 0.9, 'style': 'disgusted'},
+            '信任':  {'voice': '云野', 'pitch': 1.0, 'speed': 1.0, 'style': 'calm'},
+            '期待':  {'voice': '晓伊', 'pitch': 1.1, 'speed': 1.1, 'style': 'hopeful'},
+            '中性':  {'voice': '晓晓', 'pitch': 1.0, 'speed': 1.0, 'style': 'general'}
+        }
+        # 复合情感优先
+        voice_param = None
+        if compound_emotions:
+            comp = compound_emotions[0]['label']
+            if comp == '爱':
+                voice_param = {'voice': '云野', 'pitch': 1.1, 'speed': 1.05, 'style': 'affectionate'}
+            elif comp == '恨':
+                voice_param = {'voice': '云泽', 'pitch': 1.3, 'speed': 1.2, 'style': 'angry'}
+            elif comp == '焦虑':
+                voice_param = {'voice': '晓伊', 'pitch': 1.0, 'speed': 1.15, 'style': 'anxious'}
+            elif comp == '内疚':
+                voice_param = {'voice': '云希', 'pitch': 0.8, 'speed': 0.9, 'style': 'sad'}
+            elif comp == '骄傲':
+                voice_param = {'voice': '晓晓', 'pitch': 1.2, 'speed': 1.1, 'style': 'proud'}
+            elif comp == '羞耻':
+                voice_param = {'voice': '晓伊', 'pitch': 0.9, 'speed': 0.95, 'style': 'shy'}
+        if not voice_param:
+            base_label = '正面' if base_emotion_idx == 1 else '负面'
+            # 只映射正面/负面为中性，其他映射
+            if base_label == '正面':
+                voice_param = tts_param_map.get('喜悦', tts_param_map['中性'])
+            elif base_label == '负面':
+                voice_param = tts_param_map.get('悲伤', tts_param_map['中性'])
+            else:
+                voice_param = tts_param_map['中性']
+        # 强度微调
+        voice_param = voice_param.copy()
+        voice_param['pitch'] *= intensity_score
+        voice_param['speed'] *= intensity_score
+        # 统一字段
+        voice_info = {
+            'voice': voice_param['voice'],
+            'pitch': round(voice_param['pitch'], 2),
+            'speed': round(voice_param['speed'], 2),
+            'volume': 1.0,
+            'style': voice_param['style']
+        }
+        
+        return {
+            'text': text,
+            'emotion': {
+                'base_emotion': {
+                    'label': '正面' if base_emotion_idx == 1 else '负面',
+                    'confidence': base_confidence,
+                    'score': scores[1]
+                },
+                'compound_emotions': compound_emotions,
+                'keywords': emotion_keywords,
+                'emotion_scores': {
+                    '正面': scores[1],
+                    '负面': scores[0]
+                }
+            },
+            'intensity': intensity,
+            'words': words_info,
+            'context': {
+                'context_type': '',
+                'keywords': [{'text': w['word']} for w in words_info] if words_info else []
+            },
+            'voice': voice_info
+        }
+    
+    def _rule_based_analysis(self, text: str, context: Optional[AnalysisContext] = None) -> Dict:
         """使用规则进行简单情感分析
         
         Args:
             text: 输入文本
+            context: 分析上下文，为空时新建
             
         Returns:
             Dict: 情感分析结果
         """
-        # 创建分词器（如果还没有）
-        if self.word_tokenizer is None:
-            self.word_tokenizer = ChineseTokenizer()
+        if context is None:
+            context = self.create_context(text)
+        matches = context.matches
             
         # 使用规则进行情感分析
-        positive_keywords = ['喜欢', '开心', '高兴', '快乐', '兴奋', '棒', '好', '优秀', '成功', '爱']
-        negative_keywords = ['讨厌', '难过', '伤心', '悲伤', '失望', '糟糕', '差', '不好', '失败', '恨']
-        
-        positive_count = sum(1 for word in positive_keywords if word in text)
-        negative_count = sum(1 for word in negative_keywords if word in text)
+        positive_count = len(matches.keywords('positive'))
+        negative_count = len(matches.keywords('negative'))
         
         # 判断情感倾向
         if positive_count > negative_count:
@@ -271,10 +644,10 @@ class SentimentAnalyzer:
             score = 0.5
             
         # 分析情感强度
-        intensity = self._analyze_intensity(text)
+        intensity = self._analyze_intensity(text, context)
         
         # 分词
-        words_info = self.word_tokenizer.tokenize(text)
+        words_info = context.words_info
             
         return {
             'text': text,
@@ -349,32 +722,35 @@ class SentimentAnalyzer:
             }
         }
     
-    def _analyze_intensity(self, text: str) -> Dict:
+    def _analyze_intensity(self, text: str, context: Optional[AnalysisContext] = None) -> Dict:
         """分析情感强度
         
         Args:
             text: 输入文本
+            context: 分析上下文，为空时新建
             
         Returns:
             Dict: 情感强度分析结果
         """
         try:
+            if context is None:
+                context = self.create_context(text)
+            matches = context.matches
+                
             # 检查修饰词
             intensity_score = 1.0
-            modifiers = []
-            for modifier, factor in INTENSITY_MODIFIERS.items():
-                if modifier in text:
-                    intensity_score *= factor
-                    modifiers.append(modifier)
+            modifiers = matches.keywords('modifier')
+            for modifier in modifiers:
+                intensity_score *= INTENSITY_MODIFIERS[modifier]
             
             # 检查标点符号
-            if '！' in text or '!' in text:
+            if matches.has('punct', '!'):
                 intensity_score *= 1.2
-            if '？' in text or '?' in text:
+            if matches.has('punct', '?'):
                 intensity_score *= 0.9
                 
             # 检查重复
-            words = self.word_tokenizer.get_words(text)
+            words = context.words
             has_repetition = any(words[i] == words[i+1] for i in range(len(words)-1))
             if has_repetition:
                 intensity_score *= 1.1
@@ -393,34 +769,39 @@ class SentimentAnalyzer:
                 'has_repetition': False
             }
     
-    def _analyze_compound_emotions(self, text: str) -> List[Dict]:
+    def _analyze_compound_emotions(self, text: str, context: Optional[AnalysisContext] = None) -> List[Dict]:
         """分析复合情感
         
         Args:
             text: 输入文本
+            context: 分析上下文，为空时新建
             
         Returns:
             List[Dict]: 复合情感列表
         """
         try:
+            if context is None:
+                context = self.create_context(text)
+            matches = context.matches
+                
             compound_emotions = []
-            for emotion_id, emotion_info in COMPOUND_EMOTIONS.items():
-                # 检查关键词
-                if any(keyword in text for keyword in emotion_info['keywords']):
-                    # 计算基础情感得分
-                    base_scores = []
-                    for component in emotion_info['components']:
-                        if any(keyword in text for keyword in BASIC_EMOTIONS[component]['keywords']):
-                            base_scores.append(1.0)
-                        else:
-                            base_scores.append(0.0)
-                    
-                    if base_scores:
-                        compound_emotions.append({
-                            'label': emotion_info['label'],
-                            'components': emotion_info['components'],
-                            'confidence': sum(base_scores) / len(base_scores)
-                        })
+            # 只遍历命中了关键词的复合情感
+            for emotion_id in matches.keys('compound'):
+                emotion_info = COMPOUND_EMOTIONS[emotion_id]
+                # 计算基础情感得分
+                base_scores = []
+                for component in emotion_info['components']:
+                    if matches.has('basic', component):
+                        base_scores.append(1.0)
+                    else:
+                        base_scores.append(0.0)
+                
+                if base_scores:
+                    compound_emotions.append({
+                        'label': emotion_info['label'],
+                        'components': emotion_info['components'],
+                        'confidence': sum(base_scores) / len(base_scores)
+                    })
             
             return compound_emotions
             
@@ -428,29 +809,30 @@ class SentimentAnalyzer:
             print(f"复合情感分析失败: {str(e)}")
             return []
     
-    def _analyze_emotion_keywords(self, text: str) -> Dict[str, List[str]]:
+    def _analyze_emotion_keywords(self, text: str, context: Optional[AnalysisContext] = None) -> Dict[str, List[str]]:
         """分析情感关键词
         
         Args:
             text: 输入文本
+            context: 分析上下文，为空时新建
             
         Returns:
             Dict[str, List[str]]: 情感关键词列表
         """
         try:
+            if context is None:
+                context = self.create_context(text)
+            matches = context.matches
+                
             emotion_keywords = {}
             
             # 分析基本情感关键词
-            for emotion_id, emotion_info in BASIC_EMOTIONS.items():
-                found_keywords = [keyword for keyword in emotion_info['keywords'] if keyword in text]
-                if found_keywords:
-                    emotion_keywords[emotion_info['label']] = found_keywords
+            for emotion_id in matches.keys('basic'):
+                emotion_keywords[BASIC_EMOTIONS[emotion_id]['label']] = matches.keywords('basic', emotion_id)
             
             # 分析复合情感关键词
-            for emotion_id, emotion_info in COMPOUND_EMOTIONS.items():
-                found_keywords = [keyword for keyword in emotion_info['keywords'] if keyword in text]
-                if found_keywords:
-                    emotion_keywords[emotion_info['label']] = found_keywords
+            for emotion_id in matches.keys('compound'):
+                emotion_keywords[COMPOUND_EMOTIONS[emotion_id]['label']] = matches.keywords('compound', emotion_id)
             
             return emotion_keywords
             
@@ -472,20 +854,65 @@ class SentimentAnalyzer:
         """
         if not texts or not isinstance(texts, list):
             raise ValueError("输入文本列表不能为空且必须是列表类型")
+        if not all(text and isinstance(text, str) for text in texts):
+            raise ValueError("输入文本不能为空且必须是字符串类型")
             
-        return [self.analyze(text) for text in texts]
+        try:
+            if not self._is_initialized:
+                self._initialize()
+            if not _MODEL_CACHE['is_initialized'] or _MODEL_CACHE['backend'] is None:
+                return [self.analyze(text) for text in texts]
+            
+            # 先查缓存，只对未命中的文本做推理
+            results = [None] * len(texts)
+            cache_keys = [None] * len(texts)
+            if self.cache is not None:
+                for i, text in enumerate(texts):
+                    cache_keys[i] = self._cache_key(text)
+                    cached = self.cache.get(cache_keys[i])
+                    if cached is not None:
+                        results[i] = self._copy_cached(cached, text)
+            pending = [i for i, result in enumerate(results) if result is None]
+            contexts = {i: self.create_context(texts[i]) for i in pending}
+            
+            # 级联模式下词典足够确定的文本不参与前向计算
+            if self.cascade_threshold is not None:
+                for context in contexts.values():
+                    context.scores = self._lexicon_scores(context)
+                    if context.scores is not None:
+                        context.tier = 'lexicon'
+            uncertain = [i for i in pending if contexts[i].scores is None]
+            
+            # 整批共享前向计算，后处理仍逐条进行
+            batch_scores = self._predict_scores([texts[i] for i in uncertain]) if uncertain else []
+            for i, scores in zip(uncertain, batch_scores):
+                contexts[i].scores = scores
+        except Exception as e:
+            print(f"批量情感分析失败: {str(e)}")
+            return [self.analyze(text) for text in texts]
+        
+        for i in pending:
+            context = contexts[i]
+            results[i] = self._analyze_context(context)
+            if self.cache is not None and context.error is None:
+                self.cache.put(cache_keys[i], results[i])
+                results[i] = self._copy_cached(results[i], texts[i])
+        return results
     
-    def analyze_compound(self, text: str) -> Dict[str, float]:
+    def analyze_compound(self, text: str, context: Optional[AnalysisContext] = None) -> Dict[str, float]:
         """分析复合情感
         
         Args:
             text: 输入文本
+            context: 分析上下文，已有分析结果时直接复用
             
         Returns:
             Dict[str, float]: 复合情感分析结果
         """
         # 获取基础情感分数
-        base_scores = self.analyze(text)
+        if context is None:
+            context = self.create_context(text)
+        base_scores = self._analyze_context(context)
         if not base_scores:
             return {}
             
@@ -500,16 +927,19 @@ class SentimentAnalyzer:
             
         return compound_scores
     
-    def analyze_intensity(self, text: str) -> float:
+    def analyze_intensity(self, text: str, context: Optional[AnalysisContext] = None) -> float:
         """分析情感强度
         
         Args:
             text: 输入文本
+            context: 分析上下文，为空时新建
             
         Returns:
             float: 情感强度分数
         """
-        emotion_words = self.tokenizer.get_emotion_words(text)
+        if context is None:
+            context = self.create_context(text)
+        emotion_words = context.emotion_words
         if not emotion_words:
             return 0.0
         intensity = 0.0
@@ -517,16 +947,19 @@ class SentimentAnalyzer:
             intensity += sum(emotions.values())
         return min(1.0, intensity / len(emotion_words))
     
-    def analyze_keywords(self, text: str) -> List[Dict[str, Union[str, float]]]:
+    def analyze_keywords(self, text: str, context: Optional[AnalysisContext] = None) -> List[Dict[str, Union[str, float]]]:
         """分析情感关键词
         
         Args:
             text: 输入文本
+            context: 分析上下文，为空时新建
             
         Returns:
             List[Dict[str, Union[str, float]]]: 情感关键词列表
         """
-        emotion_words = self.tokenizer.get_emotion_words(text)
+        if context is None:
+            context = self.create_context(text)
+        emotion_words = context.emotion_words
         if not emotion_words:
             return []
         keywords = []
@@ -550,9 +983,26 @@ class SentimentAnalyzer:
         Returns:
             Dict: 详细分析结果
         """
+        if not text or not isinstance(text, str):
+            raise ValueError("输入文本不能为空且必须是字符串类型")
+        # 各项分析共用同一上下文：只分词一次、只做一次前向计算
+        context = self.create_context(text)
         return {
-            'emotions': self.analyze(text),
-            'compound_emotions': self.analyze_compound(text),
-            'intensity': self.analyze_intensity(text),
-            'keywords': self.analyze_keywords(text)
-        } 
\ No newline at end of file
+            'emotions': self._analyze_context(context),
+            'compound_emotions': self.analyze_compound(text, context),
+            'intensity': self.analyze_intensity(text, context),
+            'keywords': self.analyze_keywords(text, context)
+        } 
+
+
+_DEFAULT_ANALYZER: Optional[SentimentAnalyzer] = None
+_DEFAULT_ANALYZER_LOCK = threading.Lock()
+
+
+def get_analyzer() -> SentimentAnalyzer:
+    """获取进程内共享的情感分析器（模型在首次分析或 warm_up 时加载）"""
+    global _DEFAULT_ANALYZER
+    with _DEFAULT_ANALYZER_LOCK:
+        if _DEFAULT_ANALYZER is None:
+            _DEFAULT_ANALYZER = SentimentAnalyzer(auto_initialize=False)
+        return _DEFAULT_ANALYZER
@@ -0,0 +1,329 @@
+"""情感模型推理后端
+
+分析器只依赖 InferenceBackend 接口：输入已编码的序列，输出每条序列的 [负面, 正面] 概率。
+TorchBackend 使用 transformers 的 PyTorch 模型（支持 int8 动态量化），
+OnnxBackend 使用 ONNX Runtime 运行导出的计算图，启动时不需要导入 torch。
+"""
+import os
+import json
+import inspect
+from typing import Dict, List, Optional
+from ..config import MODEL_PRECISION, ONNX_MODEL_DIR, INTRA_OP_THREADS, INTER_OP_THREADS
+
+ONNX_MODEL_FILE = 'model.onnx'
+# 导出时记录源模型及其权重指纹，用于判断导出的模型是否过期
+ONNX_SOURCE_FILE = 'source.json'
+# 按优先级查找的源模型权重文件（分片模型以索引文件代表）
+_WEIGHT_FILES = ('model.safetensors', 'model.safetensors.index.json',
+                 'pytorch_model.bin', 'pytorch_model.bin.index.json')
+
+
+def weights_fingerprint(model_name: str, cache_dir: str) -> Optional[str]:
+    """源模型权重文件的指纹，用于判断量化、导出等派生产物是否过期
+
+    Hugging Face 缓存中的权重文件链接到以内容哈希命名的 blob，
+    指纹取实际文件名、大小和修改时间，不读取文件内容。
+
+    Args:
+        model_name: 模型名称或本地模型目录
+        cache_dir: 模型缓存目录
+
+    Returns:
+        Optional[str]: 指纹，本地找不到权重文件时为 None
+    """
+    for filename in _WEIGHT_FILES:
+        if os.path.isdir(model_name):
+            path = os.path.join(model_name, filename)
+        else:
+            try:
+                from huggingface_hub import try_to_load_from_cache
+                path = try_to_load_from_cache(model_name, filename, cache_dir=cache_dir)
+            except Exception:
+                return None
+        if isinstance(path, str) and os.path.exists(path):
+            real_path = os.path.realpath(path)
+            stat = os.stat(real_path)
+            return f'{filename}:{os.path.basename(real_path)}:{stat.st_size}:{stat.st_mtime_ns}'
+    return None
+
+
+class InferenceBackend:
+    """推理后端基类"""
+
+    name = 'base'
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    @property
+    def version(self) -> str:
+        """后端标识，参与结果缓存键"""
+        return self.name
+
+    @property
+    def model(self):
+        """底层模型对象"""
+        return None
+
+    def forward(self, features: List[Dict[str, List[int]]]) -> List[List[float]]:
+        """对一个批次的已编码序列做前向计算
+
+        Args:
+            features: 每条序列的编码（input_ids、attention_mask 等），由后端负责填充
+
+        Returns:
+            List[List[float]]: 每条序列的 [负面, 正面] 概率，顺序与输入一致
+        """
+        raise NotImplementedError
+
+
+def configure_torch_threads(intra_op: int = INTRA_OP_THREADS, inter_op: int = INTER_OP_THREADS):
+    """设置 torch 算子线程数，值为 0 时保持默认
+
+    inter-op 线程池只能在首次并行计算前设置，之后的修改会被忽略。
+
+    Args:
+        intra_op: 单个算子内部的线程数
+        inter_op: 算子之间并行的线程数
+    """
+    import torch
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            print("torch inter-op 线程池已启动，忽略 inter-op 线程数设置")
+
+
+class TorchBackend(InferenceBackend):
+    """PyTorch 推理后端"""
+
+    name = 'torch'
+
+    def __init__(self, model, tokenizer, precision: str = 'fp32'):
+        super().__init__(tokenizer)
+        self._model = model
+        self.precision = precision
+        self._model.eval()
+
+    @property
+    def version(self) -> str:
+        return f'{self.name}-{self.precision}'
+
+    @property
+    def model(self):
+        return self._model
+
+    def forward(self, features: List[Dict[str, List[int]]]) -> List[List[float]]:
+        import torch
+        inputs = self.tokenizer.pad(features, return_tensors="pt")
+        with torch.no_grad():
+            outputs = self._model(**inputs)
+            return torch.softmax(outputs.logits, dim=1).tolist()
+
+    @classmethod
+    def load(cls, model_name: str, cache_dir: str, local_files_only: bool,
+             precision: str = MODEL_PRECISION) -> 'TorchBackend':
+        """加载分词器和模型
+
+        int8 模式优先读取量化缓存，缓存缺失或过期时加载 fp32 模型后量化并写入缓存。
+
+        Args:
+            model_name: 模型名称
+            cache_dir: 模型缓存目录
+            local_files_only: 是否只使用本地文件
+            precision: 模型精度，fp32 或 int8
+
+        Returns:
+            TorchBackend: 推理后端
+        """
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        configure_torch_threads()
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_name,
+            local_files_only=local_files_only,
+            cache_dir=cache_dir
+        )
+
+        if precision == 'int8':
+            from .quantization import load_quantized_model, quantize_model, save_quantized_model
+            model = load_quantized_model(model_name, cache_dir=cache_dir)
+            if model is None:
+                model = AutoModelForSequenceClassification.from_pretrained(
+                    model_name,
+                    local_files_only=local_files_only,
+                    cache_dir=cache_dir
+                )
+                print("正在量化情感分析模型（int8）...")
+                model = quantize_model(model)
+                try:
+                    save_quantized_model(model, model_name, cache_dir=cache_dir)
+                except Exception as e:
+                    print(f"量化模型缓存写入失败: {str(e)}")
+            return cls(model, tokenizer, precision='int8')
+
+        if precision != 'fp32':
+            print(f"未知的模型精度 {precision}，使用 fp32")
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_name,
+            local_files_only=local_files_only,
+            cache_dir=cache_dir
+        )
+        return cls(model, tokenizer, precision='fp32')
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime 推理后端"""
+
+    name = 'onnx'
+
+    def __init__(self, session, tokenizer):
+        super().__init__(tokenizer)
+        self.session = session
+        self.input_names = [node.name for node in session.get_inputs()]
+
+    @property
+    def model(self):
+        return self.session
+
+    def forward(self, features: List[Dict[str, List[int]]]) -> List[List[float]]:
+        import numpy as np
+        inputs = self.tokenizer.pad(features, return_tensors="np")
+        feeds = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        logits = self.session.run(None, feeds)[0]
+        # 数值稳定的 softmax
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return (exp / exp.sum(axis=1, keepdims=True)).tolist()
+
+    @classmethod
+    def load(cls, model_dir: str = ONNX_MODEL_DIR, num_threads: Optional[int] = INTRA_OP_THREADS,
+             interop_threads: Optional[int] = INTER_OP_THREADS) -> 'OnnxBackend':
+        """加载导出的 ONNX 模型和分词器
+
+        Args:
+            model_dir: export_onnx 的输出目录
+            num_threads: 算子内部线程数，为空时由 ONNX Runtime 决定
+            interop_threads: 算子之间并行的线程数，为空时由 ONNX Runtime 决定
+
+        Returns:
+            OnnxBackend: 推理后端
+
+        Raises:
+            RuntimeError: 未安装 onnxruntime 或模型尚未导出时
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("未安装 onnxruntime，请执行 pip install onnxruntime")
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"未找到 ONNX 模型 {model_path}，请先执行 python init.py export_onnx")
+
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        if interop_threads:
+            options.inter_op_num_threads = interop_threads
+        session = onnxruntime.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        return cls(session, tokenizer)
+
+
+def export_onnx(model_name: str, cache_dir: str, output_dir: str = ONNX_MODEL_DIR,
+                local_files_only: bool = True, opset_version: int = 17) -> str:
+    """把 PyTorch 模型导出为 ONNX 计算图，分词器一并保存到输出目录
+
+    Args:
+        model_name: 模型名称
+        cache_dir: 模型缓存目录
+        output_dir: 输出目录
+        local_files_only: 是否只使用本地文件
+        opset_version: ONNX opset 版本
+
+    Returns:
+        str: 导出的模型文件路径
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_files_only, cache_dir=cache_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        model_name, local_files_only=local_files_only, cache_dir=cache_dir
+    )
+    model.eval()
+
+    sample = tokenizer(["今天天气很好", "好"], padding=True, return_tensors="pt")
+    # 计算图的输入按 forward 的参数顺序排列，名称必须与之一一对应
+    input_names = [name for name in inspect.signature(model.forward).parameters if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    tmp_path = f'{model_path}.tmp'
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (), tmp_path,
+            kwargs={name: sample[name] for name in input_names},
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version,
+            dynamo=False
+        )
+    os.replace(tmp_path, model_path)
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, ONNX_SOURCE_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'model_name': model_name, 'weights': weights_fingerprint(model_name, cache_dir)}, f)
+    return model_path
+
+
+def onnx_export_is_current(model_name: str, cache_dir: str, model_dir: str = ONNX_MODEL_DIR) -> bool:
+    """导出的 ONNX 模型是否来自当前的源模型权重
+
+    本地没有源模型权重（只部署了 ONNX 模型）或导出时未记录来源时无法比较，视为有效。
+
+    Args:
+        model_name: 模型名称或本地模型目录
+        cache_dir: 模型缓存目录
+        model_dir: export_onnx 的输出目录
+
+    Returns:
+        bool: 是否有效
+    """
+    try:
+        with open(os.path.join(model_dir, ONNX_SOURCE_FILE), encoding='utf-8') as f:
+            source = json.load(f)
+    except (OSError, ValueError):
+        print("ONNX 模型未记录源模型信息，无法检查是否过期，建议重新执行 python init.py export_onnx")
+        return True
+    current = weights_fingerprint(model_name, cache_dir)
+    if current is None:
+        return True
+    return source.get('model_name') == model_name and source.get('weights') == current
+
+
+def load_backend(name: str, model_name: str, cache_dir: str, local_files_only: bool) -> InferenceBackend:
+    """按名称加载推理后端，ONNX 后端不可用时回退到 PyTorch
+
+    Args:
+        name: 后端名称，torch 或 onnx
+        model_name: 模型名称
+        cache_dir: 模型缓存目录
+        local_files_only: 是否只使用本地文件
+
+    Returns:
+        InferenceBackend: 推理后端
+    """
+    if name == 'onnx':
+        try:
+            if not onnx_export_is_current(model_name, cache_dir):
+                raise RuntimeError("ONNX 模型与当前模型权重不一致，请重新执行 python init.py export_onnx")
+            return OnnxBackend.load()
+        except Exception as e:
+            print(f"ONNX 后端加载失败，回退到 PyTorch: {str(e)}")
+    elif name != 'torch':
+        print(f"未知的推理后端 {name}，使用 PyTorch")
+    return TorchBackend.load(model_name, cache_dir, local_files_only)
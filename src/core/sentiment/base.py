@@ -88,4 +88,19 @@ INTENSITY_MODIFIERS = {
     '稍微': 0.7,
     '不太': 0.6,
     '不': 0.5
-} 
\ No newline at end of file
+}
+
+# 规则分析使用的正面/负面词
+POSITIVE_KEYWORDS = ['喜欢', '开心', '高兴', '快乐', '兴奋', '棒', '好', '优秀', '成功', '爱']
+NEGATIVE_KEYWORDS = ['讨厌', '难过', '伤心', '悲伤', '失望', '糟糕', '差', '不好', '失败', '恨']
+
+# 否定词：出现时词典极性可能被反转
+NEGATION_WORDS = ['不', '没', '别', '无', '未', '否']
+
+# 情感词典中各情感类别的极性（未列出的类别如 surprise 视为中性）
+POSITIVE_EMOTIONS = {'joy', 'trust', 'anticipation'}
+NEGATIVE_EMOTIONS = {'sadness', 'anger', 'fear', 'disgust'}
+
+# 影响情感强度的标点
+EXCLAMATION_MARKS = ['！', '!']
+QUESTION_MARKS = ['？', '?']
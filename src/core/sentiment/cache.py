@@ -0,0 +1,96 @@
+"""情感分析结果缓存"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def canonicalize_text(text: str) -> str:
+    """规范化文本作为缓存键
+
+    NFKC 规范化会把全角字母、数字、标点和空格折叠为半角形式，
+    随后将连续空白合并为一个空格并去掉首尾空白。
+
+    Args:
+        text: 输入文本
+
+    Returns:
+        str: 规范化后的文本
+    """
+    text = unicodedata.normalize('NFKC', text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class ResultCache:
+    """线程安全、容量有界的 LRU + TTL 缓存"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 300):
+        """初始化缓存
+
+        Args:
+            maxsize: 最多缓存的条目数
+            ttl: 条目存活秒数，为空或 0 表示不过期
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl or None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存，未命中或已过期时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        """清空缓存（保留统计计数）"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中、未命中、淘汰等统计信息"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,78 @@
+"""单次分析请求的共享上下文"""
+from typing import Dict, List, Optional, Tuple
+from .matcher import KeywordMatcher, MatchResult
+from ..metrics import ANALYSIS_STAGE_SECONDS
+
+
+class AnalysisContext:
+    """一次分析请求的中间结果
+
+    分词、词性、关键词命中和情感词查询都在首次访问时计算并缓存，
+    模型分数和最终结果由分析器写入，各分析阶段都从这里读取，
+    因此同一段文本只分词一次、最多做一次前向计算。
+    """
+
+    def __init__(self, text: str, word_tokenizer, emotion_tokenizer, matcher: KeywordMatcher):
+        """初始化上下文
+
+        Args:
+            text: 输入文本
+            word_tokenizer: 分词器（ChineseTokenizer）
+            emotion_tokenizer: 情感分词器（EmotionTokenizer）
+            matcher: 关键词匹配器
+        """
+        self.text = text
+        self._word_tokenizer = word_tokenizer
+        self._emotion_tokenizer = emotion_tokenizer
+        self._matcher = matcher
+        self._pos_tags = None
+        self._words_info = None
+        self._words = None
+        self._matches = None
+        self._emotion_words = None
+        # 模型输出的 [负面, 正面] 概率，未经模型推理时为 None
+        self.scores: Optional[List[float]] = None
+        # analyze 的完整结果
+        self.result: Optional[Dict] = None
+        # 模型分析失败、回退到规则分析时记录的错误信息
+        self.error: Optional[str] = None
+        # 推理排队超过延迟预算、降级为规则分析时记录的原因（此时 error 为空）
+        self.degraded: Optional[str] = None
+        # 给出结果的层级：lexicon（词典快速通道）、model 或 rules
+        self.tier: Optional[str] = None
+
+    @property
+    def pos_tags(self) -> List[Tuple[str, str]]:
+        """(词, 词性) 列表，未过滤停用词"""
+        if self._pos_tags is None:
+            with ANALYSIS_STAGE_SECONDS.labels('jieba').time():
+                self._pos_tags = self._word_tokenizer.cut(self.text)
+        return self._pos_tags
+
+    @property
+    def words_info(self) -> List[Dict]:
+        """过滤停用词后的分词及词性"""
+        if self._words_info is None:
+            self._words_info = self._word_tokenizer.tokenize(self.text, self.pos_tags)
+        return self._words_info
+
+    @property
+    def words(self) -> List[str]:
+        """过滤停用词后的分词结果"""
+        if self._words is None:
+            self._words = [info['word'] for info in self.words_info]
+        return self._words
+
+    @property
+    def matches(self) -> MatchResult:
+        """关键词匹配结果"""
+        if self._matches is None:
+            self._matches = self._matcher.match(self.text)
+        return self._matches
+
+    @property
+    def emotion_words(self) -> List[Tuple[str, Dict[str, float]]]:
+        """命中情感词典的词语及其情感分布"""
+        if self._emotion_words is None:
+            self._emotion_words = self._emotion_tokenizer.get_emotion_words(self.text, self.words)
+        return self._emotion_words
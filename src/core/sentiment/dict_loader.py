@@ -1,10 +1,9 @@
 """情感词典加载器"""
 import os
 import json
-import requests
-from typing import Dict, List, Optional
-from pathlib import Path
-from ..config import DICTS_DIR
+from typing import Dict, List, Optional, Tuple
+from ..config import DICTS_DIR, LEXICON_PATH
+from .lexicon import CompiledLexicon, LexiconError, source_fingerprint
 
 class EmotionDictLoader:
     """情感词典加载器"""
@@ -12,9 +11,21 @@ class EmotionDictLoader:
     # 可用的词典列表
     AVAILABLE_DICTS = ['hownet', 'thu', 'ntusd', 'boson']
     
+    # 各词典权重
+    DICT_WEIGHTS = {
+        'hownet': 1.0,   # 知网词典权重
+        'thu': 0.8,      # 清华词典权重
+        'ntusd': 0.8,    # 台大词典权重
+        'boson': 1.0     # Boson词典权重
+    }
+    
     def __init__(self):
         """初始化词典加载器"""
         self.loaded_dicts = {}
+        # 词语 -> 归一化情感分布的倒排索引，首次查询时构建
+        self._word_index = None
+        self._version = None
+        self.lexicon_path = LEXICON_PATH
         # 优先查找项目根目录 data/dicts
         self.dict_dir = DICTS_DIR
         os.makedirs(self.dict_dir, exist_ok=True)
@@ -61,6 +72,10 @@ class EmotionDictLoader:
         Returns:
             List[str]: 情感词语列表
         """
+        index = self._get_index()
+        if isinstance(index, CompiledLexicon):
+            return [word for word, scores in index.items() if emotion in scores]
+        
         words = set()
         
         # 从所有词典中收集词语
@@ -77,6 +92,10 @@ class EmotionDictLoader:
         Returns:
             List[str]: 情感类型列表
         """
+        index = self._get_index()
+        if isinstance(index, CompiledLexicon):
+            return list(index.emotions)
+        
         emotions = set()
         
         # 从所有词典中收集情感类型
@@ -87,6 +106,68 @@ class EmotionDictLoader:
                 
         return list(emotions)
     
+    def _build_index(self) -> Dict[str, Dict[str, float]]:
+        """合并所有词典，构建预加权的词语情感倒排索引
+        
+        Returns:
+            Dict[str, Dict[str, float]]: 词语到归一化情感分布的映射
+        """
+        raw_scores = {}
+        for dict_name in self.AVAILABLE_DICTS:
+            dict_data = self.load_dict(dict_name)
+            if not dict_data:
+                continue
+            weight = self.DICT_WEIGHTS.get(dict_name, 1.0)
+            for emotion, words in dict_data.items():
+                # 同一词典内重复出现的词只计一次，与逐词典 `in` 判断保持一致
+                for word in set(words):
+                    scores = raw_scores.setdefault(word, {})
+                    scores[emotion] = scores.get(emotion, 0) + weight
+        
+        # 归一化分数
+        index = {}
+        for word, scores in raw_scores.items():
+            total = sum(scores.values())
+            if total > 0:
+                index[word] = {k: v/total for k, v in scores.items()}
+        return index
+    
+    @property
+    def version(self) -> str:
+        """词典版本，取源词典内容指纹的前 16 位十六进制"""
+        if self._version is None:
+            index = self._get_index()
+            if isinstance(index, CompiledLexicon):
+                fingerprint = index.fingerprint
+            else:
+                fingerprint = source_fingerprint(self.dict_dir, self.AVAILABLE_DICTS)
+            self._version = fingerprint.hex()[:16]
+        return self._version
+    
+    def _open_lexicon(self) -> Optional[CompiledLexicon]:
+        """打开编译后的二进制词典，文件缺失或已过期时返回 None"""
+        if not os.path.exists(self.lexicon_path):
+            return None
+        try:
+            lexicon = CompiledLexicon(self.lexicon_path)
+            if not lexicon.is_current(self.dict_dir, self.AVAILABLE_DICTS):
+                lexicon.close()
+                raise LexiconError("编译词典已过期")
+            return lexicon
+        except Exception as e:
+            print(f"编译词典不可用，回退到 JSON 词典: {str(e)}")
+            return None
+    
+    def _get_index(self):
+        """获取倒排索引（惰性构建）
+        
+        优先使用 mmap 的编译词典，缺失或过期时才解析 JSON 词典。
+        """
+        if self._word_index is None:
+            lexicon = self._open_lexicon()
+            self._word_index = lexicon if lexicon is not None else self._build_index()
+        return self._word_index
+    
     def get_word_emotion(self, word: str) -> Dict[str, float]:
         """获取词语的情感分布
         
@@ -96,26 +177,22 @@ class EmotionDictLoader:
         Returns:
             Dict[str, float]: 情感分布字典
         """
-        emotion_scores = {}
-        dict_weights = {
-            'hownet': 1.0,   # 知网词典权重
-            'thu': 0.8,      # 清华词典权重
-            'ntusd': 0.8,    # 台大词典权重
-            'boson': 1.0     # Boson词典权重
-        }
+        emotion_scores = self._get_index().get(word)
+        return dict(emotion_scores) if emotion_scores else {}
+    
+    def get_words_emotion(self, words: List[str]) -> List[Tuple[str, Dict[str, float]]]:
+        """批量获取词语的情感分布，只返回命中词典的词语
         
-        # 从所有词典中收集情感分数
-        for dict_name in self.AVAILABLE_DICTS:
-            dict_data = self.load_dict(dict_name)
-            if dict_data:
-                weight = dict_weights.get(dict_name, 1.0)
-                for emotion, words in dict_data.items():
-                    if word in words:
-                        emotion_scores[emotion] = emotion_scores.get(emotion, 0) + weight
-                        
-        # 归一化分数
-        total = sum(emotion_scores.values())
-        if total > 0:
-            emotion_scores = {k: v/total for k, v in emotion_scores.items()}
+        Args:
+            words: 词语列表
             
-        return emotion_scores 
\ No newline at end of file
+        Returns:
+            List[Tuple[str, Dict[str, float]]]: (词语, 情感分布) 列表，保持输入顺序
+        """
+        index = self._get_index()
+        result = []
+        for word in words:
+            emotion_scores = index.get(word)
+            if emotion_scores:
+                result.append((word, dict(emotion_scores)))
+        return result
@@ -0,0 +1,266 @@
+"""编译后的二进制情感词典
+
+将 data/dicts 下的四个 JSON 词典合并为一个按词语排序、可 mmap 的二进制文件，
+多个进程打开同一文件时共享页缓存，无需各自解析 JSON。
+
+打开时先比较源文件的大小和修改时间，不一致时才读取全部源文件计算内容指纹；
+数据区 CRC32 只在编译后或设置 LEXICON_VERIFY=true 时校验。
+
+文件布局（小端序）：
+    头部      magic / 版本 / 情感数 / 词数 / 源文件指纹 / 源文件状态指纹 / 数据区 CRC32 / 各区长度
+    情感名    以 '\\n' 分隔的 UTF-8 字符串
+    索引表    每个词一项 (字符串偏移, 字符串长度)，按 UTF-8 字节序排序
+    分数表    每个词 n_emotions 个 float64，已按词典权重加权并归一化
+    字符串区  所有词语的 UTF-8 字节
+"""
+import os
+import mmap
+import struct
+import zlib
+import uuid
+import hashlib
+from typing import Dict, Iterator, List, Optional
+from ..config import DICTS_DIR, LEXICON_PATH, LEXICON_VERIFY
+
+LEXICON_MAGIC = b'ESLX'
+LEXICON_VERSION = 2
+
+_HEADER = struct.Struct('<4sHHI32s32sIII')
+_ENTRY = struct.Struct('<II')
+
+
+class LexiconError(ValueError):
+    """编译词典文件无效或已过期"""
+
+
+def source_fingerprint(dict_dir: str, dict_names: List[str]) -> bytes:
+    """计算 JSON 源词典的指纹，用于判断编译产物是否过期
+
+    Args:
+        dict_dir: 词典目录
+        dict_names: 词典名称列表
+
+    Returns:
+        bytes: 32 字节 SHA-256 摘要
+    """
+    digest = hashlib.sha256()
+    digest.update(str(LEXICON_VERSION).encode())
+    for dict_name in dict_names:
+        dict_path = os.path.join(dict_dir, f"{dict_name}.json")
+        digest.update(dict_name.encode('utf-8'))
+        if os.path.exists(dict_path):
+            with open(dict_path, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(b'<missing>')
+    return digest.digest()
+
+
+def source_stat_fingerprint(dict_dir: str, dict_names: List[str]) -> bytes:
+    """根据 JSON 源词典的大小和修改时间计算指纹，不读取文件内容
+
+    Args:
+        dict_dir: 词典目录
+        dict_names: 词典名称列表
+
+    Returns:
+        bytes: 32 字节 SHA-256 摘要
+    """
+    digest = hashlib.sha256()
+    digest.update(str(LEXICON_VERSION).encode())
+    for dict_name in dict_names:
+        dict_path = os.path.join(dict_dir, f"{dict_name}.json")
+        digest.update(dict_name.encode('utf-8'))
+        try:
+            stat = os.stat(dict_path)
+        except OSError:
+            digest.update(b'<missing>')
+        else:
+            digest.update(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return digest.digest()
+
+
+def build_lexicon(dict_dir: str = DICTS_DIR, output_path: str = LEXICON_PATH) -> str:
+    """将 JSON 词典编译为二进制词典文件
+
+    Args:
+        dict_dir: JSON 词典目录
+        output_path: 输出文件路径
+
+    Returns:
+        str: 输出文件路径
+    """
+    from .dict_loader import EmotionDictLoader
+
+    loader = EmotionDictLoader()
+    loader.dict_dir = dict_dir
+    # 先记录源文件状态，编译期间源文件被修改时下次打开会重新比较内容
+    stat_fingerprint = source_stat_fingerprint(dict_dir, EmotionDictLoader.AVAILABLE_DICTS)
+    index = loader._build_index()
+    # 情感名按首次出现顺序排列，与 JSON 索引中的顺序保持一致
+    emotions = list(dict.fromkeys(emotion for scores in index.values() for emotion in scores))
+    emotion_pos = {emotion: i for i, emotion in enumerate(emotions)}
+
+    encoded = sorted((word.encode('utf-8'), scores) for word, scores in index.items())
+    entries = bytearray()
+    scores_blob = bytearray()
+    strings = bytearray()
+    row = struct.Struct(f'<{len(emotions)}d')
+    for word_bytes, scores in encoded:
+        entries += _ENTRY.pack(len(strings), len(word_bytes))
+        values = [0.0] * len(emotions)
+        for emotion, score in scores.items():
+            values[emotion_pos[emotion]] = score
+        scores_blob += row.pack(*values)
+        strings += word_bytes
+
+    emotions_blob = '\n'.join(emotions).encode('utf-8')
+    payload = emotions_blob + entries + scores_blob + strings
+    header = _HEADER.pack(
+        LEXICON_MAGIC,
+        LEXICON_VERSION,
+        len(emotions),
+        len(encoded),
+        source_fingerprint(dict_dir, EmotionDictLoader.AVAILABLE_DICTS),
+        stat_fingerprint,
+        zlib.crc32(payload),
+        len(emotions_blob),
+        len(strings),
+    )
+
+    # 先写临时文件再替换，避免其他进程读到半成品；临时文件名各不相同，多个进程同时编译互不干扰
+    tmp_path = f"{output_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    # 编译产物在这里完整校验一次，运行时打开默认不再逐字节计算 CRC
+    CompiledLexicon(output_path, verify=True).close()
+    return output_path
+
+
+class CompiledLexicon:
+    """只读的 mmap 二进制词典，查询时直接在映射内存上二分查找"""
+
+    def __init__(self, path: str, expected_fingerprint: Optional[bytes] = None, verify: bool = LEXICON_VERIFY):
+        """打开编译词典
+
+        Args:
+            path: 词典文件路径
+            expected_fingerprint: 期望的源文件指纹，不一致时视为过期
+            verify: 是否校验数据区 CRC32（默认由 LEXICON_VERIFY 决定）
+
+        Raises:
+            LexiconError: 文件格式错误、校验失败或已过期时
+        """
+        self.path = path
+        self._mm = None
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse_header(expected_fingerprint, verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_header(self, expected_fingerprint: Optional[bytes], verify: bool):
+        """解析并校验文件头"""
+        if len(self._mm) < _HEADER.size:
+            raise LexiconError("编译词典文件过短")
+        (magic, version, n_emotions, n_words, fingerprint, stat_fingerprint,
+         crc, emotions_len, strings_len) = _HEADER.unpack_from(self._mm, 0)
+        if magic != LEXICON_MAGIC:
+            raise LexiconError("编译词典文件标识错误")
+        if version != LEXICON_VERSION:
+            raise LexiconError(f"编译词典版本不匹配: {version}")
+        if expected_fingerprint is not None and fingerprint != expected_fingerprint:
+            raise LexiconError("编译词典已过期")
+
+        self._row = struct.Struct(f'<{n_emotions}d')
+        self._n_words = n_words
+        self._entries_offset = _HEADER.size + emotions_len
+        self._scores_offset = self._entries_offset + n_words * _ENTRY.size
+        self._strings_offset = self._scores_offset + n_words * self._row.size
+        if self._strings_offset + strings_len != len(self._mm):
+            raise LexiconError("编译词典文件长度不匹配")
+        if verify and zlib.crc32(memoryview(self._mm)[_HEADER.size:]) != crc:
+            raise LexiconError("编译词典校验失败")
+
+        emotions_blob = self._mm[_HEADER.size:self._entries_offset]
+        self.emotions = emotions_blob.decode('utf-8').split('\n') if n_emotions else []
+        self.fingerprint = fingerprint
+        self.stat_fingerprint = stat_fingerprint
+
+    def is_current(self, dict_dir: str, dict_names: List[str]) -> bool:
+        """编译词典是否与源词典一致
+
+        源文件大小和修改时间未变时直接认为一致；否则（如重新检出后修改时间变化）再比较内容指纹。
+
+        Args:
+            dict_dir: 词典目录
+            dict_names: 词典名称列表
+
+        Returns:
+            bool: 是否一致
+        """
+        if source_stat_fingerprint(dict_dir, dict_names) == self.stat_fingerprint:
+            return True
+        return source_fingerprint(dict_dir, dict_names) == self.fingerprint
+
+    def _word_at(self, i: int) -> bytes:
+        offset, length = _ENTRY.unpack_from(self._mm, self._entries_offset + i * _ENTRY.size)
+        start = self._strings_offset + offset
+        return self._mm[start:start + length]
+
+    def _scores_at(self, i: int) -> Dict[str, float]:
+        values = self._row.unpack_from(self._mm, self._scores_offset + i * self._row.size)
+        return {emotion: value for emotion, value in zip(self.emotions, values) if value > 0}
+
+    def _find(self, word: str) -> int:
+        """二分查找词语位置，未找到返回 -1"""
+        key = word.encode('utf-8')
+        lo, hi = 0, self._n_words
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_words and self._word_at(lo) == key:
+            return lo
+        return -1
+
+    def get(self, word: str, default=None) -> Optional[Dict[str, float]]:
+        """获取词语的归一化情感分布
+
+        Args:
+            word: 输入词语
+            default: 未命中时的返回值
+
+        Returns:
+            Optional[Dict[str, float]]: 情感分布字典
+        """
+        i = self._find(word)
+        return self._scores_at(i) if i >= 0 else default
+
+    def __contains__(self, word: str) -> bool:
+        return self._find(word) >= 0
+
+    def __len__(self) -> int:
+        return self._n_words
+
+    def items(self) -> Iterator:
+        """按字节序遍历 (词语, 情感分布)"""
+        for i in range(self._n_words):
+            yield self._word_at(i).decode('utf-8'), self._scores_at(i)
+
+    def close(self):
+        """关闭内存映射"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
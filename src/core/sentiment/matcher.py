@@ -0,0 +1,183 @@
+"""情感关键词匹配器
+
+基于 Aho–Corasick 自动机，一次线性扫描即可找出文本中所有情感关键词、
+复合情感关键词、强度修饰词、正负面词、否定词以及感叹/疑问标点（含重叠匹配及位置）。
+"""
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .base import (
+    BASIC_EMOTIONS, COMPOUND_EMOTIONS, INTENSITY_MODIFIERS,
+    POSITIVE_KEYWORDS, NEGATIVE_KEYWORDS, NEGATION_WORDS, EXCLAMATION_MARKS, QUESTION_MARKS
+)
+
+# 关键词分类
+BASIC = 'basic'
+COMPOUND = 'compound'
+MODIFIER = 'modifier'
+POSITIVE = 'positive'
+NEGATIVE = 'negative'
+NEGATION = 'negation'
+PUNCTUATION = 'punct'
+
+
+class KeywordHit(NamedTuple):
+    """单个关键词命中"""
+    start: int
+    end: int
+    keyword: str
+
+
+class MatchResult:
+    """一次匹配的结果，按 (分类, 键) 汇总命中的关键词"""
+
+    def __init__(self, text: str, hits: List[KeywordHit], tagged: Dict[Tuple[str, str], Dict[str, int]]):
+        self.text = text
+        self.hits = hits
+        # (分类, 键) -> {关键词: 在词表中的序号}
+        self._tagged = tagged
+
+    def has(self, category: str, key: Optional[str] = None) -> bool:
+        """是否命中指定分类（及键）的关键词"""
+        if key is not None:
+            return (category, key) in self._tagged
+        return any(tag[0] == category for tag in self._tagged)
+
+    def keywords(self, category: str, key: Optional[str] = None) -> List[str]:
+        """获取命中的关键词，按词表中的顺序去重排列"""
+        found = {}
+        for (tag_category, tag_key), words in self._tagged.items():
+            if tag_category == category and (key is None or tag_key == key):
+                found.update(words)
+        return sorted(found, key=found.get)
+
+    def keys(self, category: str) -> List[str]:
+        """获取指定分类下被命中的键，按词表中的顺序排列"""
+        ranked = {}
+        for (tag_category, tag_key), words in self._tagged.items():
+            if tag_category == category:
+                ranked[tag_key] = min(words.values())
+        return sorted(ranked, key=ranked.get)
+
+
+class KeywordMatcher:
+    """Aho–Corasick 多模式匹配器"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, str, str]]):
+        """构建自动机
+
+        Args:
+            patterns: (关键词, 分类, 键) 三元组，同一关键词可属于多个分类
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._keywords: List[str] = []
+        self._tags: List[List[Tuple[Tuple[str, str], int]]] = []
+
+        pattern_ids = {}
+        for rank, (keyword, category, key) in enumerate(patterns):
+            if not keyword:
+                continue
+            if keyword not in pattern_ids:
+                pattern_ids[keyword] = len(self._keywords)
+                self._keywords.append(keyword)
+                self._tags.append([])
+                self._insert(keyword, pattern_ids[keyword])
+            self._tags[pattern_ids[keyword]].append(((category, key), rank))
+        self._build_failure_links()
+        # 关键词中出现过的字符；其他字符在任何状态下都回到根状态，无需查表
+        self._alphabet = frozenset(ch for keyword in self._keywords for ch in keyword)
+
+    def _insert(self, keyword: str, pattern_id: int):
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, text: str) -> MatchResult:
+        """一次扫描找出所有关键词（含重叠命中）
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            MatchResult: 匹配结果
+        """
+        # 自动机构建后只读，可被多个线程同时使用
+        goto, fail, output, alphabet = self._goto, self._fail, self._output, self._alphabet
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            # 关键词都很短，失败链最多几步
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.extend((i, pattern_id) for pattern_id in output[state])
+        
+        # 扫描结束后再按 (分类, 键) 汇总，每个关键词只处理一次
+        hits = []
+        tagged = {}
+        for i, pattern_id in found:
+            keyword = self._keywords[pattern_id]
+            hits.append(KeywordHit(i + 1 - len(keyword), i + 1, keyword))
+        for pattern_id in {pattern_id for _, pattern_id in found}:
+            keyword = self._keywords[pattern_id]
+            for tag, rank in self._tags[pattern_id]:
+                tagged.setdefault(tag, {})[keyword] = rank
+        return MatchResult(text, hits, tagged)
+
+
+def _default_patterns():
+    """由 base.py 中的词表生成匹配模式"""
+    for emotion_id, emotion_info in BASIC_EMOTIONS.items():
+        for keyword in emotion_info['keywords']:
+            yield keyword, BASIC, emotion_id
+    for emotion_id, emotion_info in COMPOUND_EMOTIONS.items():
+        for keyword in emotion_info['keywords']:
+            yield keyword, COMPOUND, emotion_id
+    for modifier in INTENSITY_MODIFIERS:
+        yield modifier, MODIFIER, modifier
+    for keyword in POSITIVE_KEYWORDS:
+        yield keyword, POSITIVE, POSITIVE
+    for keyword in NEGATIVE_KEYWORDS:
+        yield keyword, NEGATIVE, NEGATIVE
+    for word in NEGATION_WORDS:
+        yield word, NEGATION, NEGATION
+    for mark in EXCLAMATION_MARKS:
+        yield mark, PUNCTUATION, '!'
+    for mark in QUESTION_MARKS:
+        yield mark, PUNCTUATION, '?'
+
+
+_DEFAULT_MATCHER = None
+
+
+def get_default_matcher() -> KeywordMatcher:
+    """获取由内置词表构建的共享匹配器（首次调用时构建）"""
+    global _DEFAULT_MATCHER
+    if _DEFAULT_MATCHER is None:
+        _DEFAULT_MATCHER = KeywordMatcher(_default_patterns())
+    return _DEFAULT_MATCHER
@@ -0,0 +1,152 @@
+"""情感模型的动态 int8 量化
+
+把模型中的 Linear 层做动态 int8 量化以降低 CPU 推理延迟和内存占用。
+量化后的模型缓存在 MODELS_DIR 下，启动时直接加载，不必每次重新量化；
+compare_models 用于在样例集上对比量化模型与 fp32 模型的标签一致率和分数偏移。
+"""
+import os
+import uuid
+from typing import Callable, Dict, List, Optional
+import torch
+import transformers
+from ..config import MODELS_DIR, QUANTIZED_MODEL_PATH
+from .backends import weights_fingerprint
+
+# 量化缓存格式变化时递增
+QUANTIZATION_FORMAT = 1
+
+# 一致性检查使用的默认样例
+SAMPLE_TEXTS = [
+    "今天天气真好，心情特别愉快！",
+    "这家餐厅的服务太差了，再也不会来了。",
+    "收到礼物的那一刻，我感动得说不出话来。",
+    "考试又没考好，感觉很沮丧。",
+    "这部电影还行吧，没有想象中那么精彩。",
+    "终于放假了，可以好好休息一下了！",
+    "快递丢了，客服还一直推卸责任，真让人生气。",
+    "孩子第一次叫妈妈，我开心得哭了。",
+    "明天就要面试了，有点紧张和担心。",
+    "他居然忘了我们的约定，我很失望。",
+    "新买的手机用起来很流畅，非常满意。",
+    "听到这个消息，我感到既惊讶又难过。",
+    "会议按时开始，大家讨论了下季度的计划。",
+    "连续加班一个月，身心俱疲。",
+    "朋友们为我准备了惊喜派对，太幸福了！",
+    "这个问题困扰我很久了，不知道该怎么办。",
+]
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """对模型的 Linear 层做动态 int8 量化
+
+    Args:
+        model: fp32 模型
+
+    Returns:
+        torch.nn.Module: 量化后的模型（处于 eval 模式）
+    """
+    from torch.ao.quantization import quantize_dynamic
+    model.eval()
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _cache_meta(model_name: str, cache_dir: str = MODELS_DIR) -> Dict:
+    """量化缓存的元信息，任一项不同时缓存视为过期（包括同名模型的权重被替换）"""
+    return {
+        'format': QUANTIZATION_FORMAT,
+        'model_name': model_name,
+        'weights': weights_fingerprint(model_name, cache_dir),
+        'torch': torch.__version__,
+        'transformers': transformers.__version__,
+        'engine': torch.backends.quantized.engine,
+    }
+
+
+def save_quantized_model(model: torch.nn.Module, model_name: str, path: str = QUANTIZED_MODEL_PATH,
+                         cache_dir: str = MODELS_DIR) -> str:
+    """把量化模型写入缓存（先写临时文件再原子替换）
+
+    Args:
+        model: 量化后的模型
+        model_name: 原始模型名称
+        path: 缓存文件路径
+        cache_dir: 原始模型的缓存目录
+
+    Returns:
+        str: 缓存文件路径
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+    try:
+        torch.save({'meta': _cache_meta(model_name, cache_dir), 'model': model}, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def load_quantized_model(model_name: str, path: str = QUANTIZED_MODEL_PATH,
+                         cache_dir: str = MODELS_DIR) -> Optional[torch.nn.Module]:
+    """加载缓存的量化模型
+
+    Args:
+        model_name: 原始模型名称
+        path: 缓存文件路径
+        cache_dir: 原始模型的缓存目录
+
+    Returns:
+        Optional[torch.nn.Module]: 量化模型，缓存不存在、已过期或损坏时返回 None
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        # 缓存由本程序写入，包含完整的模块对象
+        payload = torch.load(path, map_location='cpu', weights_only=False)
+    except Exception as e:
+        print(f"量化模型缓存读取失败: {str(e)}")
+        return None
+    if not isinstance(payload, dict) or payload.get('meta') != _cache_meta(model_name, cache_dir):
+        print("量化模型缓存已过期，将重新量化")
+        return None
+    model = payload['model']
+    model.eval()
+    return model
+
+
+def compare_models(reference_fn: Callable[[List[str]], List[List[float]]],
+                   candidate_fn: Callable[[List[str]], List[List[float]]],
+                   texts: Optional[List[str]] = None) -> Dict:
+    """在样例集上对比两个模型的输出
+
+    Args:
+        reference_fn: 基准模型的批量打分函数，返回每条文本的 [负面, 正面] 概率
+        candidate_fn: 待评估模型的批量打分函数
+        texts: 样例文本，默认使用 SAMPLE_TEXTS
+
+    Returns:
+        Dict: 样例数、标签一致率、正面分数的平均/最大偏移及不一致的样例
+    """
+    texts = list(texts or SAMPLE_TEXTS)
+    reference = reference_fn(texts)
+    candidate = candidate_fn(texts)
+
+    agreed = 0
+    drifts = []
+    disagreements = []
+    for text, ref, cand in zip(texts, reference, candidate):
+        ref_label = max(range(len(ref)), key=ref.__getitem__)
+        cand_label = max(range(len(cand)), key=cand.__getitem__)
+        drifts.append(abs(ref[1] - cand[1]))
+        if ref_label == cand_label:
+            agreed += 1
+        else:
+            disagreements.append({'text': text, 'reference': ref, 'candidate': cand})
+
+    return {
+        'samples': len(texts),
+        'label_agreement': agreed / len(texts) if texts else 1.0,
+        'mean_score_drift': sum(drifts) / len(drifts) if drifts else 0.0,
+        'max_score_drift': max(drifts) if drifts else 0.0,
+        'disagreements': disagreements
+    }
@@ -0,0 +1,206 @@
+"""推理微批调度器
+
+Web 服务中每个请求线程各自调用模型时，多份算子线程池会相互争抢 CPU。
+调度器把并发请求收集成微批次，交给唯一的推理线程执行一次前向计算，
+再把结果分发回各个等待中的请求。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+from ..tracing import FanoutTrace, current_trace, tracing
+
+# predict 的默认超时：使用调度器的延迟预算
+_BUDGET = object()
+
+
+class SchedulerTimeoutError(FutureTimeoutError):
+    """请求排队超过延迟预算，已撤销、未经模型计算"""
+
+
+class _Request:
+    """等待推理的单个请求"""
+    __slots__ = ('text', 'future', 'enqueued_at', 'trace')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        # 诊断模式下提交方的追踪对象，推理线程把批次内的阶段耗时记给它
+        self.trace = current_trace()
+
+
+class InferenceScheduler:
+    """动态微批调度器"""
+
+    def __init__(self, predict_fn: Callable[[List[str]], List], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, latency_budget_ms: Optional[float] = None):
+        """初始化调度器
+
+        Args:
+            predict_fn: 批量推理函数，输入文本列表，返回等长的结果列表
+            max_batch_size: 单个微批次的最大请求数
+            max_wait_ms: 凑批时最多等待的毫秒数（从批次中最早的请求入队算起）
+            latency_budget_ms: 单个请求的延迟预算，根据实测的单条推理耗时收缩批次大小，
+                为空时不限制
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.latency_budget = latency_budget_ms / 1000.0 if latency_budget_ms else None
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._running = False
+        # 单条文本推理耗时的指数滑动平均（秒）
+        self._per_item_time = None
+        self._stats = {'requests': 0, 'batches': 0, 'timeouts': 0, 'last_batch_size': 0, 'max_batch_size_seen': 0}
+
+    def start(self):
+        """启动推理线程（重复调用无副作用）"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止推理线程，停止前已入队的请求会先处理完，之后的提交直接报错"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def submit(self, text: str) -> Future:
+        """提交单条文本，返回可等待的 Future
+
+        Raises:
+            RuntimeError: 调度器未启动时
+        """
+        request = _Request(text)
+        # 与 stop 放入停止信号互斥：停止信号之后不会再有请求入队
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("推理调度器未启动")
+            self._queue.put(request)
+        return request.future
+
+    def predict(self, text: str, timeout=_BUDGET):
+        """提交单条文本并阻塞等待结果
+
+        Args:
+            text: 输入文本
+            timeout: 最长排队等待时间（秒），默认为延迟预算（未设置预算时不限），None 表示不限
+
+        Raises:
+            SchedulerTimeoutError: 超时时请求仍在排队（该请求已撤销）
+        """
+        if timeout is _BUDGET:
+            timeout = self.latency_budget
+        future = self.submit(text)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise SchedulerTimeoutError(f"推理排队超过 {timeout * 1000:.0f}ms") from None
+            # 已进入正在计算的批次，等待本批完成
+            return future.result()
+
+    def stats(self) -> Dict:
+        """返回调度统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['per_item_ms'] = round(self._per_item_time * 1000, 3) if self._per_item_time else None
+        return stats
+
+    def _batch_limit(self) -> int:
+        """根据延迟预算和实测单条耗时确定本批次的最大请求数"""
+        if self.latency_budget is None or not self._per_item_time:
+            return self.max_batch_size
+        remaining = self.latency_budget - self.max_wait
+        return max(1, min(self.max_batch_size, int(remaining / self._per_item_time)))
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        """以第一个请求为起点凑批，直到批次已满或等待超时"""
+        batch = [first]
+        limit = self._batch_limit()
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < limit:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # 停止信号放回队列，处理完当前批次后退出
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        """推理线程退出时让仍在队列中的请求立即失败，而不是永远等待"""
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("推理调度器已停止"))
+
+    def _serve(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                if not self._running:
+                    break
+                continue
+            batch = [request for request in self._collect(first) if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            traces = [request.trace for request in batch if request.trace is not None]
+            try:
+                if traces:
+                    for request in batch:
+                        if request.trace is not None:
+                            request.trace.add('scheduler.queue_wait', started - request.enqueued_at)
+                    with tracing(FanoutTrace(traces)):
+                        results = self.predict_fn([request.text for request in batch])
+                else:
+                    results = self.predict_fn([request.text for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - started
+
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+            per_item = elapsed / len(batch)
+            self._per_item_time = per_item if self._per_item_time is None else 0.8 * self._per_item_time + 0.2 * per_item
+            with self._lock:
+                self._stats['requests'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['last_batch_size'] = len(batch)
+                self._stats['max_batch_size_seen'] = max(self._stats['max_batch_size_seen'], len(batch))
@@ -1,11 +1,22 @@
 """中文分词模块"""
-from typing import List, Dict
-import jieba_fast as jieba
-import jieba_fast.posseg as pseg
+from typing import List, Dict, Optional, Tuple
 import os
 from .sentiment.dict_loader import EmotionDictLoader
 from .config import STOPWORDS_PATH
 
+
+def _jieba():
+    """按需导入 jieba_fast，避免拖慢启动"""
+    import jieba_fast
+    return jieba_fast
+
+
+def _pseg():
+    """按需导入 jieba_fast.posseg（导入即加载词性模型，约 0.3 秒）"""
+    import jieba_fast.posseg
+    return jieba_fast.posseg
+
+
 class ChineseTokenizer:
     """中文分词器"""
     
@@ -18,17 +29,30 @@ class ChineseTokenizer:
         stopwords_path = global_stopwords if os.path.exists(global_stopwords) else STOPWORDS_PATH
         # 加载自定义词典
         if os.path.exists(dict_path):
-            jieba.load_userdict(dict_path)
+            _jieba().load_userdict(dict_path)
         # 加载停用词表
         self.stopwords = set()
         if os.path.exists(stopwords_path):
             with open(stopwords_path, encoding='utf-8') as f:
                 self.stopwords = set(line.strip() for line in f if line.strip())
     
-    def tokenize(self, text: str) -> List[Dict]:
+    def cut(self, text: str) -> List[Tuple[str, str]]:
+        """分词并标注词性，不过滤停用词
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            List[Tuple[str, str]]: (词, 词性) 列表，可传给 tokenize/get_words 复用
+        """
+        return [(word, flag) for word, flag in _pseg().cut(text)]
+    
+    def tokenize(self, text: str, pos_tags: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
         """分词并标注词性，自动过滤停用词"""
+        if pos_tags is None:
+            pos_tags = _pseg().cut(text)
         words_info = []
-        for word, flag in pseg.cut(text):
+        for word, flag in pos_tags:
             if word not in self.stopwords:
                 words_info.append({
                     'word': word,
@@ -36,9 +60,11 @@ class ChineseTokenizer:
                 })
         return words_info
     
-    def get_words(self, text: str) -> List[str]:
+    def get_words(self, text: str, pos_tags: Optional[List[Tuple[str, str]]] = None) -> List[str]:
         """只获取分词结果，不包含词性，自动过滤停用词"""
-        return [word for word, _ in pseg.cut(text) if word not in self.stopwords]
+        if pos_tags is None:
+            pos_tags = _pseg().cut(text)
+        return [word for word, _ in pos_tags if word not in self.stopwords]
     
     def add_word(self, word: str, freq: int = None, tag: str = None):
         """添加自定义词
@@ -48,7 +74,7 @@ class ChineseTokenizer:
             freq: 词频
             tag: 词性
         """
-        jieba.add_word(word, freq, tag)
+        _jieba().add_word(word, freq, tag)
     
     def load_dict(self, dict_path: str):
         """加载自定义词典
@@ -56,7 +82,7 @@ class ChineseTokenizer:
         Args:
             dict_path: 词典文件路径
         """
-        jieba.load_userdict(dict_path)
+        _jieba().load_userdict(dict_path)
 
 class EmotionTokenizer(ChineseTokenizer):
     """情感分析分词器，联动当前情感词典"""
@@ -64,14 +90,10 @@ class EmotionTokenizer(ChineseTokenizer):
         super().__init__()
         self.dict_loader = EmotionDictLoader()
 
-    def get_emotion_words(self, text: str):
-        words = self.get_words(text)
-        result = []
-        for word in words:
-            emotions = self.dict_loader.get_word_emotion(word)
-            if emotions:
-                result.append((word, emotions))
-        return result
+    def get_emotion_words(self, text: str, words: Optional[List[str]] = None):
+        if words is None:
+            words = self.get_words(text)
+        return self.dict_loader.get_words_emotion(words)
 
     def get_word_emotion(self, word: str):
         return self.dict_loader.get_word_emotion(word) 
\ No newline at end of file
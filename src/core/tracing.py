@@ -0,0 +1,77 @@
+"""
+单请求耗时追踪
+诊断模式下把各阶段耗时记入当前请求的追踪对象。追踪对象保存在上下文变量中，
+未开启诊断时为空，各计时点只多一次 ContextVar.get()。
+"""
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+_CURRENT_TRACE: contextvars.ContextVar = contextvars.ContextVar('emotionspeak_trace', default=None)
+
+
+class RequestTrace:
+    """一次请求的分阶段耗时"""
+
+    def __init__(self, inline: bool = False):
+        """初始化追踪
+
+        Args:
+            inline: 是否让模型推理绕过微批调度器、在请求线程内执行（性能剖析时使用，
+                使剖析结果包含分词和前向计算）
+        """
+        self.inline = inline
+        self.started = time.perf_counter()
+        self._stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        """记录一个阶段的耗时（秒），同一阶段多次出现时累加"""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+
+    def summary(self) -> Dict:
+        """返回总耗时及各阶段的次数、累计和最大耗时（毫秒）"""
+        with self._lock:
+            stages = {
+                stage: {'count': count, 'total_ms': round(total * 1000, 3), 'max_ms': round(longest * 1000, 3)}
+                for stage, (count, total, longest) in self._stages.items()
+            }
+        return {'total_ms': round((time.perf_counter() - self.started) * 1000, 3), 'stages': stages}
+
+
+class FanoutTrace:
+    """把耗时同时记入多个请求的追踪，用于微批次中合并计算的阶段"""
+
+    inline = False
+
+    def __init__(self, traces: List[RequestTrace]):
+        self.traces = traces
+
+    def add(self, stage: str, seconds: float):
+        for trace in self.traces:
+            trace.add(stage, seconds)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """当前上下文中的追踪对象，未开启诊断时为 None"""
+    return _CURRENT_TRACE.get()
+
+
+@contextmanager
+def tracing(trace) -> Iterator:
+    """在 with 块内把 trace 设为当前追踪对象"""
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
@@ -4,13 +4,85 @@
 """
 
 import os
-import edge_tts
+import re
 import asyncio
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional, Dict, Any, List
-from .sentiment.analyzer import SentimentAnalyzer
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+from .sentiment.analyzer import SentimentAnalyzer, get_analyzer
 from .sentiment.base import BASIC_EMOTIONS, COMPOUND_EMOTIONS
-from .config import AUDIO_DIR
+from .config import AUDIO_DIR, TTS_SEGMENT_PARALLELISM, TTS_STREAM_IDLE_TIMEOUT
+from .audio_cache import AudioCache, audio_cache_key
+from .tts_worker import TTSWorkerPool, get_tts_pool
+from .metrics import TTS_STAGE_SECONDS
+
+# 句末标点（含后随的引号/括号），长文本按此切分
+_SENTENCE_END_RE = re.compile(r'[^。！？!?；;…\n]*(?:[。！？!?；;…\n]+[”’」』）)]*|$)')
+
+
+def split_sentences(text: str, min_length: int = 4) -> List[str]:
+    """按句末标点切分文本，过短的句子并入前一句
+    
+    Args:
+        text: 输入文本
+        min_length: 句子最短长度，短于此长度的片段与前一句合并
+        
+    Returns:
+        List[str]: 句子列表（去除首尾空白，拼接后与原文内容一致）
+    """
+    sentences = []
+    for match in _SENTENCE_END_RE.finditer(text):
+        sentence = match.group().strip()
+        if not sentence:
+            continue
+        if sentences and len(sentence) < min_length:
+            sentences[-1] += sentence
+        else:
+            sentences.append(sentence)
+    return sentences
+
+
+class _ChunkStream:
+    """一次流式合成的音频数据块，供同一文本的多个并发请求共同读取"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = threading.Condition()
+    
+    def put(self, data: bytes):
+        with self._changed:
+            self._chunks.append(data)
+            self._changed.notify_all()
+    
+    def finish(self, error: Optional[BaseException] = None):
+        with self._changed:
+            self._done = True
+            self._error = error
+            self._changed.notify_all()
+    
+    def iterate(self, idle_timeout: float) -> Iterator[bytes]:
+        """从头读取全部数据块，直到合成结束
+        
+        Raises:
+            RuntimeError: 合成失败，或 idle_timeout 秒内没有新的数据块（合成协程已丢失）
+        """
+        index = 0
+        while True:
+            with self._changed:
+                if not self._changed.wait_for(lambda: index < len(self._chunks) or self._done, idle_timeout):
+                    raise RuntimeError(f"TTS合成超时：{idle_timeout} 秒内未收到音频数据")
+                chunks = self._chunks[index:]
+                done, error = self._done, self._error
+            index += len(chunks)
+            yield from chunks
+            if done and not chunks:
+                if error is not None:
+                    raise RuntimeError(f"TTS合成失败: {str(error)}")
+                return
 
 
 class TTSEngine:
@@ -25,96 +97,350 @@ class TTSEngine:
         '云泽': 'zh-CN-YunzeNeural'
     }
     
-    def __init__(self):
+    def __init__(self, audio_cache: Optional[AudioCache] = None, worker_pool: Optional[TTSWorkerPool] = None,
+                 analyzer: Optional[SentimentAnalyzer] = None):
         """Initialize TTS engine"""
         self.output_dir = AUDIO_DIR
         os.makedirs(self.output_dir, exist_ok=True)
+        self.audio_cache = audio_cache or AudioCache(self.output_dir)
+        # 所有合成都在共享的后台事件循环上执行
+        self.worker_pool = worker_pool or get_tts_pool()
+        # 情感分析器，为空时使用进程内共享的实例
+        self._analyzer = analyzer
+        # 进行中的流式合成（按缓存键），相同文本的并发请求共用一个会话
+        self._streams: Dict[str, _ChunkStream] = {}
+        self._streams_lock = threading.Lock()
+    
+    @property
+    def analyzer(self) -> SentimentAnalyzer:
+        """用于推导语音参数的情感分析器"""
+        if self._analyzer is None:
+            self._analyzer = get_analyzer()
+        return self._analyzer
     
     async def _synthesize_async(self, text: str, voice: str, output_file: str):
         """Synthesize speech asynchronously"""
+        import edge_tts
         communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_file)
+        await self._communicate(communicate, output_file)
+    
+    async def _communicate(self, communicate, output_file: str, chunks: Optional[_ChunkStream] = None):
+        """占用一个工作池会话读取 edge-tts 音频流并写入文件，记录各阶段耗时
+        
+        edge-tts 在 stream() 内部建立连接，无法单独计时，因此建连耗时计入 first_byte；
+        session_wait 为等待并发名额的时间。
+        
+        Args:
+            communicate: edge_tts.Communicate 实例
+            output_file: 音频输出路径
+            chunks: 不为空时每个音频数据块同时交给该数据流
+        """
+        waited = time.perf_counter()
+        async with self.worker_pool.session():
+            started = time.perf_counter()
+            TTS_STAGE_SECONDS.labels('session_wait').observe(started - waited)
+            write_seconds = 0.0
+            first_byte = True
+            with open(output_file, 'wb') as f:
+                async for chunk in communicate.stream():
+                    if chunk['type'] != 'audio':
+                        continue
+                    now = time.perf_counter()
+                    if first_byte:
+                        TTS_STAGE_SECONDS.labels('first_byte').observe(now - started)
+                        first_byte = False
+                    f.write(chunk['data'])
+                    write_seconds += time.perf_counter() - now
+                    if chunks is not None:
+                        chunks.put(chunk['data'])
+            TTS_STAGE_SECONDS.labels('complete').observe(time.perf_counter() - started)
+            TTS_STAGE_SECONDS.labels('audio_write').observe(write_seconds)
+    
+    def _commit(self, key: str, tmp_file: str) -> str:
+        """把临时文件登记进语音缓存（含索引落盘），记录耗时"""
+        with TTS_STAGE_SECONDS.labels('cache_commit').time():
+            return self.audio_cache.commit(key, tmp_file)
+    
+    async def _render(self, text: str, voice: str, output_file: Optional[str] = None,
+                      pitch: Optional[float] = None, rate: Optional[float] = None, style: Optional[str] = None) -> str:
+        """在工作池事件循环上合成语音，未指定输出文件时经由语音缓存"""
+        if output_file is not None:
+            await self._synthesize_to_file(text, voice, output_file, pitch, rate, style)
+            return output_file
+        
+        # 相同参数的合成结果直接复用缓存文件，无需再次请求服务
+        key = audio_cache_key(text, voice, rate, pitch, style)
+        cached = self.audio_cache.get(key)
+        if cached:
+            return cached
+        tmp_file = self.audio_cache.temp_path(key)
+        try:
+            await self._synthesize_to_file(text, voice, tmp_file, pitch, rate, style)
+        except Exception:
+            self.audio_cache.discard(tmp_file)
+            raise
+        # 缓存超出磁盘配额时按最近访问时间淘汰
+        return self._commit(key, tmp_file)
+    
+    async def _synthesize_to_file(self, text: str, voice: str, output_file: str,
+                                  pitch: Optional[float], rate: Optional[float], style: Optional[str]):
+        if pitch is None and rate is None and style is None:
+            await self._synthesize_async(text, voice, output_file)
+        else:
+            await self._synthesize_async_with_params(text, voice, output_file, pitch, rate, style)
+    
+    def submit_synthesize(self, text: str, voice: str = '晓晓', output_file: str = None) -> Future:
+        """提交合成任务，立即返回 Future"""
+        voice_id = self.voice_map.get(voice, 'zh-CN-XiaoxiaoNeural')
+        return self.worker_pool.submit(self._render(text, voice_id, output_file))
     
     def synthesize(self, text: str, voice: str = '晓晓', output_file: str = None) -> str:
         """Synthesize speech from text"""
-        if output_file is None:
-            output_file = os.path.join(self.output_dir, f'speech_{hash(text)}.mp3')
-        
-        asyncio.run(self._synthesize_async(text, self.voice_map.get(voice, 'zh-CN-XiaoxiaoNeural'), output_file))
-        return output_file
+        return self.submit_synthesize(text, voice, output_file).result()
+    
+    async def synthesize_async(self, text: str, voice: str = '晓晓', output_file: str = None) -> str:
+        """供异步调用方直接 await 的合成接口"""
+        voice_id = self.voice_map.get(voice, 'zh-CN-XiaoxiaoNeural')
+        return await self.worker_pool.run(self._render(text, voice_id, output_file))
     
     def get_available_voices(self) -> dict:
         """Get available voice mappings"""
         return self.voice_map
 
+    def _emotion_params(self, text: str, auto_analyze: bool = True) -> Dict[str, Any]:
+        """根据情感分析结果计算语音参数
+        
+        Returns:
+            Dict[str, Any]: 包含 voice（语音 ID）、pitch、rate、style 的参数
+        """
+        result = self.analyzer.analyze(text) if auto_analyze else None
+        return self._voice_params(result)
+
+    def _voice_params(self, result: Optional[Dict]) -> Dict[str, Any]:
+        """把情感分析结果映射为语音参数，result 为空时使用中性参数"""
+        if result is not None:
+            base_emotion = result['emotion']['base_emotion']['label']
+            intensity = result['intensity']['intensity_score']
+            compound_emotions = result['emotion'].get('compound_emotions', [])
+        else:
+            base_emotion = '中性'
+            intensity = 1.0
+            compound_emotions = []
+
+        # 参数映射
+        param_map = {
+            '喜悦':  {'voice': '晓晓', 'pitch': 1.2, 'rate': 1.1, 'style': 'cheerful'},
+            '悲伤':  {'voice': '云希', 'pitch': 0.9, 'rate': 0.9, 'style': 'sad'},
+            '愤怒':  {'voice': '云泽', 'pitch': 1.3, 'rate': 1.2, 'style': 'angry'},
+            '恐惧':  {'voice': '晓伊', 'pitch': 1.1, 'rate': 1.0, 'style': 'fearful'},
+            '惊讶':  {'voice': '晓晓', 'pitch': 1.2, 'rate': 1.2, 'style': 'excited'},
+            '厌恶':  {'voice': '云希', 'pitch': 0.8, 'rate': 0.9, 'style': 'disgusted'},
+            '信任':  {'voice': '云野', 'pitch': 1.0, 'rate': 1.0, 'style': 'calm'},
+            '期待':  {'voice': '晓伊', 'pitch': 1.1, 'rate': 1.1, 'style': 'hopeful'},
+            '中性':  {'voice': '晓晓', 'pitch': 1.0, 'rate': 1.0, 'style': 'general'}
+        }
+        # 复合情感优先
+        if compound_emotions:
+            comp = compound_emotions[0]['label']
+            if comp == '爱':
+                param = {'voice': '云野', 'pitch': 1.1, 'rate': 1.05, 'style': 'affectionate'}
+            elif comp == '恨':
+                param = {'voice': '云泽', 'pitch': 1.3, 'rate': 1.2, 'style': 'angry'}
+            elif comp == '焦虑':
+                param = {'voice': '晓伊', 'pitch': 1.0, 'rate': 1.15, 'style': 'anxious'}
+            elif comp == '内疚':
+                param = {'voice': '云希', 'pitch': 0.8, 'rate': 0.9, 'style': 'sad'}
+            elif comp == '骄傲':
+                param = {'voice': '晓晓', 'pitch': 1.2, 'rate': 1.1, 'style': 'proud'}
+            elif comp == '羞耻':
+                param = {'voice': '晓伊', 'pitch': 0.9, 'rate': 0.95, 'style': 'shy'}
+            else:
+                param = param_map.get(base_emotion, param_map['中性'])
+        else:
+            param = param_map.get(base_emotion, param_map['中性'])
+        # 根据强度微调
+        param['pitch'] *= intensity
+        param['rate'] *= intensity
+        return {
+            'voice': self.voice_map.get(param['voice'], 'zh-CN-XiaoxiaoNeural'),
+            'pitch': param['pitch'],
+            'rate': param['rate'],
+            'style': param['style']
+        }
+
+    def submit_with_emotion(self, text: str, auto_analyze: bool = True, output_file: str = None) -> Future:
+        """在调用线程中完成情感分析，再把合成任务提交到工作池，立即返回 Future"""
+        params = self._emotion_params(text, auto_analyze)
+        return self.worker_pool.submit(self._render(text, output_file=output_file, **params))
+
     def synthesize_with_emotion(self, text: str, auto_analyze: bool = True, output_file: str = None) -> str:
         """根据情感分析结果自适应参数合成语音"""
+        future = self.submit_with_emotion(text, auto_analyze, output_file)
         try:
-            if auto_analyze:
-                analyzer = SentimentAnalyzer()
-                result = analyzer.analyze(text)
-                base_emotion = result['emotion']['base_emotion']['label']
-                intensity = result['intensity']['intensity_score']
-                compound_emotions = result['emotion'].get('compound_emotions', [])
-            else:
-                base_emotion = '中性'
-                intensity = 1.0
-                compound_emotions = []
-
-            # 参数映射
-            param_map = {
-                '喜悦':  {'voice': '晓晓', 'pitch': 1.2, 'rate': 1.1, 'style': 'cheerful'},
-                '悲伤':  {'voice': '云希', 'pitch': 0.9, 'rate': 0.9, 'style': 'sad'},
-                '愤怒':  {'voice': '云泽', 'pitch': 1.3, 'rate': 1.2, 'style': 'angry'},
-                '恐惧':  {'voice': '晓伊', 'pitch': 1.1, 'rate': 1.0, 'style': 'fearful'},
-                '惊讶':  {'voice': '晓晓', 'pitch': 1.2, 'rate': 1.2, 'style': 'excited'},
-                '厌恶':  {'voice': '云希', 'pitch': 0.8, 'rate': 0.9, 'style': 'disgusted'},
-                '信任':  {'voice': '云野', 'pitch': 1.0, 'rate': 1.0, 'style': 'calm'},
-                '期待':  {'voice': '晓伊', 'pitch': 1.1, 'rate': 1.1, 'style': 'hopeful'},
-                '中性':  {'voice': '晓晓', 'pitch': 1.0, 'rate': 1.0, 'style': 'general'}
-            }
-            # 复合情感优先
-            if compound_emotions:
-                comp = compound_emotions[0]['label']
-                if comp == '爱':
-                    param = {'voice': '云野', 'pitch': 1.1, 'rate': 1.05, 'style': 'affectionate'}
-                elif comp == '恨':
-                    param = {'voice': '云泽', 'pitch': 1.3, 'rate': 1.2, 'style': 'angry'}
-                elif comp == '焦虑':
-                    param = {'voice': '晓伊', 'pitch': 1.0, 'rate': 1.15, 'style': 'anxious'}
-                elif comp == '内疚':
-                    param = {'voice': '云希', 'pitch': 0.8, 'rate': 0.9, 'style': 'sad'}
-                elif comp == '骄傲':
-                    param = {'voice': '晓晓', 'pitch': 1.2, 'rate': 1.1, 'style': 'proud'}
-                elif comp == '羞耻':
-                    param = {'voice': '晓伊', 'pitch': 0.9, 'rate': 0.95, 'style': 'shy'}
-                else:
-                    param = param_map.get(base_emotion, param_map['中性'])
-            else:
-                param = param_map.get(base_emotion, param_map['中性'])
-            # 根据强度微调
-            param['pitch'] *= intensity
-            param['rate'] *= intensity
-            voice = self.voice_map.get(param['voice'], 'zh-CN-XiaoxiaoNeural')
-            pitch = param['pitch']
-            rate = param['rate']
-            style = param['style']
-            if output_file is None:
-                output_file = os.path.join(self.output_dir, f'speech_{hash(text)}.mp3')
-            try:
-                asyncio.run(self._synthesize_async_with_params(text, voice, output_file, pitch, rate, style))
-            except Exception as e:
-                raise RuntimeError(f"TTS合成失败: {str(e)}")
-            
-            # 不再删除生成的音频文件
-            return output_file
+            return future.result()
         except Exception as e:
-            raise
+            raise RuntimeError(f"TTS合成失败: {str(e)}")
+
+    async def synthesize_with_emotion_async(self, text: str, auto_analyze: bool = True, output_file: str = None) -> str:
+        """synthesize_with_emotion 的异步版本，情感分析在线程池中执行"""
+        loop = asyncio.get_running_loop()
+        params = await loop.run_in_executor(None, self._emotion_params, text, auto_analyze)
+        try:
+            return await self.worker_pool.run(self._render(text, output_file=output_file, **params))
+        except Exception as e:
+            raise RuntimeError(f"TTS合成失败: {str(e)}")
 
     async def _synthesize_async_with_params(self, text: str, voice: str, output_file: str, pitch: float, rate: float, style: str):
         """支持参数自适应的异步合成"""
+        import edge_tts
         communicate = edge_tts.Communicate(text, voice, rate=f"{rate}", pitch=f"{pitch}", style=style)
-        await communicate.save(output_file)
+        await self._communicate(communicate, output_file)
+
+    def synthesize_long_text(self, text: str, auto_analyze: bool = True,
+                             max_parallel: int = TTS_SEGMENT_PARALLELISM) -> str:
+        """长文本合成：按句切分、整批情感分析、分句并行合成后拼接为一个文件
+        
+        每个句子使用各自的语音参数，已缓存的句子直接复用。
+        
+        Args:
+            text: 合成文本
+            auto_analyze: 是否根据情感分析调整语音参数
+            max_parallel: 同时合成的句子数上限
+            
+        Returns:
+            str: 拼接后的音频文件路径
+        """
+        segments = split_sentences(text) or [text]
+        if auto_analyze:
+            results = self.analyzer.analyze_batch(segments)
+        else:
+            results = [None] * len(segments)
+        segment_params = [self._voice_params(result) for result in results]
+        
+        future = self.worker_pool.submit(self._render_segments(segments, segment_params, max_parallel))
+        try:
+            return future.result()
+        except Exception as e:
+            raise RuntimeError(f"TTS合成失败: {str(e)}")
+    
+    async def _render_segments(self, segments: List[str], segment_params: List[Dict[str, Any]],
+                               max_parallel: int) -> str:
+        """并发合成各句并按原顺序拼接（MP3 帧可直接首尾相接）"""
+        segment_keys = [
+            audio_cache_key(segment, p['voice'], p['rate'], p['pitch'], p['style'])
+            for segment, p in zip(segments, segment_params)
+        ]
+        key = audio_cache_key('', 'segments', style='|'.join(segment_keys))
+        cached = self.audio_cache.get(key)
+        if cached:
+            return cached
+        
+        limit = asyncio.Semaphore(max(1, max_parallel))
+        
+        async def render(segment: str, params: Dict[str, Any]) -> str:
+            async with limit:
+                return await self._render(segment, **params)
+        
+        # 重复的句子只合成一次
+        unique = {}
+        for segment_key, segment, params in zip(segment_keys, segments, segment_params):
+            unique.setdefault(segment_key, (segment, params))
+        # 拼接完成前固定本任务的各句，避免后提交的句子或并发请求触发淘汰时删掉先完成的句子
+        with self.audio_cache.pinned(unique):
+            rendered = await asyncio.gather(*(render(s, p) for s, p in unique.values()))
+            paths = [dict(zip(unique, rendered))[segment_key] for segment_key in segment_keys]
+            tmp_file = self.audio_cache.temp_path(key)
+            try:
+                with open(tmp_file, 'wb') as out:
+                    for path in paths:
+                        with open(path, 'rb') as f:
+                            out.write(f.read())
+            except Exception:
+                self.audio_cache.discard(tmp_file)
+                raise
+        return self._commit(key, tmp_file)
+    
+    def stream_with_emotion(self, text: str, auto_analyze: bool = True, chunk_size: int = 32 * 1024,
+                            idle_timeout: float = TTS_STREAM_IDLE_TIMEOUT) -> Tuple[str, bool, Iterator[bytes]]:
+        """流式合成：edge-tts 每收到一段音频就立即交给调用方，同时写入语音缓存
+        
+        相同文本的并发请求共用同一个进行中的合成会话，各自从头读取数据块。
+        
+        Args:
+            text: 合成文本
+            auto_analyze: 是否根据情感分析调整语音参数
+            chunk_size: 命中缓存时按此大小分块读取文件
+            idle_timeout: 等待下一个数据块的最长时间（秒），超时后迭代器抛出 RuntimeError
+            
+        Returns:
+            Tuple[str, bool, Iterator[bytes]]: (缓存文件路径, 是否命中缓存, 音频数据块迭代器)；
+                未命中时该路径在合成成功完成后才存在
+        """
+        params = self._emotion_params(text, auto_analyze)
+        key = audio_cache_key(text, params['voice'], params['rate'], params['pitch'], params['style'])
+        cached = self.audio_cache.get(key)
+        if cached:
+            return cached, True, self._iter_file(cached, chunk_size)
+        
+        with self._streams_lock:
+            stream = self._streams.get(key)
+            created = stream is None
+            if created:
+                # 加锁后再查一次：进行中的会话可能刚刚完成并登记进缓存
+                cached = self.audio_cache.get(key)
+                if cached:
+                    return cached, True, self._iter_file(cached, chunk_size)
+                stream = self._streams[key] = _ChunkStream()
+        if created:
+            try:
+                self.worker_pool.submit(self._stream_to_cache(text, key, stream, **params))
+            except Exception as e:
+                self._finish_stream(key, stream, e)
+        return self.audio_cache.path_for(key), False, stream.iterate(idle_timeout)
+    
+    async def _stream_to_cache(self, text: str, key: str, stream: _ChunkStream,
+                               voice: str, pitch: float, rate: float, style: str):
+        """在工作池循环上读取 edge-tts 流，数据块同时写入临时文件和数据流"""
+        tmp_file = self.audio_cache.temp_path(key)
+        try:
+            import edge_tts
+            communicate = edge_tts.Communicate(text, voice, rate=f"{rate}", pitch=f"{pitch}", style=style)
+            await self._communicate(communicate, tmp_file, stream)
+            # 即使客户端中途断开，完整音频也会进入缓存
+            self._commit(key, tmp_file)
+        except Exception as e:
+            self.audio_cache.discard(tmp_file)
+            self._finish_stream(key, stream, e)
+        else:
+            self._finish_stream(key, stream)
+    
+    def _finish_stream(self, key: str, stream: _ChunkStream, error: Optional[BaseException] = None):
+        """结束数据流并移出进行中列表（之后的请求直接命中缓存或重新合成）"""
+        with self._streams_lock:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+        stream.finish(error)
+    
+    @staticmethod
+    def _iter_file(path: str, chunk_size: int) -> Iterator[bytes]:
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    return
+                yield data
 
 # 为了兼容性，保留别名
 AdvancedTTSEngine = TTSEngine
+
+_DEFAULT_ENGINE: Optional[TTSEngine] = None
+_DEFAULT_ENGINE_LOCK = threading.Lock()
+
+
+def get_tts_engine() -> TTSEngine:
+    """获取进程内共享的语音合成引擎"""
+    global _DEFAULT_ENGINE
+    with _DEFAULT_ENGINE_LOCK:
+        if _DEFAULT_ENGINE is None:
+            _DEFAULT_ENGINE = TTSEngine()
+        return _DEFAULT_ENGINE
@@ -0,0 +1,323 @@
+"""
+异步语音合成任务队列
+提交后立即返回任务 ID，由固定数量的后台线程完成情感分析和远程合成，
+调用方轮询任务状态或订阅状态变化即可，不再为整个合成过程占用请求线程。
+
+任务状态依次为 queued → running → done / failed。配置了状态目录时，
+每次状态变化都写入 <状态目录>/<任务ID>.json，多进程部署下其他工作进程也能查询到该任务。
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+from typing import Dict, List, Optional
+
+FINISHED_STATES = ('done', 'failed')
+
+# 查询其他进程的任务时轮询状态文件的间隔（秒）
+_FILE_POLL_INTERVAL = 0.5
+
+
+class TTSQueueFullError(RuntimeError):
+    """任务队列已满，拒绝新的合成任务"""
+
+
+class TTSJob:
+    """一个语音合成任务"""
+
+    __slots__ = ('id', 'text', 'auto_analyze', 'long_text', 'status', 'created_at',
+                 'started_at', 'finished_at', 'output_file', 'error', 'version')
+
+    def __init__(self, text: str, auto_analyze: bool = True, long_text: bool = False):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.auto_analyze = auto_analyze
+        self.long_text = long_text
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.output_file: Optional[str] = None
+        self.error: Optional[str] = None
+        # 每次状态变化加一，用于判断订阅方是否已看到最新状态
+        self.version = 0
+
+    def to_dict(self) -> Dict:
+        """任务状态快照（不含原文）"""
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'version': self.version,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.output_file:
+            data['audio_url'] = f'/audio/{os.path.basename(self.output_file)}'
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+def is_valid_job_id(job_id: str) -> bool:
+    """任务 ID 是否为 32 位十六进制串（同时保证可以安全地拼接为文件名）"""
+    return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+
+
+class TTSJobQueue:
+    """有界队列 + 固定数量后台线程的语音合成任务队列"""
+
+    def __init__(self, engine, workers: int = 2, max_queue: int = 32, result_ttl: float = 600,
+                 state_dir: Optional[str] = None):
+        """初始化任务队列（后台线程在首次提交任务时启动）
+
+        Args:
+            engine: 语音合成引擎
+            workers: 同时执行的合成任务数
+            max_queue: 排队等待的任务上限，队列满时拒绝提交
+            result_ttl: 已结束任务的保留时间（秒），过期后查询不到
+            state_dir: 任务状态文件目录，为空时只在本进程内可见
+        """
+        self.engine = engine
+        self.workers = max(1, int(workers))
+        self.result_ttl = float(result_ttl)
+        self.state_dir = state_dir
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._jobs: Dict[str, TTSJob] = {}
+        self._changed = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._last_purge = 0.0
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'running': 0}
+
+    @property
+    def max_queue(self) -> int:
+        return self._queue.maxsize
+
+    def configure(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                  result_ttl: Optional[float] = None, state_dir: Optional[str] = None):
+        """调整队列参数（需在首次提交任务前调用）"""
+        if workers is not None:
+            self.workers = max(1, int(workers))
+        if max_queue is not None:
+            self._queue.maxsize = max(1, int(max_queue))
+        if result_ttl is not None:
+            self.result_ttl = float(result_ttl)
+        if state_dir is not None:
+            self.state_dir = state_dir or None
+
+    def _ensure_workers(self):
+        """按需启动后台线程；fork 出的子进程中线程不存在，需要重新启动"""
+        with self._changed:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._work, name=f'tts-job-{index}', daemon=True)
+                for index in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def submit(self, text: str, auto_analyze: bool = True, long_text: bool = False) -> TTSJob:
+        """提交合成任务
+
+        Args:
+            text: 合成文本
+            auto_analyze: 是否根据情感分析调整语音参数
+            long_text: 是否按长文本分句合成
+
+        Returns:
+            TTSJob: 已排队的任务
+
+        Raises:
+            TTSQueueFullError: 排队任务数已达上限时
+        """
+        self._ensure_workers()
+        self._purge()
+        job = TTSJob(text, auto_analyze, long_text)
+        if self._queue.full():
+            self._reject()
+        # 先登记并写入状态文件再入队，避免后台线程的 running 状态被 queued 覆盖
+        with self._changed:
+            self._jobs[job.id] = job
+        self._persist(job.to_dict())
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._changed:
+                del self._jobs[job.id]
+            self._remove(job.id)
+            self._reject()
+        with self._changed:
+            self._stats['submitted'] += 1
+        return job
+
+    def _reject(self):
+        with self._changed:
+            self._stats['rejected'] += 1
+        raise TTSQueueFullError(f'语音合成任务队列已满（{self._queue.maxsize} 个任务排队中）')
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态快照，任务不存在或已过期时返回 None"""
+        if not is_valid_job_id(job_id):
+            return None
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                # 过期但尚未被清理的任务同样视为不存在
+                return None if self._expired(job.finished_at) else job.to_dict()
+        return self._load(job_id)
+
+    def wait(self, job_id: str, seen_version: int, timeout: float) -> Optional[Dict]:
+        """等待任务状态发生变化
+
+        Args:
+            job_id: 任务 ID
+            seen_version: 调用方已看到的状态版本
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            Optional[Dict]: 当前状态快照（超时时 version 可能仍等于 seen_version），
+                任务不存在或已过期时返回 None
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._changed.wait_for(lambda: job.version != seen_version, timeout)
+                return job.to_dict()
+        # 其他进程提交的任务：轮询状态文件
+        while True:
+            snapshot = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if snapshot is None or snapshot['version'] != seen_version or remaining <= 0:
+                return snapshot
+            time.sleep(min(_FILE_POLL_INTERVAL, remaining))
+
+    def stats(self) -> Dict[str, int]:
+        """返回提交、拒绝、完成、失败、执行中和排队中的任务数"""
+        with self._changed:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['workers'] = self.workers
+        stats['max_queue'] = self._queue.maxsize
+        return stats
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            self._update(job, status='running', started_at=time.time())
+            try:
+                if job.long_text:
+                    output_file = self.engine.synthesize_long_text(job.text, auto_analyze=job.auto_analyze)
+                else:
+                    output_file = self.engine.synthesize_with_emotion(job.text, auto_analyze=job.auto_analyze)
+            except Exception as e:
+                self._update(job, status='failed', error=str(e), finished_at=time.time())
+            else:
+                self._update(job, status='done', output_file=output_file, finished_at=time.time())
+
+    def _update(self, job: TTSJob, **changes):
+        """修改任务状态，写入状态文件后再唤醒等待该任务的订阅方
+
+        状态文件在锁内写入：本进程的订阅方和查询看到新状态时，其他进程读到的状态文件也已是新状态。
+        """
+        with self._changed:
+            previous = job.status
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            if previous == 'running':
+                self._stats['running'] -= 1
+            if job.status == 'running':
+                self._stats['running'] += 1
+            elif job.status == 'done':
+                self._stats['completed'] += 1
+            elif job.status == 'failed':
+                self._stats['failed'] += 1
+            # 原文只在执行时需要，结束后释放
+            if job.status in FINISHED_STATES:
+                job.text = ''
+            self._persist(job.to_dict())
+            self._changed.notify_all()
+
+    def _purge(self):
+        """清理过期的已结束任务（最多每秒一次）"""
+        now = time.time()
+        if now - self._last_purge < 1:
+            return
+        self._last_purge = now
+        expired = []
+        with self._changed:
+            for job_id, job in list(self._jobs.items()):
+                if self._expired(job.finished_at, now):
+                    del self._jobs[job_id]
+                    expired.append(job_id)
+        for job_id in expired:
+            self._remove(job_id)
+
+    def _expired(self, finished_at: Optional[float], now: Optional[float] = None) -> bool:
+        """已结束的任务是否超过保留时间"""
+        if finished_at is None:
+            return False
+        return (now or time.time()) - finished_at > self.result_ttl
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f'{job_id}.json')
+
+    def _persist(self, snapshot: Dict):
+        """原子地写入任务状态文件"""
+        if not self.state_dir:
+            return
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            path = self._path(snapshot['job_id'])
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"警告：写入合成任务状态失败: {str(e)}")
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        """读取其他进程写入的任务状态，过期的已结束任务视为不存在"""
+        if not self.state_dir:
+            return None
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return None if self._expired(snapshot.get('finished_at')) else snapshot
+
+    def _remove(self, job_id: str):
+        if not self.state_dir:
+            return
+        try:
+            os.remove(self._path(job_id))
+        except OSError:
+            pass
+
+    def sweep_state_dir(self) -> int:
+        """删除状态目录中超过保留时间未更新的状态文件（包括已退出进程遗留的任务），返回删除数量"""
+        if not self.state_dir:
+            return 0
+        removed = 0
+        now = time.time()
+        try:
+            names = os.listdir(self.state_dir)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.state_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.result_ttl:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
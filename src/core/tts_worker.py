@@ -0,0 +1,158 @@
+"""
+语音合成后台工作池
+在一个常驻的后台线程中运行事件循环，所有 edge-tts 会话都在该循环上执行，
+并通过信号量限制同时进行的外部合成会话数。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, Optional
+from .config import TTS_MAX_CONCURRENCY
+from .tracing import current_trace, tracing
+
+
+class TTSWorkerPool:
+    """常驻事件循环 + 并发上限的语音合成工作池"""
+
+    def __init__(self, max_concurrency: int = TTS_MAX_CONCURRENCY):
+        """初始化工作池
+
+        Args:
+            max_concurrency: 同时进行的 edge-tts 会话上限
+        """
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        # 计数在调用方线程和事件循环线程上都会修改
+        self._stats_lock = threading.Lock()
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'in_flight': 0, 'waiting': 0}
+
+    def start(self):
+        """启动后台事件循环线程（重复调用无副作用）"""
+        with self._lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), name='tts-worker-loop', daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def _run_loop(self, ready: threading.Event):
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            # 循环只能在停止运行后关闭，由本线程负责
+            loop.close()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止事件循环线程
+
+        事件循环由工作池线程在退出前关闭；timeout 内未退出（例如某个回调阻塞了事件循环）时直接返回。
+        """
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """工作池的事件循环（按需启动）"""
+        if self._loop is None:
+            self.start()
+        return self._loop
+
+    def submit(self, coro: Awaitable) -> Future:
+        """供同步调用方提交协程，返回 concurrent.futures.Future
+
+        Args:
+            coro: 在工作池事件循环上执行的协程
+
+        Returns:
+            Future: 可阻塞等待结果的 Future
+        """
+        # 协程在工作池线程上运行，诊断模式下把提交方的追踪对象带过去
+        trace = current_trace()
+        if trace is not None:
+            coro = self._traced(coro, trace)
+        # 先计入提交数，避免任务很快结束时完成数暂时超过提交数
+        self._count('submitted')
+        return asyncio.run_coroutine_threadsafe(self._track(coro), self.loop)
+
+    async def run(self, coro: Awaitable) -> Any:
+        """供异步调用方直接 await
+
+        已经在工作池循环上时直接执行，否则转交给工作池并等待结果。
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop and running is not None:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    @asynccontextmanager
+    async def session(self):
+        """占用一个 edge-tts 会话名额，只能在工作池循环上使用"""
+        self._count('waiting')
+        try:
+            await self._semaphore.acquire()
+        finally:
+            # 等待期间被取消时同样要减回去
+            self._count('waiting', -1)
+        self._count('in_flight')
+        try:
+            yield
+        finally:
+            self._count('in_flight', -1)
+            self._semaphore.release()
+
+    @staticmethod
+    async def _traced(coro: Awaitable, trace) -> Any:
+        with tracing(trace):
+            return await coro
+
+    async def _track(self, coro: Awaitable) -> Any:
+        try:
+            result = await coro
+        except BaseException:
+            self._count('failed')
+            raise
+        self._count('completed')
+        return result
+
+    def _count(self, name: str, delta: int = 1):
+        with self._stats_lock:
+            self._stats[name] += delta
+
+    def stats(self) -> Dict[str, int]:
+        """返回提交、完成、失败、进行中和排队等待的任务数"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+
+_DEFAULT_POOL: Optional[TTSWorkerPool] = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def get_tts_pool() -> TTSWorkerPool:
+    """获取进程内共享的语音合成工作池"""
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = TTSWorkerPool()
+        return _DEFAULT_POOL
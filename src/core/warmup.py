@@ -0,0 +1,88 @@
+"""
+后台预热
+服务先开始监听，模型加载和预热在后台线程中完成，
+就绪状态供健康检查区分存活（liveness）与就绪（readiness）。
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+PENDING = 'pending'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class Warmup:
+    """按顺序执行的预热步骤及其就绪状态"""
+
+    def __init__(self, steps: Dict[str, Callable[[], Any]]):
+        """初始化预热任务
+
+        Args:
+            steps: 步骤名称 -> 无参可调用对象，返回值会记录在状态中
+        """
+        self.steps = steps
+        self.state = PENDING
+        self.results: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self._started_at = None
+        self._finished_at = None
+        self._done = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self) -> 'Warmup':
+        """在后台线程中执行预热（重复调用无副作用）"""
+        with self._lock:
+            if self._thread is None and self.state == PENDING:
+                self._thread = threading.Thread(target=self.run, name='model-warmup', daemon=True)
+                self._thread.start()
+        return self
+
+    def run(self) -> bool:
+        """在当前线程中执行全部预热步骤
+
+        Returns:
+            bool: 是否全部成功
+        """
+        self.state = WARMING
+        self._started_at = time.perf_counter()
+        try:
+            for name, step in self.steps.items():
+                self.results[name] = step()
+            self.state = READY
+        except Exception as e:
+            print(f"预热失败: {str(e)}")
+            self.error = str(e)
+            self.state = FAILED
+        finally:
+            self._finished_at = time.perf_counter()
+            self._done.set()
+        return self.state == READY
+
+    def mark_ready(self):
+        """不做预热、直接视为就绪（模型改为在首次请求时加载）"""
+        self.state = READY
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待预热结束，返回是否就绪"""
+        self._done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def status(self) -> Dict[str, Any]:
+        """返回预热状态、各步骤结果和耗时"""
+        elapsed = None
+        if self._started_at is not None:
+            end = self._finished_at or time.perf_counter()
+            elapsed = round((end - self._started_at) * 1000, 1)
+        status = {'state': self.state, 'elapsed_ms': elapsed, 'steps': dict(self.results)}
+        if self.error:
+            status['error'] = self.error
+        return status
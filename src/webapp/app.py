@@ -4,14 +4,17 @@ EmotionSpeak Web应用
 """
 
 import os
-from flask import Flask, request, jsonify, render_template, send_from_directory
+import time
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
 from .config import config
 from .routes import register_routes
-from ..core.sentiment import SentimentAnalyzer
-from ..core.tts_engine import TTSEngine
+from ..core.sentiment.analyzer import get_analyzer
+from ..core.tts_engine import get_tts_engine
+from ..core.warmup import Warmup
 from ..core.config import AUDIO_DIR
+from ..core.metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUEST_SECONDS
 
 # 加载环境变量
 load_dotenv()
@@ -38,17 +41,23 @@ def create_app(config_name: str = 'default') -> Flask:
     # 初始化扩展
     CORS(app)
     
-    # 初始化情感分析器
-    sentiment_analyzer = SentimentAnalyzer()
-    app.sentiment_analyzer = sentiment_analyzer
-    
-    # 初始化TTS引擎
-    tts_engine = TTSEngine()
-    app.tts_engine = tts_engine
+    # 进程内共享的情感分析器和TTS引擎
+    app.sentiment_analyzer = get_analyzer()
+    app.tts_engine = get_tts_engine()
     
     # 注册路由
     register_routes(app)
     
+    if app.config.get('METRICS_ENABLED', True):
+        _register_metrics(app)
+    
+    # 模型加载和预热在后台进行，服务无需等待即可开始监听
+    app.warmup = Warmup({'sentiment': app.sentiment_analyzer.warm_up})
+    if app.config.get('MODEL_WARMUP', True):
+        app.warmup.start()
+    else:
+        app.warmup.mark_ready()
+    
     @app.route('/')
     def index():
         """主页"""
@@ -66,14 +75,109 @@ def create_app(config_name: str = 'default') -> Flask:
     
     @app.route('/health')
     def health_check():
-        """健康检查"""
+        """健康检查：live 表示进程存活，ready 表示模型已加载并完成预热"""
         return jsonify({
             'status': 'healthy',
             'version': '2.0.0',
+            'live': True,
+            'ready': app.warmup.ready,
+            'warmup': app.warmup.status()
         })
     
+    @app.route('/health/live')
+    def liveness_check():
+        """存活探针"""
+        return jsonify({'live': True})
+    
+    @app.route('/health/ready')
+    def readiness_check():
+        """就绪探针，预热完成前返回 503"""
+        ready = app.warmup.ready
+        return jsonify({'ready': ready, 'warmup': app.warmup.status()}), 200 if ready else 503
+    
     return app
 
+def _register_metrics(app: Flask):
+    """注册 /metrics 端点、HTTP 请求计时及抓取时读取的缓存和队列统计"""
+    analyzer = app.sentiment_analyzer
+    tts_engine = app.tts_engine
+    
+    def cache_lookups():
+        caches = [('audio', tts_engine.audio_cache.stats())]
+        if analyzer.cache is not None:
+            caches.append(('result', analyzer.cache.stats()))
+        for name, stats in caches:
+            yield (name, 'hit'), stats['hits']
+            yield (name, 'miss'), stats['misses']
+    
+    def cache_entries():
+        yield ('audio',), tts_engine.audio_cache.stats()['files']
+        if analyzer.cache is not None:
+            yield ('result',), analyzer.cache.stats()['size']
+    
+    def queue_depth():
+        scheduler = analyzer.scheduler
+        yield ('inference',), scheduler.stats()['queue_depth'] if scheduler is not None else 0
+        yield ('tts_session',), tts_engine.worker_pool.stats()['waiting']
+        jobs = getattr(app, 'tts_jobs', None)
+        if jobs is not None:
+            yield ('tts_jobs',), jobs.stats()['queued']
+    
+    def scheduler_counts():
+        scheduler = analyzer.scheduler
+        if scheduler is not None:
+            stats = scheduler.stats()
+            yield ('requests',), stats['requests']
+            yield ('batches',), stats['batches']
+            yield ('timeouts',), stats['timeouts']
+    
+    def tts_in_flight():
+        yield (), tts_engine.worker_pool.stats()['in_flight']
+    
+    def tts_job_counts():
+        jobs = getattr(app, 'tts_jobs', None)
+        if jobs is not None:
+            stats = jobs.stats()
+            for result in ('submitted', 'rejected', 'completed', 'failed'):
+                yield (result,), stats[result]
+    
+    def tier_counts():
+        for tier, count in analyzer.cascade_stats()['tiers'].items():
+            yield (tier,), count
+    
+    REGISTRY.register_callback('emotionspeak_cache_lookups', '缓存查询次数', 'counter',
+                               ('cache', 'result'), cache_lookups)
+    REGISTRY.register_callback('emotionspeak_cache_entries', '缓存条目数', 'gauge', ('cache',), cache_entries)
+    REGISTRY.register_callback('emotionspeak_queue_depth', '排队等待的请求数', 'gauge', ('queue',), queue_depth)
+    REGISTRY.register_callback('emotionspeak_inference_scheduler', '微批调度器处理的请求数、批次数和超过延迟预算撤销的请求数', 'counter',
+                               ('kind',), scheduler_counts)
+    REGISTRY.register_callback('emotionspeak_tts_sessions_in_flight', '进行中的 edge-tts 会话数', 'gauge',
+                               (), tts_in_flight)
+    REGISTRY.register_callback('emotionspeak_tts_jobs', '异步语音合成任务数', 'counter', ('result',),
+                               tts_job_counts)
+    REGISTRY.register_callback('emotionspeak_analysis_tier', '各层级给出分析结果的次数', 'counter',
+                               ('tier',), tier_counts)
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            # 以路由规则而非实际路径作为标签，避免标签基数无限增长
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(
+                time.perf_counter() - started
+            )
+        return response
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus 文本格式的运行指标"""
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 def get_app() -> Flask:
     """获取应用实例
     
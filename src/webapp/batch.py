@@ -0,0 +1,233 @@
+"""
+批量分析的流式输入输出
+请求体（JSON 数组或 NDJSON）边读边解析，按块交给 analyze_batch，
+每块完成后立即输出对应的 NDJSON 结果行，两端内存占用都与提交总量无关。
+"""
+
+import json
+import codecs
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from werkzeug.exceptions import HTTPException
+
+_READ_SIZE = 64 * 1024
+_WHITESPACE = ' \t\r\n'
+# 数字后面可能还有的字符：读取边界落在数字中间时 "-0.5" 已能解析，但后续可能还有 "e3"
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class BatchInputError(ValueError):
+    """请求体无法继续解析（之后的条目全部丢弃）"""
+
+
+def _read(read: Callable[[int], bytes], size: int) -> bytes:
+    """读取请求体；超出 MAX_CONTENT_LENGTH 或客户端断开时转为 BatchInputError"""
+    try:
+        return read(size)
+    except HTTPException as e:
+        raise BatchInputError(e.description)
+
+
+def iter_ndjson(stream: BinaryIO, max_line_bytes: int) -> Iterator[Tuple[Any, Optional[str]]]:
+    """逐行解析 NDJSON 请求体
+
+    Args:
+        stream: 请求体输入流
+        max_line_bytes: 单行最大字节数，超出的行记为错误
+
+    Yields:
+        Tuple[Any, Optional[str]]: (解析出的值, 错误信息)，空行跳过
+    """
+    while True:
+        line = _read(stream.readline, max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # 丢弃超长行的剩余部分
+            while line and not line.endswith(b'\n'):
+                line = _read(stream.readline, _READ_SIZE)
+            yield None, f'行长度超过 {max_line_bytes} 字节'
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, f'JSON 解析失败: {str(e)}'
+
+
+def iter_json_array(stream: BinaryIO, max_item_bytes: int) -> Iterator[Tuple[Any, Optional[str]]]:
+    """增量解析顶层 JSON 数组，每次只在内存中保留当前元素
+
+    Args:
+        stream: 请求体输入流
+        max_item_bytes: 单个元素的最大字节数
+
+    Yields:
+        Tuple[Any, Optional[str]]: (数组元素, None)
+
+    Raises:
+        BatchInputError: 请求体不是合法的 JSON 数组时
+    """
+    decoder = json.JSONDecoder()
+    reader = _Utf8Reader(stream)
+    buffer = ''
+    eof = False
+    started = False
+
+    while True:
+        # 跳过空白和元素间的逗号
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer, position, eof = buffer[position:] + reader.read(), 0, reader.eof
+        buffer = buffer[position:]
+        if not started:
+            if not buffer.startswith('['):
+                raise BatchInputError('请求体必须是 JSON 数组或 NDJSON')
+            buffer, started = buffer[1:], True
+            continue
+        if not buffer:
+            raise BatchInputError('JSON 数组不完整')
+        if buffer[0] == ']':
+            return
+        if buffer[0] == ',':
+            buffer = buffer[1:]
+            continue
+
+        # 元素可能跨越读取边界：解析失败或其后只剩可能属于同一个数字的字符时继续读取
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError as e:
+                if eof:
+                    raise BatchInputError(f'JSON 解析失败: {str(e)}')
+                item, end = None, None
+            if end is not None and (buffer[end:].lstrip(_NUMBER_CHARS) or eof):
+                break
+            if len(buffer.encode('utf-8')) > max_item_bytes:
+                raise BatchInputError(f'单个元素超过 {max_item_bytes} 字节')
+            buffer += reader.read()
+            eof = reader.eof
+        buffer = buffer[end:]
+        yield item, None
+
+
+class _Utf8Reader:
+    """按块读取字节流并增量解码为 UTF-8（多字节字符可以跨块）"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.eof = False
+
+    def read(self) -> str:
+        data = _read(self._stream.read, _READ_SIZE)
+        self.eof = not data
+        try:
+            return self._decoder.decode(data, final=self.eof)
+        except UnicodeDecodeError:
+            raise BatchInputError('请求体不是合法的 UTF-8 文本')
+
+
+def _normalize(item: Any) -> Tuple[Optional[str], Any, Optional[str]]:
+    """把输入条目统一为 (文本, 调用方 id, 错误信息)"""
+    if isinstance(item, str):
+        return (item, None, None) if item.strip() else (None, None, '文本不能为空')
+    if isinstance(item, dict):
+        text = item.get('text')
+        if not isinstance(text, str) or not text.strip():
+            return None, item.get('id'), '缺少 text 字段或文本为空'
+        return text, item.get('id'), None
+    return None, None, '条目必须是字符串或包含 text 字段的对象'
+
+
+def analyze_stream(analyzer, items: Iterator[Tuple[Any, Optional[str]]], chunk_size: int,
+                   max_items: int) -> Iterator[str]:
+    """按块分析输入条目，逐行产出 NDJSON
+
+    每个条目输出一行 {"index", "id", "result"} 或 {"index", "id", "error"}，顺序与输入一致；
+    最后一行为 {"done": true, "total", "errors"}。请求体在中途无法解析时，
+    最后一行为 {"done": false, "error"}。
+
+    Args:
+        analyzer: 情感分析器
+        items: iter_ndjson / iter_json_array 产出的条目
+        chunk_size: 每次批量分析的条目数
+        max_items: 单次提交的最大条目数，超出部分不处理
+
+    Yields:
+        str: NDJSON 行（含换行符）
+    """
+    pending: List[Dict] = []
+    total = 0
+    errors = 0
+
+    def flush() -> Iterator[str]:
+        nonlocal errors
+        texts = [entry['text'] for entry in pending if 'text' in entry]
+        results = iter(_analyze_chunk(analyzer, texts))
+        for entry in pending:
+            line = {'index': entry['index']}
+            if entry.get('id') is not None:
+                line['id'] = entry['id']
+            if 'text' in entry:
+                result, error = next(results)
+            else:
+                result, error = None, entry['error']
+            if error is None:
+                line['result'] = result
+            else:
+                line['error'] = error
+                errors += 1
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+        pending.clear()
+
+    try:
+        for item, parse_error in items:
+            if total >= max_items:
+                yield from flush()
+                yield json.dumps({'done': False, 'total': total, 'errors': errors,
+                                  'error': f'条目数超过上限 {max_items}，其余条目未处理'}, ensure_ascii=False) + '\n'
+                return
+            entry = {'index': total}
+            total += 1
+            if parse_error is not None:
+                entry['error'] = parse_error
+            else:
+                text, item_id, error = _normalize(item)
+                entry['id'] = item_id
+                if error is None:
+                    entry['text'] = text
+                else:
+                    entry['error'] = error
+            pending.append(entry)
+            if len(pending) >= chunk_size:
+                yield from flush()
+    except BatchInputError as e:
+        yield from flush()
+        yield json.dumps({'done': False, 'total': total, 'errors': errors, 'error': str(e)}, ensure_ascii=False) + '\n'
+        return
+
+    yield from flush()
+    yield json.dumps({'done': True, 'total': total, 'errors': errors}) + '\n'
+
+
+def _analyze_chunk(analyzer, texts: List[str]) -> List[Tuple[Optional[Dict], Optional[str]]]:
+    """批量分析一块文本，整块失败时逐条分析以定位出错的条目"""
+    if not texts:
+        return []
+    try:
+        return [(result, None) for result in analyzer.analyze_batch(texts)]
+    except Exception:
+        pass
+    outcomes = []
+    for text in texts:
+        try:
+            outcomes.append((analyzer.analyze(text), None))
+        except Exception as e:
+            outcomes.append((None, str(e)))
+    return outcomes
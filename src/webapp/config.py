@@ -57,6 +57,43 @@ class Config:
         }
     }
     
+    # 批量分析接口 /api/analyze/batch：每块条目数、单次提交的条目上限、单条输入的字节上限
+    ANALYZE_BATCH = {
+        'chunk_size': int(os.environ.get('ANALYZE_BATCH_CHUNK_SIZE', 64)),
+        'max_items': int(os.environ.get('ANALYZE_BATCH_MAX_ITEMS', 100000)),
+        'max_item_bytes': int(os.environ.get('ANALYZE_BATCH_MAX_ITEM_BYTES', 64 * 1024))
+    }
+    
+    # 启动后在后台加载模型并预热（关闭时在首次请求时加载）
+    MODEL_WARMUP = os.environ.get('MODEL_WARMUP', 'true').lower() == 'true'
+    
+    # 推理微批调度配置（排队等待超过 latency_budget_ms 的请求撤销排队，改用规则分析返回，
+    # 结果带 degraded 字段，/api/analyze 响应中 degraded 为 true）
+    INFERENCE_SCHEDULER = {
+        'enabled': os.environ.get('INFERENCE_SCHEDULER', 'true').lower() == 'true',
+        'max_batch_size': int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 16)),
+        'max_wait_ms': float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5)),
+        'latency_budget_ms': float(os.environ.get('INFERENCE_LATENCY_BUDGET_MS', 500))
+    }
+    
+    # 级联分析配置：词典置信度达到阈值的文本不经过模型
+    SENTIMENT_CASCADE = {
+        'enabled': os.environ.get('SENTIMENT_CASCADE', 'false').lower() == 'true',
+        'threshold': float(os.environ.get('SENTIMENT_CASCADE_THRESHOLD', 0.75))
+    }
+    
+    # Prometheus 文本格式的 /metrics 端点
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # 单请求诊断：携带有效 X-Debug-Token 的请求可开启分阶段计时（timing）或性能剖析（profile），
+    # 未配置令牌时诊断功能关闭
+    REQUEST_DIAGNOSTICS = {
+        'token': os.environ.get('DIAGNOSTICS_TOKEN', ''),
+        # profile=save 时剖析文件的保存目录，为空时使用 data/profiles
+        'profile_dir': os.environ.get('DIAGNOSTICS_PROFILE_DIR', ''),
+        'profile_top': int(os.environ.get('DIAGNOSTICS_PROFILE_TOP', 25))
+    }
+    
     # 语音合成配置
     TTS_CONFIG = {
         'default_voice': 'zh-CN-XiaoxiaoNeural',
@@ -65,12 +102,31 @@ class Config:
         'default_speed': 1.0,
         'default_volume': 1.0,
         'output_format': 'mp3',
-        'sample_rate': 24000
+        'sample_rate': 24000,
+        # 请求未指定 long_text 时，超过该长度的文本按句切分并行合成（0 表示只在请求显式要求时分句）
+        'long_text_threshold': int(os.environ.get('TTS_LONG_TEXT_THRESHOLD', 0))
+    }
+    
+    # 异步语音合成任务（/api/tts/jobs）：后台合成线程数、排队任务上限、结束任务的保留时间（秒）、
+    # 事件流单次连接的最长时长（秒，到时关闭连接，客户端自动重连）；多进程部署时通过状态目录共享任务状态
+    TTS_JOBS = {
+        'workers': int(os.environ.get('TTS_JOB_WORKERS', 4)),
+        'max_queue': int(os.environ.get('TTS_JOB_QUEUE_SIZE', 64)),
+        'result_ttl': int(os.environ.get('TTS_JOB_RESULT_TTL', 600)),
+        'events_timeout': int(os.environ.get('TTS_JOB_EVENTS_TIMEOUT', 30)),
+        # 同时打开的事件流上限（每个事件流占用一个服务线程），默认为 WORKER_THREADS 的四分之一，
+        # 超出时返回 503，客户端应改为轮询；设为 0 关闭事件流
+        'max_event_streams': int(os.environ.get(
+            'TTS_JOB_MAX_EVENT_STREAMS', max(1, int(os.environ.get('WORKER_THREADS', 4)) // 4)
+        )),
+        # 为空时使用 data/tts_jobs
+        'state_dir': os.environ.get('TTS_JOB_STATE_DIR', '')
     }
     
-    # 缓存配置
-    CACHE_TYPE = 'simple'
-    CACHE_DEFAULT_TIMEOUT = 300
+    # 缓存配置（CACHE_TYPE 为 'null' 时关闭分析结果缓存）
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD', 2048))
     
     # 跨域配置
     CORS_ORIGINS = ['http://localhost:5000', 'http://127.0.0.1:5000']
@@ -0,0 +1,113 @@
+"""
+单请求诊断
+授权调用方（请求头 X-Debug-Token 与配置的令牌一致）可以为单个请求开启：
+
+- timing：在 JSON 响应的 diagnostics 字段中返回分阶段耗时
+- profile：在确定性性能剖析器（cProfile）下执行该请求，返回按累计耗时排序的函数；
+  取值为 save 时还把完整剖析数据写入文件，可用 pstats 或 snakeviz 查看
+
+两个开关都可以通过请求头（X-Debug-Timing / X-Debug-Profile）或查询参数（timing / profile）传入。
+未带开关的请求直接调用原视图函数。
+"""
+
+import os
+import hmac
+import time
+import uuid
+import pstats
+import cProfile
+import functools
+import threading
+from typing import Dict, List, Optional
+from flask import current_app, jsonify, request
+from ..core.config import DATA_DIR
+from ..core.tracing import RequestTrace, tracing
+
+TOKEN_HEADER = 'X-Debug-Token'
+TIMING_HEADER = 'X-Debug-Timing'
+PROFILE_HEADER = 'X-Debug-Profile'
+
+# 同一时间只剖析一个请求，避免多个剖析器相互干扰
+_PROFILE_LOCK = threading.Lock()
+
+
+def _flag(name: str, header: str) -> Optional[str]:
+    value = request.headers.get(header) or request.args.get(name)
+    if not value or value.lower() in ('0', 'false', 'no', 'off'):
+        return None
+    return value.lower()
+
+
+def _authorized(config: Dict) -> bool:
+    token = config.get('token') or ''
+    supplied = request.headers.get(TOKEN_HEADER, '')
+    return bool(token) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+    """按累计耗时取前 limit 个函数"""
+    stats = pstats.Stats(profiler)
+    stats.sort_stats('cumulative')
+    rows = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, calls, tottime, cumtime, _ = stats.stats[func]
+        rows.append({
+            'function': pstats.func_std_string(func),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3)
+        })
+    return rows
+
+
+def _save_profile(profiler: cProfile.Profile, config: Dict) -> str:
+    """把剖析数据写入 pstats 文件，返回文件路径"""
+    profile_dir = config.get('profile_dir') or os.path.join(DATA_DIR, 'profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+    name = f"{request.endpoint.rsplit('.', 1)[-1]}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof"
+    path = os.path.join(profile_dir, name)
+    profiler.dump_stats(path)
+    return path
+
+
+def diagnosable(view):
+    """为视图函数加上 timing / profile 诊断开关"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        timing = _flag('timing', TIMING_HEADER)
+        profile = _flag('profile', PROFILE_HEADER)
+        if timing is None and profile is None:
+            return view(*args, **kwargs)
+
+        config = current_app.config.get('REQUEST_DIAGNOSTICS') or {}
+        if not _authorized(config):
+            return jsonify({'success': False, 'message': f'诊断参数需要有效的 {TOKEN_HEADER}'}), 403
+
+        # 剖析时让推理在请求线程内执行，剖析结果才包含分词和前向计算
+        trace = RequestTrace(inline=profile is not None)
+        diagnostics = {}
+        with tracing(trace):
+            if profile is None:
+                response = current_app.make_response(view(*args, **kwargs))
+            else:
+                with _PROFILE_LOCK:
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+                    try:
+                        response = current_app.make_response(view(*args, **kwargs))
+                    finally:
+                        profiler.disable()
+                diagnostics['profile'] = _top_functions(profiler, int(config.get('profile_top', 25)))
+                if profile == 'save':
+                    diagnostics['profile_file'] = _save_profile(profiler, config)
+        diagnostics['timing'] = trace.summary()
+
+        data = response.get_json(silent=True) if response.is_json else None
+        if isinstance(data, dict):
+            data['diagnostics'] = diagnostics
+            response.set_data(current_app.json.dumps(data))
+        return response
+
+    return wrapper
@@ -0,0 +1,373 @@
+"""
+预派生（pre-fork）多进程服务
+父进程加载模型和编译词典后 fork 出多个工作进程，模型权重和词典页以写时复制方式共享；
+每个工作进程绑定一组 CPU 核心并按核心数设置 torch 算子线程，在同一个监听套接字上运行 waitress。
+
+OpenMP 等算子线程池在 fork 后不可用，父进程的预加载不应执行前向计算，模型预热放在各工作进程中进行。
+
+信号：
+    SIGTERM / SIGINT  优雅停止所有工作进程后退出
+    SIGHUP            逐个优雅重启工作进程（先拉起替换进程，再停止旧进程）
+"""
+
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+import threading
+from multiprocessing.sharedctypes import RawArray
+from typing import Callable, Dict, List, Optional
+
+from ..core.config import INTRA_OP_THREADS, INTER_OP_THREADS
+
+# 工作进程状态表中每个槽位的字段
+_FIELDS = ('pid', 'started_at', 'heartbeat', 'ready', 'requests', 'restarts')
+
+# 优雅停止时最后一个请求完成后，留给服务器把输出缓冲写给客户端的秒数
+_FLUSH_GRACE = 1.0
+
+
+class InFlightCounter:
+    """WSGI 中间件：统计进行中的请求数
+
+    从调用应用开始计数，到服务器关闭响应迭代器（响应体全部交给服务器，包括流式响应）为止。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _add(self, delta: int):
+        with self._lock:
+            self.count += delta
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+        self._add(1)
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._add(-1)
+            raise
+        return ClosingIterator(body, lambda: self._add(-1))
+
+
+class WorkerBoard:
+    """父子进程共享的工作进程状态表（fork 前创建的匿名共享内存）"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._data = RawArray('d', workers * len(_FIELDS))
+
+    def _offset(self, index: int, field: str) -> int:
+        return index * len(_FIELDS) + _FIELDS.index(field)
+
+    def get(self, index: int, field: str) -> float:
+        return self._data[self._offset(index, field)]
+
+    def set(self, index: int, field: str, value: float):
+        self._data[self._offset(index, field)] = value
+
+    def incr(self, index: int, field: str, amount: float = 1):
+        # 只由槽位所属的工作进程写入，调用方负责进程内加锁
+        self._data[self._offset(index, field)] += amount
+
+    def snapshot(self) -> List[Dict]:
+        """所有工作进程的状态"""
+        now = time.time()
+        workers = []
+        for index in range(self.workers):
+            heartbeat = self.get(index, 'heartbeat')
+            workers.append({
+                'index': index,
+                'pid': int(self.get(index, 'pid')),
+                'ready': bool(self.get(index, 'ready')),
+                'requests': int(self.get(index, 'requests')),
+                'restarts': int(self.get(index, 'restarts')),
+                'uptime_s': round(now - self.get(index, 'started_at'), 1) if self.get(index, 'started_at') else None,
+                'heartbeat_age_s': round(now - heartbeat, 1) if heartbeat else None
+            })
+        return workers
+
+
+def partition_cores(workers: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """把可用 CPU 核心划分给各工作进程
+
+    核心数不少于工作进程数时按连续区间均分，否则轮流分配单个核心。
+
+    Args:
+        workers: 工作进程数
+        cores: 可用核心，默认取当前进程的 CPU 亲和性
+
+    Returns:
+        List[List[int]]: 每个工作进程的核心列表
+    """
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    if len(cores) < workers:
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    slices = []
+    start = 0
+    for index in range(workers):
+        end = start + size + (1 if index < extra else 0)
+        slices.append(cores[start:end])
+        start = end
+    return slices
+
+
+class PreforkServer:
+    """预派生多进程 waitress 服务"""
+
+    def __init__(self, app_factory: Callable, host: str, port: int, workers: int,
+                 threads: int = 4, preload: Optional[Callable[[], None]] = None,
+                 graceful_timeout: float = 30.0, heartbeat_timeout: float = 60.0):
+        """初始化服务
+
+        Args:
+            app_factory: 在工作进程中创建 WSGI 应用的函数
+            host: 监听地址
+            port: 监听端口
+            workers: 工作进程数
+            threads: 每个工作进程的 waitress 线程数
+            preload: fork 前在父进程中执行的预加载（加载模型、词典等，不应执行前向计算）
+            graceful_timeout: 优雅停止时等待进行中请求完成的秒数
+            heartbeat_timeout: 工作进程心跳超时秒数，超时视为卡死并强制重启
+        """
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.workers = max(1, int(workers))
+        self.threads = max(1, int(threads))
+        self.preload = preload
+        self.graceful_timeout = graceful_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.board = WorkerBoard(self.workers)
+        self.core_slices = partition_cores(self.workers)
+        self._pids: Dict[int, int] = {}
+        self._retiring: Dict[int, float] = {}
+        self._stopping = False
+        self._reload_requested = False
+        self._socket = None
+
+    # ---------- 父进程 ----------
+
+    def run(self):
+        """预加载、fork 工作进程并监护它们，直到收到停止信号"""
+        # HF 分词器的线程池在 fork 后不可用，统一关闭其内部并行
+        os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+        if self.preload is not None:
+            print("父进程预加载模型和词典...")
+            self.preload()
+        # 把预加载产生的对象移出 GC 跟踪，避免子进程的垃圾回收触碰这些页面导致复制
+        gc.collect()
+        gc.freeze()
+
+        self._socket = socket.socket(socket.AF_INET6 if ':' in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(1024)
+        self._socket.setblocking(False)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        for index in range(self.workers):
+            self._spawn(index)
+        print(f"已启动 {self.workers} 个工作进程，监听 http://{self.host}:{self.port}")
+
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._rolling_restart()
+                self._reap()
+                self._check_heartbeats()
+                time.sleep(0.5)
+        finally:
+            self._shutdown()
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def _spawn(self, index: int, restart: bool = False) -> int:
+        if restart:
+            self.board.incr(index, 'restarts')
+        self.board.set(index, 'ready', 0)
+        self.board.set(index, 'heartbeat', 0)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_main(index)
+            except BaseException as e:
+                print(f"工作进程 {index} 异常退出: {str(e)}")
+                code = 1
+            finally:
+                os._exit(code)
+        self._pids[pid] = index
+        self.board.set(index, 'pid', pid)
+        self.board.set(index, 'started_at', time.time())
+        return pid
+
+    def _reap(self):
+        """回收退出的工作进程，非停止状态下拉起替换进程"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self._retiring.pop(pid, None)
+            index = self._pids.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+            print(f"工作进程 {index}（pid {pid}）已退出，状态 {status}，正在重启")
+            self._spawn(index, restart=True)
+
+    def _check_heartbeats(self):
+        """强制结束心跳超时的工作进程，以及超过优雅停止时限的旧进程"""
+        now = time.time()
+        for pid, index in list(self._pids.items()):
+            heartbeat = self.board.get(index, 'heartbeat')
+            started_at = self.board.get(index, 'started_at')
+            last_seen = heartbeat or started_at
+            if self.heartbeat_timeout and last_seen and now - last_seen > self.heartbeat_timeout:
+                print(f"工作进程 {index}（pid {pid}）心跳超时，强制重启")
+                self._kill(pid, signal.SIGKILL)
+        for pid, deadline in list(self._retiring.items()):
+            if now > deadline:
+                self._kill(pid, signal.SIGKILL)
+
+    def _rolling_restart(self):
+        """逐个替换工作进程：新进程就绪后再优雅停止旧进程"""
+        print("收到 SIGHUP，逐个重启工作进程...")
+        for old_pid, index in list(self._pids.items()):
+            if self._stopping:
+                return
+            # 旧进程不再计入存活表，退出时不会被再次替换
+            del self._pids[old_pid]
+            self._spawn(index, restart=True)
+            deadline = time.time() + self.graceful_timeout
+            while not self.board.get(index, 'ready') and time.time() < deadline and not self._stopping:
+                self._reap()
+                time.sleep(0.2)
+            self._retire(old_pid)
+
+    def _retire(self, pid: int):
+        self._retiring[pid] = time.time() + self.graceful_timeout + 5
+        self._kill(pid, signal.SIGTERM)
+
+    def _kill(self, pid: int, sig: int):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _shutdown(self):
+        print("正在停止工作进程...")
+        for pid in list(self._pids):
+            self._retire(pid)
+        self._pids.clear()
+        while self._retiring:
+            self._reap()
+            self._check_heartbeats()
+            time.sleep(0.2)
+        self._socket.close()
+
+    # ---------- 工作进程 ----------
+
+    def _worker_main(self, index: int):
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        cores = self.core_slices[index]
+        self._pin_cores(cores)
+
+        from waitress import create_server
+        app = self.app_factory()
+        self._instrument(app, index)
+        in_flight = InFlightCounter(app)
+        server = create_server(in_flight, sockets=[self._socket], threads=self.threads)
+        draining = threading.Event()
+
+        def handle_term(signum, frame):
+            # 停止接受新连接，等待进行中的请求完成后退出
+            if draining.is_set():
+                return
+            draining.set()
+            if self._owns_slot(index):
+                self.board.set(index, 'ready', 0)
+            # 只把监听套接字移出事件循环；server.close() 还会关闭唤醒事件循环的 trigger，
+            # 进行中的响应将无法继续输出
+            server.del_channel()
+            threading.Thread(target=self._drain, args=(in_flight,), daemon=True).start()
+
+        signal.signal(signal.SIGTERM, handle_term)
+        threading.Thread(target=self._heartbeat, args=(app, index, draining), name='worker-heartbeat', daemon=True).start()
+        print(f"工作进程 {index}（pid {os.getpid()}）绑定核心 {cores}")
+        server.run()
+
+    def _pin_cores(self, cores: List[int]):
+        """绑定 CPU 核心，未显式配置 torch 线程数时让算子线程数与核心数一致"""
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cores)
+            except OSError as e:
+                print(f"CPU 绑定失败: {str(e)}")
+        # 只在模型使用 torch 后端时调整（父进程预加载时已导入）；
+        # SENTIMENT_NUM_THREADS 等（含 autotune 配置档）已在父进程加载模型时生效，不再覆盖
+        torch = sys.modules.get('torch')
+        if torch is not None:
+            if not INTRA_OP_THREADS:
+                torch.set_num_threads(len(cores))
+            if not INTER_OP_THREADS:
+                try:
+                    torch.set_num_interop_threads(1)
+                except RuntimeError:
+                    # 父进程已启动过 inter-op 线程池时不能再修改
+                    pass
+
+    def _instrument(self, app, index: int):
+        """统计请求数，并注册 /health/workers 查看所有工作进程的状态"""
+        lock = threading.Lock()
+        board = self.board
+
+        @app.before_request
+        def count_request():
+            with lock:
+                board.incr(index, 'requests')
+
+        def workers_health():
+            from flask import jsonify
+            return jsonify({'worker': index, 'workers': board.snapshot()})
+
+        app.add_url_rule('/health/workers', 'workers_health', workers_health)
+
+    def _heartbeat(self, app, index: int, draining: threading.Event):
+        warmup = getattr(app, 'warmup', None)
+        while True:
+            if self._owns_slot(index):
+                self.board.set(index, 'heartbeat', time.time())
+                ready = not draining.is_set() and (warmup is None or warmup.ready)
+                self.board.set(index, 'ready', 1 if ready else 0)
+            time.sleep(1.0)
+
+    def _owns_slot(self, index: int) -> bool:
+        """滚动重启时新旧进程共用一个槽位，只有登记在槽位上的进程更新状态"""
+        return int(self.board.get(index, 'pid')) == os.getpid()
+
+    def _drain(self, in_flight: InFlightCounter):
+        """等待进行中的请求完成（最多 graceful_timeout 秒），再留出把已生成的响应写给客户端的时间后退出"""
+        deadline = time.time() + self.graceful_timeout
+        while in_flight.count and time.time() < deadline:
+            time.sleep(0.1)
+        time.sleep(max(0.0, min(_FLUSH_GRACE, deadline - time.time())))
+        os._exit(0)
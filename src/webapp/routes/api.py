@@ -3,34 +3,166 @@ API路由
 处理API接口的路由
 """
 
-from flask import Blueprint, request, jsonify, send_file
-from ...core import SentimentAnalyzer, TTSEngine
-from ...core.config import AUDIO_DIR
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context, url_for
+from ...core.sentiment.analyzer import get_analyzer
+from ...core.tts_engine import get_tts_engine
+from ...core.tts_jobs import FINISHED_STATES, TTSJobQueue, TTSQueueFullError
+from ...core.sentiment.cache import ResultCache
+from ...core.config import AUDIO_DIR, DATA_DIR
+from ..diagnostics import diagnosable
+from ..batch import analyze_stream, iter_json_array, iter_ndjson
 import os
+import json
+import time
+import threading
 
 # 创建蓝图
 api_bp = Blueprint('api', __name__)
 
-# 创建分析器和TTS引擎实例
-sentiment_analyzer = SentimentAnalyzer()
-tts_engine = TTSEngine()
+# 进程内共享的分析器和TTS引擎（模型由应用启动后的后台预热加载）
+sentiment_analyzer = get_analyzer()
+tts_engine = get_tts_engine()
+# 异步语音合成任务队列（后台线程在首次提交任务时启动）
+tts_jobs = TTSJobQueue(tts_engine)
+
+# 任务队列已满时建议客户端等待的秒数
+_QUEUE_FULL_RETRY_AFTER = 2
+# 事件流无状态变化时发送保活注释的间隔（秒）
+_EVENTS_KEEPALIVE = 15
+
+
+class _StreamSlots:
+    """限制同时打开的事件流数：每个事件流在连接期间占用一个服务线程"""
+
+    def __init__(self, limit: int):
+        self.limit = max(0, int(limit))
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """占用一个名额，返回只生效一次的释放函数；名额已满时返回 None"""
+        with self._lock:
+            if self._open >= self.limit:
+                return None
+            self._open += 1
+        released = []
+
+        def release():
+            with self._lock:
+                if not released:
+                    released.append(True)
+                    self._open -= 1
+        return release
+
+    def stats(self):
+        with self._lock:
+            return {'open': self._open, 'limit': self.limit}
+
+
+_event_streams = _StreamSlots(1)
+
+@api_bp.record_once
+def setup_inference_scheduler(state):
+    """按应用配置启用推理微批调度"""
+    scheduler_config = dict(state.app.config.get('INFERENCE_SCHEDULER') or {})
+    if scheduler_config.pop('enabled', False):
+        sentiment_analyzer.enable_scheduler(**scheduler_config)
+
+@api_bp.record_once
+def setup_result_cache(state):
+    """按应用配置启用分析结果缓存"""
+    config = state.app.config
+    if config.get('CACHE_TYPE', 'null') != 'null':
+        sentiment_analyzer.cache = ResultCache(
+            maxsize=config.get('CACHE_THRESHOLD', 2048),
+            ttl=config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        )
+
+@api_bp.record_once
+def setup_cascade(state):
+    """按应用配置启用词典/模型级联分析"""
+    cascade_config = state.app.config.get('SENTIMENT_CASCADE') or {}
+    if cascade_config.get('enabled'):
+        sentiment_analyzer.enable_cascade(cascade_config.get('threshold', 0.75))
+
+@api_bp.record_once
+def setup_tts_jobs(state):
+    """按应用配置设置异步语音合成任务队列"""
+    jobs_config = state.app.config.get('TTS_JOBS') or {}
+    tts_jobs.configure(
+        workers=jobs_config.get('workers'),
+        max_queue=jobs_config.get('max_queue'),
+        result_ttl=jobs_config.get('result_ttl'),
+        state_dir=jobs_config.get('state_dir') or os.path.join(DATA_DIR, 'tts_jobs')
+    )
+    # 清理上次运行遗留的状态文件
+    tts_jobs.sweep_state_dir()
+    _event_streams.limit = max(0, int(jobs_config.get('max_event_streams', 1)))
+    state.app.tts_jobs = tts_jobs
+
+def _has_text(data) -> bool:
+    """请求体是否带有非空字符串 text"""
+    return isinstance(data, dict) and isinstance(data.get('text'), str) and bool(data['text'].strip())
+
+def _long_text(data) -> bool:
+    """是否分句合成：由请求的 long_text 指定；未指定时只在配置了长度阈值且超过阈值时分句"""
+    if 'long_text' in data:
+        return bool(data['long_text'])
+    threshold = current_app.config.get('TTS_CONFIG', {}).get('long_text_threshold', 0)
+    return threshold > 0 and len(data['text']) > threshold
 
 @api_bp.route('/analyze', methods=['POST'])
+@diagnosable
 def analyze():
     data = request.get_json()
     if not data or 'text' not in data:
         return jsonify({'error': 'No text provided'}), 400
-    result = sentiment_analyzer.analyze(data['text'])
-    return jsonify({'success': True, 'result': result})
+    if data.get('long_document'):
+        # 超过模型最大长度的文本按重叠窗口整体打分
+        result = sentiment_analyzer.analyze_long(
+            data['text'],
+            window_size=data.get('window_size'),
+            overlap=data.get('overlap'),
+            return_windows=bool(data.get('return_windows', False))
+        )
+    else:
+        result = sentiment_analyzer.analyze(data['text'])
+    # 推理排队超过延迟预算时结果来自规则分析，顶层同样标出
+    return jsonify({'success': True, 'degraded': 'degraded' in result, 'result': result})
+
+@api_bp.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """批量分析：请求体为 JSON 数组或 NDJSON（每条为字符串或 {"id", "text"}），
+    按块批量推理并以 NDJSON 流式返回，单条出错时在对应行给出 error"""
+    batch_config = current_app.config.get('ANALYZE_BATCH') or {}
+    chunk_size = max(1, int(batch_config.get('chunk_size', 64)))
+    max_items = int(batch_config.get('max_items', 100000))
+    max_item_bytes = int(batch_config.get('max_item_bytes', 64 * 1024))
+    
+    stream = request.stream
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl', 'text/plain'):
+        items = iter_ndjson(stream, max_item_bytes)
+    else:
+        items = iter_json_array(stream, max_item_bytes)
+    
+    return Response(
+        stream_with_context(analyze_stream(sentiment_analyzer, items, chunk_size, max_items)),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache'}
+    )
 
 @api_bp.route('/tts', methods=['POST'])
+@diagnosable
 def tts():
     data = request.get_json()
-    if not data or 'text' not in data:
+    if not _has_text(data):
         return jsonify({'error': 'No text provided'}), 400
     auto_analyze = data.get('auto_analyze', True)
     try:
-        output_file = tts_engine.synthesize_with_emotion(data['text'], auto_analyze=auto_analyze)
+        if _long_text(data):
+            output_file = tts_engine.synthesize_long_text(data['text'], auto_analyze=auto_analyze)
+        else:
+            output_file = tts_engine.synthesize_with_emotion(data['text'], auto_analyze=auto_analyze)
         return jsonify({
             'success': True,
             'audio_url': f'/audio/{output_file.split("/")[-1]}'
@@ -38,10 +170,137 @@ def tts():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@api_bp.route('/tts/jobs', methods=['POST'])
+def submit_tts_job():
+    """异步语音合成：立即返回任务 ID，情感分析和合成由后台线程完成"""
+    data = request.get_json()
+    if not _has_text(data):
+        return jsonify({'error': 'No text provided'}), 400
+    try:
+        job = tts_jobs.submit(data['text'], auto_analyze=data.get('auto_analyze', True),
+                              long_text=_long_text(data))
+    except TTSQueueFullError as e:
+        return jsonify({'success': False, 'message': str(e)}), 429, {
+            'Retry-After': str(_QUEUE_FULL_RETRY_AFTER)
+        }
+    status_url = url_for('api.get_tts_job', job_id=job.id)
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': status_url,
+        'events_url': url_for('api.tts_job_events', job_id=job.id)
+    }), 202, {'Location': status_url}
+
+@api_bp.route('/tts/jobs/<job_id>')
+def get_tts_job(job_id):
+    """查询合成任务状态，完成后包含 audio_url，失败时包含 error"""
+    snapshot = tts_jobs.get(job_id)
+    if snapshot is None:
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+    return jsonify({'success': True, 'job': snapshot})
+
+@api_bp.route('/tts/jobs/<job_id>/events')
+def tts_job_events(job_id):
+    """以 Server-Sent Events 推送任务状态：事件名为状态（queued / running / done / failed），
+    数据为任务状态 JSON，任务结束后关闭连接"""
+    snapshot = tts_jobs.get(job_id)
+    if snapshot is None:
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+    # 断线重连时 EventSource 通过 Last-Event-ID 带回已收到的状态版本
+    try:
+        seen_version = int(request.headers.get('Last-Event-ID', -1))
+    except ValueError:
+        seen_version = -1
+    if snapshot['status'] in FINISHED_STATES and snapshot['version'] == seen_version:
+        # 已推送过最终状态：204 让 EventSource 停止重连
+        return '', 204
+    release = _event_streams.acquire()
+    if release is None:
+        # 事件流名额用完：拒绝连接，客户端改为轮询状态接口
+        return jsonify({
+            'success': False,
+            'message': '事件流连接数已达上限，请轮询任务状态接口',
+            'status_url': url_for('api.get_tts_job', job_id=job_id)
+        }), 503, {'Retry-After': str(_QUEUE_FULL_RETRY_AFTER)}
+    timeout = float((current_app.config.get('TTS_JOBS') or {}).get('events_timeout', 60))
+    response = Response(
+        stream_with_context(_job_events(job_id, seen_version, timeout, release)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # 连接在生成器开始执行前就断开时，由 close 释放名额
+    response.call_on_close(release)
+    return response
+
+def _job_events(job_id: str, seen_version: int, timeout: float, release):
+    """产出任务状态事件；连接时长达到 timeout 后结束，由客户端带 Last-Event-ID 重连"""
+    deadline = time.monotonic() + timeout
+    try:
+        yield 'retry: 1000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            snapshot = tts_jobs.wait(job_id, seen_version, min(_EVENTS_KEEPALIVE, remaining))
+            if snapshot is None:
+                yield f'event: expired\ndata: {json.dumps({"job_id": job_id})}\n\n'
+                return
+            if snapshot['version'] == seen_version:
+                yield ': keep-alive\n\n'
+                continue
+            seen_version = snapshot['version']
+            yield f"id: {seen_version}\nevent: {snapshot['status']}\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+            if snapshot['status'] in FINISHED_STATES:
+                return
+    finally:
+        release()
+
+@api_bp.route('/tts/stream', methods=['GET', 'POST'])
+def tts_stream():
+    """流式语音合成：边合成边返回 MP3 数据块，GET 方式可直接作为 <audio> 的 src"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        auto_analyze = data.get('auto_analyze', True)
+    else:
+        data = request.args
+        auto_analyze = data.get('auto_analyze', 'true').lower() != 'false'
+    text = data.get('text')
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    try:
+        output_file, cached, chunks = tts_engine.stream_with_emotion(text, auto_analyze=auto_analyze)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    return Response(
+        stream_with_context(chunks),
+        mimetype='audio/mpeg',
+        headers={
+            # 未命中缓存（X-Audio-Cached: false）时该地址在合成成功完成后才可用
+            'X-Audio-Url': f'/audio/{os.path.basename(output_file)}',
+            'X-Audio-Cached': 'true' if cached else 'false',
+            'Cache-Control': 'no-cache'
+        }
+    )
+
 @api_bp.route('/audio/<filename>')
 def get_audio(filename):
     return send_file(os.path.join(AUDIO_DIR, filename))
 
+@api_bp.route('/cache/stats')
+def cache_stats():
+    cache = sentiment_analyzer.cache
+    return jsonify({
+        'success': True,
+        'enabled': cache is not None,
+        'stats': cache.stats() if cache is not None else {},
+        'audio': tts_engine.audio_cache.stats()
+    })
+
+@api_bp.route('/cascade/stats')
+def cascade_stats():
+    return jsonify({'success': True, 'stats': sentiment_analyzer.cascade_stats()})
+
 @api_bp.route('/voices')
 def get_voices():
     return jsonify({
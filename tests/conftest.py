@@ -0,0 +1,37 @@
+"""
+测试公共配置
+"""
+
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 引擎在导入时读取 AUDIO_DIR，测试产生的音频不写入 data/audio
+os.environ.setdefault('AUDIO_DIR', tempfile.mkdtemp(prefix='emotionspeak-test-audio-'))
+# 应用测试不在后台加载真实模型，合成任务状态也不写入 data/tts_jobs
+os.environ.setdefault('MODEL_WARMUP', 'false')
+os.environ.setdefault('TTS_JOB_STATE_DIR', tempfile.mkdtemp(prefix='emotionspeak-test-jobs-'))
+
+
+@pytest.fixture
+def fake_edge_tts(monkeypatch):
+    """把本地 edge-tts 替身注册为 edge_tts 模块（无网络、几乎无延迟）"""
+    from benchmarks.fake_tts import FakeTTSProfile, install
+    monkeypatch.delitem(sys.modules, 'edge_tts', raising=False)
+    return install(FakeTTSProfile(first_byte_ms=5, first_byte_sigma=0.0, realtime_factor=1000, seed=0))
+
+
+@pytest.fixture
+def tiny_backend():
+    """安装随机初始化的小型模型作为推理后端，测试结束后恢复"""
+    from benchmarks.tiny_model import build_tiny_backend
+    from src.core.sentiment import analyzer as analyzer_module
+    saved = dict(analyzer_module._MODEL_CACHE)
+    backend = build_tiny_backend()
+    analyzer_module.install_backend(backend)
+    yield backend
+    analyzer_module._MODEL_CACHE.update(saved)
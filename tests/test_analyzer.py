@@ -0,0 +1,32 @@
+import sys
+import threading
+from src.core.sentiment.analyzer import SentimentAnalyzer
+
+
+def test_tier_counts_are_exact_under_concurrency():
+    analyzer = SentimentAnalyzer(auto_initialize=False)
+    context = analyzer.create_context('好')
+    context.result = {}
+    # 频繁切换线程，放大未加锁时 += 的竞争
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(target=lambda: [analyzer._record_tier(context, 'model') for _ in range(20000)])
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(previous)
+    assert analyzer.cascade_stats()['tiers']['model'] == 8 * 20000
+
+
+def test_analyze_long_records_model_tier(tiny_backend):
+    analyzer = SentimentAnalyzer(auto_initialize=False)
+    result = analyzer.analyze_long('今天天气很好，心情不错！' * 80, window_size=64)
+    assert result['document']['windows'] > 1
+    assert result['tier'] == 'model'
+    assert analyzer.cascade_stats()['tiers'] == {'lexicon': 0, 'model': 1, 'rules': 0}
@@ -0,0 +1,70 @@
+import os
+import time
+from src.core.audio_cache import AudioCache, audio_cache_key
+
+
+def _put(cache, key, size, age=0.0):
+    tmp = cache.temp_path(key)
+    with open(tmp, 'wb') as f:
+        f.write(b'x' * size)
+    path = cache.commit(key, tmp)
+    if age:
+        past = time.time() - age
+        os.utime(path, (past, past))
+    return path
+
+
+def test_key_is_stable_and_parameter_sensitive():
+    key = audio_cache_key('你好', 'zh-CN-XiaoxiaoNeural', 1.0, 1.2, 'cheerful')
+    assert key == audio_cache_key('你好', 'zh-CN-XiaoxiaoNeural', 1.0, 1.2, 'cheerful')
+    assert key != audio_cache_key('你好', 'zh-CN-XiaoxiaoNeural', 1.1, 1.2, 'cheerful')
+
+
+def test_evicts_least_recently_accessed(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250, grace_seconds=0)
+    _put(cache, 'a' * 64, 100, age=30)
+    _put(cache, 'b' * 64, 100, age=20)
+    # 命中刷新访问时间，a 变为最近使用
+    assert cache.get('a' * 64) is not None
+    _put(cache, 'c' * 64, 100)
+    assert cache.get('b' * 64) is None
+    assert cache.get('a' * 64) is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 250
+
+
+def test_grace_period_protects_recent_files(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=150, grace_seconds=60)
+    _put(cache, 'a' * 64, 100)
+    _put(cache, 'b' * 64, 100)
+    # 两个文件都刚被访问过，暂时超出配额也不删除
+    assert cache.get('a' * 64) is not None
+    assert cache.stats()['evictions'] == 0
+    past = time.time() - 120
+    os.utime(cache.path_for('a' * 64), (past, past))
+    _put(cache, 'c' * 64, 10)
+    assert cache.get('a' * 64) is None
+
+
+def test_quota_is_shared_between_processes(tmp_path):
+    """两个实例（相当于两个工作进程）共享目录时按合计大小淘汰"""
+    first = AudioCache(str(tmp_path), max_bytes=250, grace_seconds=0, rescan_interval=0)
+    second = AudioCache(str(tmp_path), max_bytes=250, grace_seconds=0, rescan_interval=0)
+    _put(first, 'a' * 64, 100, age=30)
+    _put(second, 'b' * 64, 100, age=20)
+    _put(first, 'c' * 64, 100)
+    assert first.get('a' * 64) is None
+    assert second.get('b' * 64) is not None
+    assert second.stats()['bytes'] <= 250
+
+
+def test_legacy_files_count_toward_quota(tmp_path):
+    legacy = tmp_path / 'speech_-7391823.mp3'
+    legacy.write_bytes(b'x' * 200)
+    past = time.time() - 3600
+    os.utime(legacy, (past, past))
+    cache = AudioCache(str(tmp_path), max_bytes=250, grace_seconds=0)
+    assert cache.stats()['bytes'] == 200
+    _put(cache, 'a' * 64, 100)
+    assert not legacy.exists()
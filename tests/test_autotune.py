@@ -0,0 +1,31 @@
+import autotune
+
+
+class FakeAnalyzer:
+    """前一半请求由模型给出，后一半排队超时后由规则兜底"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def analyze(self, text):
+        self.calls += 1
+        if self.calls > 10:
+            return {'tier': 'rules', 'degraded': '推理排队超过 500ms'}
+        return {'tier': 'model'}
+
+
+def test_measure_counts_rule_fallbacks():
+    metrics = autotune._measure(FakeAnalyzer(), ['好'], concurrency=1, requests=20)
+    assert (metrics['errors'], metrics['fallbacks']) == (0, 10)
+
+
+def _result(throughput, p99, fallbacks=0):
+    return {'settings': {'throughput': throughput}, 'metrics': {
+        'throughput_rps': throughput, 'p99_ms': p99, 'errors': 0, 'fallbacks': fallbacks, 'label_agreement': 1.0
+    }}
+
+
+def test_select_best_skips_trials_with_fallbacks():
+    results = [_result(100, 50), _result(400, 20, fallbacks=150), _result(200, 80)]
+    assert autotune.select_best(results, latency_budget_ms=500, min_agreement=0.99) is results[2]
+    assert autotune.select_best(results[1:2], latency_budget_ms=500, min_agreement=0.99) is None
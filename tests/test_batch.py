@@ -0,0 +1,53 @@
+import io
+import json
+import pytest
+from src.webapp.batch import BatchInputError, iter_json_array, iter_ndjson
+
+
+class ChunkedStream:
+    """每次 read 最多返回 chunk 个字节，模拟请求体分块到达"""
+
+    def __init__(self, data: bytes, chunk: int):
+        self._data = io.BytesIO(data)
+        self._chunk = chunk
+
+    def read(self, size: int = -1) -> bytes:
+        return self._data.read(min(size, self._chunk) if size >= 0 else self._chunk)
+
+
+ITEMS = ['今天天气很好😊', {'id': 7, 'text': '心情“不错”，\\n继续'}, 12345, -0.5e3, True, None, [], '']
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 5, 7, 64 * 1024])
+def test_items_survive_split_utf8_chunks(chunk):
+    body = json.dumps(ITEMS, ensure_ascii=False, indent=1).encode('utf-8')
+    parsed = [item for item, error in iter_json_array(ChunkedStream(body, chunk), max_item_bytes=1024)]
+    assert parsed == ITEMS
+
+
+def test_number_at_chunk_boundary_is_not_truncated():
+    # 逐字节读取时 "-0.5" 在读到 "e3" 之前就能被解析，必须等到分隔符再产出
+    parsed = [item for item, _ in iter_json_array(ChunkedStream(b'[12345,-0.5e3 ,6]', 1), max_item_bytes=64)]
+    assert parsed == [12345, -500.0, 6]
+
+
+def test_oversized_item_is_rejected():
+    body = json.dumps(['短', '长' * 100], ensure_ascii=False).encode('utf-8')
+    items = iter_json_array(ChunkedStream(body, 16), max_item_bytes=64)
+    assert next(items) == ('短', None)
+    with pytest.raises(BatchInputError):
+        next(items)
+
+
+@pytest.mark.parametrize('body', [b'{"text": "x"}', b'["a", "b"', '["好'.encode('utf-8') + b'\xff"]'])
+def test_invalid_bodies_raise(body):
+    with pytest.raises(BatchInputError):
+        list(iter_json_array(ChunkedStream(body, 3), max_item_bytes=64))
+
+
+def test_ndjson_reports_bad_lines_and_continues():
+    body = '{"text": "好"}\n\nnot json\n"再见"\n'.encode('utf-8')
+    results = list(iter_ndjson(io.BytesIO(body), max_line_bytes=64))
+    assert results[0] == ({'text': '好'}, None)
+    assert results[1][0] is None and results[1][1]
+    assert results[2] == ('再见', None)
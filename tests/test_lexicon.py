@@ -0,0 +1,112 @@
+import json
+import os
+import pytest
+from src.core.sentiment import lexicon as lexicon_module
+from src.core.sentiment.dict_loader import EmotionDictLoader
+from src.core.sentiment.lexicon import CompiledLexicon, LexiconError, build_lexicon
+
+DICTS = {
+    'hownet': {'joy': ['开心', '高兴', '快乐'], 'sadness': ['难过', '伤心']},
+    'thu': {'joy': ['开心', '愉快'], 'anger': ['生气', '愤怒']},
+    'ntusd': {'sadness': ['伤心', '失落'], 'joy': ['快乐']},
+    'boson': {'fear': ['害怕'], 'anger': ['生气'], 'joy': ['高兴', 'ok']},
+}
+
+
+@pytest.fixture
+def dict_dir(tmp_path):
+    for name, data in DICTS.items():
+        (tmp_path / f'{name}.json').write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return str(tmp_path)
+
+
+def _json_index(dict_dir):
+    loader = EmotionDictLoader()
+    loader.dict_dir = dict_dir
+    return loader._build_index()
+
+
+def test_round_trip_matches_json_index(dict_dir, tmp_path):
+    expected = _json_index(dict_dir)
+    lexicon = CompiledLexicon(build_lexicon(dict_dir, str(tmp_path / 'lexicon.bin')), verify=True)
+    try:
+        assert len(lexicon) == len(expected)
+        assert sorted(lexicon.emotions) == sorted({e for scores in expected.values() for e in scores})
+        for word, scores in expected.items():
+            assert lexicon.get(word) == pytest.approx(scores)
+            assert word in lexicon
+        assert dict(lexicon.items()).keys() == expected.keys()
+        assert lexicon.get('不存在') is None and '不存在' not in lexicon
+    finally:
+        lexicon.close()
+
+
+def test_loader_uses_compiled_lexicon(dict_dir, tmp_path):
+    loader = EmotionDictLoader()
+    loader.dict_dir = dict_dir
+    loader.lexicon_path = build_lexicon(dict_dir, str(tmp_path / 'lexicon.bin'))
+    assert isinstance(loader._get_index(), CompiledLexicon)
+    assert loader.get_word_emotion('生气') == pytest.approx({'anger': 1.0})
+
+
+def test_unchanged_sources_are_not_hashed(dict_dir, tmp_path, monkeypatch):
+    path = build_lexicon(dict_dir, str(tmp_path / 'lexicon.bin'))
+
+    def fail(*args):
+        raise AssertionError('源文件未变化时不应读取内容')
+
+    monkeypatch.setattr(lexicon_module, 'source_fingerprint', fail)
+    lexicon = CompiledLexicon(path)
+    try:
+        assert lexicon.is_current(dict_dir, EmotionDictLoader.AVAILABLE_DICTS)
+    finally:
+        lexicon.close()
+
+
+def test_touched_sources_fall_back_to_content(dict_dir, tmp_path):
+    lexicon = CompiledLexicon(build_lexicon(dict_dir, str(tmp_path / 'lexicon.bin')))
+    try:
+        thu = os.path.join(dict_dir, 'thu.json')
+        stat = os.stat(thu)
+        # 只改修改时间（如重新检出），内容一致仍视为有效
+        os.utime(thu, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert lexicon.is_current(dict_dir, EmotionDictLoader.AVAILABLE_DICTS)
+        with open(thu, 'w', encoding='utf-8') as f:
+            json.dump({'joy': ['开心']}, f, ensure_ascii=False)
+        assert not lexicon.is_current(dict_dir, EmotionDictLoader.AVAILABLE_DICTS)
+    finally:
+        lexicon.close()
+
+
+def test_crc_checked_only_on_request(dict_dir, tmp_path):
+    path = build_lexicon(dict_dir, str(tmp_path / 'lexicon.bin'))
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    CompiledLexicon(path, verify=False).close()
+    with pytest.raises(LexiconError):
+        CompiledLexicon(path, verify=True)
+
+
+def test_concurrent_builds_do_not_collide(dict_dir, tmp_path):
+    import threading
+    output = str(tmp_path / 'lexicon.bin')
+    errors = []
+
+    def build():
+        try:
+            for _ in range(5):
+                build_lexicon(dict_dir, output)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    CompiledLexicon(output, verify=True).close()
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
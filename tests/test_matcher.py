@@ -0,0 +1,66 @@
+import random
+from src.core.sentiment.base import BASIC_EMOTIONS, COMPOUND_EMOTIONS, INTENSITY_MODIFIERS, NEGATION_WORDS
+from src.core.sentiment.matcher import BASIC, COMPOUND, MODIFIER, NEGATION, KeywordMatcher, get_default_matcher
+
+
+def _overlapping_count(text, keyword):
+    return sum(1 for i in range(len(text)) if text.startswith(keyword, i))
+
+
+def _corpus():
+    """随机拼接关键词和普通字符，覆盖重叠、相邻和不在词表中的字符"""
+    words = [kw for info in BASIC_EMOTIONS.values() for kw in info['keywords']]
+    words += [kw for info in COMPOUND_EMOTIONS.values() for kw in info['keywords']]
+    words += list(INTENSITY_MODIFIERS) + list(NEGATION_WORDS)
+    filler = list('的了是我你他今天明真好坏吗呢啊，。！？abcXYZ😀') + ['㐀', '\U00020000']
+    rng = random.Random(0)
+    texts = ['', '今天真开心！', '我不是很难过', '非常非常高兴']
+    for _ in range(300):
+        texts.append(''.join(rng.choice(words) if rng.random() < 0.4 else rng.choice(filler)
+                             for _ in range(rng.randint(1, 40))))
+    return texts
+
+
+def test_matches_equal_substring_scans():
+    matcher = get_default_matcher()
+    for text in _corpus():
+        result = matcher.match(text)
+        for emotion_id, info in BASIC_EMOTIONS.items():
+            expected = [kw for kw in info['keywords'] if kw in text]
+            assert result.has(BASIC, emotion_id) == bool(expected), text
+            assert sorted(result.keywords(BASIC, emotion_id)) == sorted(set(expected)), text
+        for emotion_id, info in COMPOUND_EMOTIONS.items():
+            assert result.has(COMPOUND, emotion_id) == any(kw in text for kw in info['keywords']), text
+        assert set(result.keywords(MODIFIER)) == {m for m in INTENSITY_MODIFIERS if m in text}, text
+        assert result.has(NEGATION) == any(word in text for word in NEGATION_WORDS), text
+
+
+def test_hits_report_every_overlapping_occurrence():
+    matcher = KeywordMatcher([('he', 'k', 'he'), ('she', 'k', 'she'), ('his', 'k', 'his'), ('hers', 'k', 'hers')])
+    text = 'ushershishe'
+    result = matcher.match(text)
+    for start, end, keyword in result.hits:
+        assert text[start:end] == keyword
+    for keyword in ('he', 'she', 'his', 'hers'):
+        assert sum(1 for hit in result.hits if hit.keyword == keyword) == _overlapping_count(text, keyword)
+
+
+def _footprint(matcher):
+    """匹配器各表的条目总数"""
+    total = 0
+    for value in vars(matcher).values():
+        if isinstance(value, (list, dict, set, frozenset)):
+            total += len(value)
+            if isinstance(value, list):
+                total += sum(len(item) for item in value if isinstance(item, (list, dict)))
+    return total
+
+
+def test_matching_arbitrary_input_does_not_grow_the_matcher():
+    matcher = KeywordMatcher([('开心', 'basic', 'joy'), ('心情', 'basic', 'joy')])
+    before = _footprint(matcher)
+    rng = random.Random(1)
+    text = ''.join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(20000)) + '开心情'
+    result = matcher.match(text)
+    assert result.keywords('basic', 'joy') == ['开心', '心情']
+    assert _footprint(matcher) == before
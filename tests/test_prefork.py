@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import types
+import pytest
+from src.webapp import prefork
+from src.webapp.prefork import InFlightCounter, PreforkServer
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='需要 os.fork')
+
+
+def _recording_torch(calls):
+    return types.SimpleNamespace(
+        set_num_threads=lambda n: calls.append(('intra', n)),
+        set_num_interop_threads=lambda n: calls.append(('inter', n))
+    )
+
+
+def _current_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return [0]
+
+
+@pytest.mark.parametrize('intra, inter, expected', [
+    (0, 0, lambda cores: [('intra', len(cores)), ('inter', 1)]),
+    (3, 2, lambda cores: []),
+    (3, 0, lambda cores: [('inter', 1)]),
+])
+def test_pin_cores_respects_configured_threads(monkeypatch, intra, inter, expected):
+    calls = []
+    monkeypatch.setitem(sys.modules, 'torch', _recording_torch(calls))
+    monkeypatch.setattr(prefork, 'INTRA_OP_THREADS', intra)
+    monkeypatch.setattr(prefork, 'INTER_OP_THREADS', inter)
+    cores = _current_cores()
+    PreforkServer(None, '127.0.0.1', 0, 1)._pin_cores(cores)
+    assert calls == expected(cores)
+
+
+def test_forked_worker_runs_inference_after_load_only_preload(tiny_backend):
+    from src.core.sentiment.analyzer import SentimentAnalyzer
+
+    analyzer = SentimentAnalyzer(auto_initialize=False)
+    # 父进程的预加载不做前向计算
+    assert 'forward_ms' not in analyzer.warm_up(forward=False)
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            scores = analyzer._predict_scores(['今天天气很好'])
+            code = 0 if len(scores) == 1 else 1
+        finally:
+            os._exit(code)
+    deadline = time.monotonic() + 60
+    while True:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            break
+        if time.monotonic() > deadline:
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+            pytest.fail('工作进程推理挂起')
+        time.sleep(0.05)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_in_flight_counts_streaming_response_until_closed():
+    from flask import Flask, Response
+    from werkzeug.test import Client
+
+    app = Flask(__name__)
+
+    @app.route('/stream')
+    def stream():
+        return Response(iter(['a', 'b']))
+
+    in_flight = InFlightCounter(app)
+    response = Client(in_flight).get('/stream', buffered=False)
+    assert in_flight.count == 1
+    assert response.get_data() == b'ab'
+    response.close()
+    assert in_flight.count == 0
@@ -0,0 +1,62 @@
+import json
+import os
+import pytest
+from src.core.sentiment import backends, quantization
+from src.core.sentiment.backends import ONNX_SOURCE_FILE, onnx_export_is_current, weights_fingerprint
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    from benchmarks.tiny_model import build_tiny_backend
+    path = tmp_path / 'model'
+    build_tiny_backend().model.save_pretrained(str(path))
+    return str(path)
+
+
+def _replace_weights(model_dir):
+    weights = os.path.join(model_dir, 'model.safetensors')
+    stat = os.stat(weights)
+    # 同名模型重新训练后权重文件变化（这里只改修改时间）
+    os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_fingerprint_follows_weight_file(model_dir, tmp_path):
+    before = weights_fingerprint(model_dir, str(tmp_path))
+    assert before and before.startswith('model.safetensors:')
+    assert weights_fingerprint(model_dir, str(tmp_path)) == before
+    _replace_weights(model_dir)
+    assert weights_fingerprint(model_dir, str(tmp_path)) != before
+    assert weights_fingerprint(str(tmp_path / 'missing'), str(tmp_path)) is None
+
+
+def test_quantized_cache_is_stale_after_weights_change(model_dir, tmp_path):
+    from transformers import AutoModelForSequenceClassification
+    model = quantization.quantize_model(AutoModelForSequenceClassification.from_pretrained(model_dir))
+    path = str(tmp_path / 'int8.pt')
+    quantization.save_quantized_model(model, model_dir, path=path, cache_dir=str(tmp_path))
+    assert quantization.load_quantized_model(model_dir, path=path, cache_dir=str(tmp_path)) is not None
+    _replace_weights(model_dir)
+    assert quantization.load_quantized_model(model_dir, path=path, cache_dir=str(tmp_path)) is None
+
+
+def test_onnx_export_is_stale_after_weights_change(model_dir, tmp_path):
+    onnx_dir = tmp_path / 'onnx'
+    onnx_dir.mkdir()
+    (onnx_dir / ONNX_SOURCE_FILE).write_text(json.dumps({
+        'model_name': model_dir, 'weights': weights_fingerprint(model_dir, str(tmp_path))
+    }))
+    assert onnx_export_is_current(model_dir, str(tmp_path), str(onnx_dir))
+    _replace_weights(model_dir)
+    assert not onnx_export_is_current(model_dir, str(tmp_path), str(onnx_dir))
+    # 只部署了 ONNX 模型、本地没有源权重时无法比较
+    assert onnx_export_is_current(str(tmp_path / 'missing'), str(tmp_path), str(onnx_dir))
+
+
+def test_stale_onnx_export_falls_back_to_torch(model_dir, tmp_path, monkeypatch):
+    loaded = []
+    monkeypatch.setattr(backends, 'onnx_export_is_current', lambda *args: False)
+    monkeypatch.setattr(backends.OnnxBackend, 'load', classmethod(lambda cls, *a, **k: loaded.append('onnx')))
+    monkeypatch.setattr(backends.TorchBackend, 'load',
+                        classmethod(lambda cls, *a, **k: loaded.append('torch') or 'torch-backend'))
+    assert backends.load_backend('onnx', model_dir, str(tmp_path), True) == 'torch-backend'
+    assert loaded == ['torch']
@@ -0,0 +1,57 @@
+import types
+import pytest
+from src.core.sentiment import cache as cache_module
+from src.core.sentiment.analyzer import SentimentAnalyzer
+from src.core.sentiment.cache import ResultCache, canonicalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, 'time', types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(maxsize=2, ttl=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    stats = cache.stats()
+    assert (stats['size'], stats['evictions'], stats['hits'], stats['misses']) == (2, 1, 3, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache(maxsize=8, ttl=10)
+    cache.put('a', 1)
+    clock[0] += 9.9
+    assert cache.get('a') == 1
+    # 命中不会延长存活时间
+    clock[0] += 0.2
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert cache.stats()['expirations'] == 1
+
+
+def test_zero_ttl_never_expires(clock):
+    cache = ResultCache(maxsize=8, ttl=0)
+    cache.put('a', 1)
+    clock[0] += 10 ** 6
+    assert cache.get('a') == 1
+
+
+def test_canonical_text_shares_entry():
+    assert canonicalize_text('  ＡＢＣ　１２３\n\t好！ ') == 'ABC 123 好!'
+
+
+def test_analyzer_returns_copies_of_cached_results(tiny_backend):
+    analyzer = SentimentAnalyzer(auto_initialize=False, cache=ResultCache(maxsize=8, ttl=None))
+    first = analyzer.analyze('今天心情很好')
+    first['emotion'] = '篡改'
+    second = analyzer.analyze(' 今天心情很好 ')
+    assert second['emotion'] != '篡改'
+    assert second['text'] == ' 今天心情很好 '
+    assert analyzer.cache.stats()['hits'] == 1
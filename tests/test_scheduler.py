@@ -0,0 +1,135 @@
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import pytest
+from src.core.sentiment.scheduler import InferenceScheduler
+
+
+def _echo_batches(batches):
+    def predict(texts):
+        batches.append(list(texts))
+        return [text.upper() for text in texts]
+    return predict
+
+
+def test_concurrent_requests_are_batched_in_order():
+    batches = []
+    gate = threading.Event()
+
+    def predict(texts):
+        gate.wait(5)
+        return _echo_batches(batches)(texts)
+
+    scheduler = InferenceScheduler(predict, max_batch_size=8, max_wait_ms=50)
+    scheduler.start()
+    try:
+        # 第一条进入计算后阻塞，其余请求在队列中凑成一批
+        first = scheduler.submit('a')
+        time.sleep(0.1)
+        futures = [scheduler.submit(text) for text in 'bcdef']
+        gate.set()
+        assert first.result(5) == 'A'
+        assert [future.result(5) for future in futures] == list('BCDEF')
+        assert batches == [['a'], list('bcdef')]
+        stats = scheduler.stats()
+        assert stats['requests'] == 6 and stats['batches'] == 2
+    finally:
+        scheduler.stop(5)
+
+
+def test_batch_error_fails_every_request_in_batch():
+    def predict(texts):
+        raise ValueError('boom')
+
+    scheduler = InferenceScheduler(predict, max_wait_ms=20)
+    scheduler.start()
+    try:
+        futures = [scheduler.submit(text) for text in 'ab']
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(5)
+    finally:
+        scheduler.stop(5)
+
+
+def test_stop_drains_queue_and_rejects_later_submissions():
+    batches = []
+    scheduler = InferenceScheduler(_echo_batches(batches), max_wait_ms=1)
+    scheduler.start()
+    futures = [scheduler.submit(str(index)) for index in range(20)]
+    scheduler.stop(5)
+    assert [future.result(0) for future in futures] == [str(index) for index in range(20)]
+    assert not scheduler.running
+    with pytest.raises(RuntimeError):
+        scheduler.submit('late')
+
+
+def test_submit_racing_with_stop_never_hangs():
+    """stop 与 submit 并发时，每个已返回的 Future 都会得到结果或异常"""
+    for _ in range(50):
+        scheduler = InferenceScheduler(lambda texts: texts, max_wait_ms=0)
+        scheduler.start()
+        futures = []
+
+        def spam():
+            for index in range(200):
+                try:
+                    futures.append(scheduler.submit(str(index)))
+                except RuntimeError:
+                    return
+
+        thread = threading.Thread(target=spam)
+        thread.start()
+        scheduler.stop(5)
+        thread.join(5)
+        for future in futures:
+            assert future.exception(2) is None or isinstance(future.exception(0), RuntimeError)
+
+
+def test_predict_times_out_after_latency_budget():
+    gate = threading.Event()
+    scheduler = InferenceScheduler(lambda texts: (gate.wait(5), texts)[1], max_wait_ms=0, latency_budget_ms=100)
+    scheduler.start()
+    try:
+        blocker = scheduler.submit('slow')
+        time.sleep(0.05)
+        started = time.perf_counter()
+        with pytest.raises(FutureTimeoutError):
+            scheduler.predict('queued')
+        assert time.perf_counter() - started < 1
+        gate.set()
+        assert blocker.result(5) == 'slow'
+        # 超时的请求已撤销，不会被计算
+        time.sleep(0.05)
+        assert scheduler.stats()['requests'] == 1
+    finally:
+        gate.set()
+        scheduler.stop(5)
+
+
+def test_budget_timeout_is_reported_as_degraded(tiny_backend):
+    from src.core.sentiment.analyzer import SentimentAnalyzer
+    from src.core.sentiment.cache import ResultCache
+
+    gate = threading.Event()
+    analyzer = SentimentAnalyzer(auto_initialize=False, cache=ResultCache(maxsize=8, ttl=None))
+    analyzer._initialize()
+    predict = analyzer._predict_scores
+    analyzer.scheduler = InferenceScheduler(lambda texts: (gate.wait(5), predict(texts))[1],
+                                            max_wait_ms=0, latency_budget_ms=100)
+    analyzer.scheduler.start()
+    try:
+        blocker = analyzer.scheduler.submit('占住推理线程')
+        time.sleep(0.05)
+        result = analyzer.analyze('今天心情很好')
+        assert result['tier'] == 'rules'
+        assert '推理排队超过' in result['degraded']
+        assert analyzer.scheduler.stats()['timeouts'] == 1
+        gate.set()
+        blocker.result(5)
+        # 降级结果不进入缓存，预算内的请求重新由模型给出
+        result = analyzer.analyze('今天心情很好')
+        assert result['tier'] == 'model' and 'degraded' not in result
+    finally:
+        gate.set()
+        analyzer.scheduler.stop(5)
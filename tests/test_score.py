@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+from concurrent.futures import Future
+import pytest
+import score
+
+
+class InlineExecutor:
+    """在当前进程内同步执行的进程池替身（不加载模型）"""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def _scorer(calls, interrupt_at=None):
+    def score_chunk(rows):
+        calls.extend(row for row, *_ in rows)
+        if interrupt_at is not None and any(row == interrupt_at for row, *_ in rows):
+            raise KeyboardInterrupt
+        return [dict(dict.fromkeys(score.COLUMNS), row=row, id=row_id, label=text[::-1], error=error)
+                for row, row_id, text, error in rows]
+    return score_chunk
+
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    monkeypatch.setattr(score, 'ProcessPoolExecutor', InlineExecutor)
+    source = tmp_path / 'input.jsonl'
+    source.write_text(''.join(json.dumps({'key': i, 'text': f'文本{i}'}, ensure_ascii=False) + '\n'
+                              for i in range(10)), encoding='utf-8')
+    return argparse.Namespace(
+        input=str(source), output=str(tmp_path / 'scores.jsonl'), input_format='jsonl', output_format='jsonl',
+        text_column='text', id_column='key', threads=1, workers=1, batch_size=None, max_length=None,
+        chunk_rows=2, checkpoint_every=2, checkpoint=None, restart=False
+    )
+
+
+def _output_rows(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_continues_after_last_checkpoint(job, monkeypatch):
+    calls = []
+    monkeypatch.setattr(score, 'score_chunk', _scorer(calls, interrupt_at=6))
+    assert score.run(job) == 130
+    state = score.load_checkpoint(f'{job.output}.ckpt.json')
+    # 第 6 行所在的块之前完成的块都已写出并记入检查点
+    rows_done = state['rows_done']
+    assert 0 < rows_done <= 6 and not state['completed']
+    assert len(_output_rows(job.output)) == rows_done
+    # 检查点之后写出的半行在恢复时被截掉
+    with open(job.output, 'ab') as f:
+        f.write(b'{"row": 6, "trunc')
+
+    calls.clear()
+    monkeypatch.setattr(score, 'score_chunk', _scorer(calls))
+    assert score.run(job) == 0
+    assert calls == list(range(rows_done, 10))
+    rows = _output_rows(job.output)
+    assert [row['row'] for row in rows] == list(range(10))
+    assert [row['id'] for row in rows] == list(range(10))
+    assert rows[3]['label'] == '3本文'
+    assert score.load_checkpoint(f'{job.output}.ckpt.json')['completed']
+
+    # 已完成的任务再次运行不重新打分
+    calls.clear()
+    assert score.run(job) == 0
+    assert calls == []
+
+
+def test_checkpoint_for_other_input_is_refused(job, monkeypatch):
+    monkeypatch.setattr(score, 'score_chunk', _scorer([], interrupt_at=4))
+    assert score.run(job) == 130
+    with open(job.input, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'key': 10, 'text': '新增'}, ensure_ascii=False) + '\n')
+    assert score.run(job) == 2
+
+    job.restart = True
+    monkeypatch.setattr(score, 'score_chunk', _scorer([]))
+    assert score.run(job) == 0
+    assert [row['row'] for row in _output_rows(job.output)] == list(range(11))
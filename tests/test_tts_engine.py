@@ -0,0 +1,106 @@
+import os
+import sys
+import pytest
+from src.core.audio_cache import AudioCache
+from src.core.tts_engine import TTSEngine, split_sentences
+from src.core.tts_worker import TTSWorkerPool
+
+
+def _engine(cache_dir, max_bytes):
+    pool = TTSWorkerPool(max_concurrency=4)
+    return TTSEngine(audio_cache=AudioCache(str(cache_dir), max_bytes=max_bytes, grace_seconds=0),
+                     worker_pool=pool), pool
+
+
+def test_long_text_survives_eviction_of_its_own_segments(tmp_path, fake_edge_tts):
+    """配额只够放下一两句时，拼接前各句也不能被淘汰"""
+    text = ''.join(f'这是第{index}句比较长的测试文本，用来生成多段音频。' for index in range(8))
+    segments = split_sentences(text)
+    assert len(segments) == 8
+    engine, pool = _engine(tmp_path, max_bytes=4 * 1024)
+    try:
+        output = engine.synthesize_long_text(text, auto_analyze=False, max_parallel=4)
+        # 替身每句输出若干 144 字节的 MP3 帧，拼接结果包含全部 8 句
+        with open(output, 'rb') as f:
+            audio = f.read()
+        assert len(audio) % 144 == 0
+        assert len(audio) > 4 * 1024
+        assert engine.audio_cache.stats()['evictions'] > 0
+    finally:
+        pool.stop(timeout=5)
+
+
+def test_pinned_keys_are_not_evicted(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=10, grace_seconds=0)
+    for key in ('a' * 64, 'b' * 64):
+        tmp = cache.temp_path(key)
+        with open(tmp, 'wb') as f:
+            f.write(b'x' * 8)
+        if key == 'a' * 64:
+            with cache.pinned([key]):
+                cache.commit(key, tmp)
+        else:
+            with cache.pinned(['a' * 64]):
+                cache.commit(key, tmp)
+                assert cache.get('a' * 64) is not None
+    # 解除固定后，下一次提交按 LRU 淘汰
+    tmp = cache.temp_path('c' * 64)
+    with open(tmp, 'wb') as f:
+        f.write(b'x' * 8)
+    cache.commit('c' * 64, tmp)
+    assert cache.get('c' * 64) is not None
+    assert cache.stats()['bytes'] <= 10
+
+
+def test_concurrent_streams_of_same_text_share_one_session(tmp_path, fake_edge_tts, monkeypatch):
+    sessions = []
+
+    class CountingCommunicate(fake_edge_tts.Communicate):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            sessions.append(self.text)
+
+    monkeypatch.setattr(fake_edge_tts, 'Communicate', CountingCommunicate)
+    engine, pool = _engine(tmp_path, max_bytes=0)
+    try:
+        first_path, first_cached, first = engine.stream_with_emotion('同一句话', auto_analyze=False)
+        second_path, second_cached, second = engine.stream_with_emotion('同一句话', auto_analyze=False)
+        assert first_path == second_path
+        assert not first_cached and not second_cached
+        first_audio, second_audio = b''.join(first), b''.join(second)
+        assert first_audio and first_audio == second_audio
+        assert sessions == ['同一句话']
+        # 完成后登记进缓存，之后的请求直接读文件
+        path, cached, chunks = engine.stream_with_emotion('同一句话', auto_analyze=False)
+        assert cached and b''.join(chunks) == first_audio
+        with open(path, 'rb') as f:
+            assert f.read() == first_audio
+    finally:
+        pool.stop(timeout=5)
+
+
+def test_stream_raises_when_synthesis_never_runs(tmp_path):
+    class DroppingPool:
+        def submit(self, coro):
+            # 模拟事件循环已停止：协程永远不会执行
+            coro.close()
+
+    engine = TTSEngine(audio_cache=AudioCache(str(tmp_path), max_bytes=0), worker_pool=DroppingPool())
+    _, cached, chunks = engine.stream_with_emotion('没有人合成', auto_analyze=False, idle_timeout=0.1)
+    assert not cached
+    with pytest.raises(RuntimeError, match='超时'):
+        b''.join(chunks)
+
+
+def test_stream_failure_reaches_every_reader(tmp_path, monkeypatch):
+    from benchmarks.fake_tts import FakeTTSProfile, install
+    monkeypatch.delitem(sys.modules, 'edge_tts', raising=False)
+    install(FakeTTSProfile(first_byte_ms=5, first_byte_sigma=0.0, realtime_factor=1000, error_rate=1.0, seed=0))
+    engine, pool = _engine(tmp_path, max_bytes=0)
+    try:
+        path, _, chunks = engine.stream_with_emotion('会失败的合成', auto_analyze=False)
+        with pytest.raises(RuntimeError, match='TTS合成失败'):
+            b''.join(chunks)
+        assert not os.path.exists(path)
+    finally:
+        pool.stop(timeout=5)
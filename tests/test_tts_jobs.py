@@ -0,0 +1,151 @@
+import threading
+import time
+import pytest
+from src.core.tts_jobs import TTSJobQueue, TTSQueueFullError
+
+
+class BlockingEngine:
+    """合成在 release 之前一直阻塞的引擎替身"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def synthesize_with_emotion(self, text, auto_analyze=True):
+        self.release.wait(10)
+        if text == 'boom':
+            raise RuntimeError('合成失败')
+        return f'/tmp/{text}.mp3'
+
+    synthesize_long_text = synthesize_with_emotion
+
+
+def _wait_status(queue, job_id, status):
+    deadline = time.monotonic() + 5
+    snapshot = queue.get(job_id)
+    while snapshot['status'] != status and time.monotonic() < deadline:
+        snapshot = queue.wait(job_id, snapshot['version'], 0.5)
+    assert snapshot['status'] == status
+    return snapshot
+
+
+def test_full_queue_rejects_new_jobs():
+    engine = BlockingEngine()
+    queue = TTSJobQueue(engine, workers=1, max_queue=1)
+    running = queue.submit('a')
+    _wait_status(queue, running.id, 'running')
+    queued = queue.submit('b')
+    with pytest.raises(TTSQueueFullError):
+        queue.submit('c')
+    stats = queue.stats()
+    assert (stats['running'], stats['queued'], stats['rejected'], stats['submitted']) == (1, 1, 1, 2)
+
+    engine.release.set()
+    assert _wait_status(queue, running.id, 'done')['audio_url'] == '/audio/a.mp3'
+    _wait_status(queue, queued.id, 'done')
+    assert queue.stats()['completed'] == 2
+
+
+def test_failed_job_reports_error():
+    engine = BlockingEngine()
+    engine.release.set()
+    queue = TTSJobQueue(engine, workers=1)
+    job = queue.submit('boom')
+    assert _wait_status(queue, job.id, 'failed')['error'] == '合成失败'
+
+
+def test_state_file_is_written_before_waiters_wake(tmp_path):
+    engine = BlockingEngine()
+    queue = TTSJobQueue(engine, workers=1, state_dir=str(tmp_path))
+    persist = queue._persist
+
+    def slow_persist(snapshot):
+        # 放大写文件与唤醒订阅方之间的间隔
+        time.sleep(0.2)
+        persist(snapshot)
+
+    queue._persist = slow_persist
+    job = queue.submit('a')
+    _wait_status(queue, job.id, 'running')
+    engine.release.set()
+    _wait_status(queue, job.id, 'done')
+    other = TTSJobQueue(engine, state_dir=str(tmp_path))
+    assert other.get(job.id)['status'] == 'done'
+
+
+def test_finished_jobs_expire(tmp_path):
+    engine = BlockingEngine()
+    engine.release.set()
+    queue = TTSJobQueue(engine, workers=1, result_ttl=0.3, state_dir=str(tmp_path))
+    job = queue.submit('a')
+    _wait_status(queue, job.id, 'done')
+    # 其他进程通过状态文件查询同一任务
+    other = TTSJobQueue(engine, result_ttl=0.3, state_dir=str(tmp_path))
+    assert other.get(job.id)['status'] == 'done'
+    time.sleep(0.4)
+    assert queue.get(job.id) is None
+    assert other.get(job.id) is None
+    assert other.sweep_state_dir() == 1
+    assert queue.get('not-a-job-id') is None
+
+
+def test_api_returns_429_when_queue_is_full(monkeypatch):
+    from src.webapp.app import create_app
+    from src.webapp.routes import api
+
+    app = create_app('testing')
+    engine = BlockingEngine()
+    queue = TTSJobQueue(engine, workers=1, max_queue=1)
+    monkeypatch.setattr(api, 'tts_jobs', queue)
+    client = app.test_client()
+    try:
+        first = client.post('/api/tts/jobs', json={'text': 'a'})
+        assert first.status_code == 202
+        job_id = first.get_json()['job_id']
+        assert first.headers['Location'].endswith(f'/tts/jobs/{job_id}')
+        _wait_status(queue, job_id, 'running')
+        assert client.post('/api/tts/jobs', json={'text': 'b'}).status_code == 202
+        rejected = client.post('/api/tts/jobs', json={'text': 'c'})
+        assert rejected.status_code == 429
+        assert rejected.headers['Retry-After'] == str(api._QUEUE_FULL_RETRY_AFTER)
+        assert client.get(f'/api/tts/jobs/{job_id}').get_json()['job']['status'] == 'running'
+        assert client.get(f'/api/tts/jobs/{"0" * 32}').status_code == 404
+    finally:
+        engine.release.set()
+
+
+@pytest.mark.parametrize('body', [{'text': 123}, {'text': None}, {'text': ''}, {'text': '  '}, {}, ['a']])
+def test_api_rejects_invalid_text(monkeypatch, body):
+    from src.webapp.app import create_app
+    from src.webapp.routes import api
+
+    queue = TTSJobQueue(BlockingEngine(), workers=1)
+    client = create_app('testing').test_client()
+    monkeypatch.setattr(api, 'tts_jobs', queue)
+    assert client.post('/api/tts/jobs', json=body).status_code == 400
+    assert client.post('/api/tts', json=body).status_code == 400
+    assert queue.stats()['submitted'] == 0
+
+
+def test_long_text_mode_is_opt_in(monkeypatch):
+    from src.webapp.app import create_app
+    from src.webapp.routes import api
+
+    app = create_app('testing')
+    engine = BlockingEngine()
+    queue = TTSJobQueue(engine, workers=1, max_queue=8)
+    monkeypatch.setattr(api, 'tts_jobs', queue)
+    client = app.test_client()
+    text = '今天天气很好。' * 100
+
+    def long_text(body):
+        job_id = client.post('/api/tts/jobs', json=body).get_json()['job_id']
+        return queue._jobs[job_id].long_text
+
+    try:
+        assert long_text({'text': text}) is False
+        assert long_text({'text': '短', 'long_text': True}) is True
+        monkeypatch.setitem(app.config['TTS_CONFIG'], 'long_text_threshold', 200)
+        assert long_text({'text': text}) is True
+        assert long_text({'text': text, 'long_text': False}) is False
+    finally:
+        engine.release.set()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import CancelledError
+import pytest
+from src.core.tts_worker import TTSWorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = TTSWorkerPool(max_concurrency=1)
+    pool.start()
+    yield pool
+    pool.stop(timeout=5)
+
+
+def test_cancelled_waiter_does_not_leak_waiting_count(pool):
+    holding = threading.Event()
+    release = asyncio.Event()
+
+    async def hold():
+        async with pool.session():
+            holding.set()
+            await release.wait()
+
+    async def queued():
+        async with pool.session():
+            pass
+
+    first = pool.submit(hold())
+    assert holding.wait(5)
+    second = pool.submit(queued())
+    deadline = time.monotonic() + 5
+    while pool.stats()['waiting'] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    second.cancel()
+    with pytest.raises(CancelledError):
+        second.result(5)
+    pool.loop.call_soon_threadsafe(release.set)
+    first.result(5)
+    stats = pool.stats()
+    assert (stats['waiting'], stats['in_flight']) == (0, 0)
+    assert (stats['submitted'], stats['completed'], stats['failed']) == (2, 1, 1)
+
+
+def test_counts_balance_under_concurrent_submitters(pool):
+    async def job():
+        async with pool.session():
+            await asyncio.sleep(0)
+
+    def submitter(futures):
+        for _ in range(200):
+            futures.append(pool.submit(job()))
+
+    batches = [[] for _ in range(8)]
+    threads = [threading.Thread(target=submitter, args=(futures,)) for futures in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for futures in batches:
+        for future in futures:
+            future.result(10)
+    stats = pool.stats()
+    assert stats['submitted'] == stats['completed'] == 8 * 200
+    assert (stats['waiting'], stats['in_flight'], stats['failed']) == (0, 0, 0)
+
+
+def test_stop_with_blocked_loop_does_not_close_running_loop():
+    pool = TTSWorkerPool(max_concurrency=1)
+    pool.start()
+    loop = pool.loop
+    release = threading.Event()
+    loop.call_soon_threadsafe(release.wait, 5)
+    # 事件循环被阻塞，join 超时后不能关闭仍在运行的循环
+    pool.stop(timeout=0.1)
+    assert not loop.is_closed()
+    release.set()
+    deadline = time.monotonic() + 5
+    while not loop.is_closed() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert loop.is_closed()